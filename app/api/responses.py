@@ -0,0 +1,42 @@
+"""
+Respostas JSON serializadas direto para bytes.
+
+Os resultados da extração são validados uma única vez, na construção
+(Fatura e TransactionTable), e vão do dicionário para os bytes da resposta
+sem passar por um modelo Pydantic nem pelo jsonable_encoder. Com o orjson
+instalado (opcional) a serialização usa o orjson.
+"""
+import json
+from typing import Any
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Serializa um valor em JSON compacto (UTF-8, sem escapar acentos).
+
+    Args:
+        value: Dicionários, listas e valores simples
+
+    Returns:
+        Bytes do JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class JSONBytesResponse(Response):
+    """Resposta JSON que aceita o conteúdo já serializado ou o serializa com dumps"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -1,101 +1,220 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Form, Query
-from fastapi.responses import JSONResponse, FileResponse
-import os
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Form, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 import uuid
-import pandas as pd
-from typing import Optional, List, Dict
-from pydantic import ValidationError
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, List, Dict, Tuple
 
 from app.services.pdf_extractor import PDFExtractor
-from app.services.data_exporter import DataExporter
-from app.utils.pdf_utils import cleanup_temp_files
 from app.utils.bank_detector import BankDetector
-from app.schemas.invoice import ExportRequest, FaturaCartao
+from app.utils.upload_buffer import UploadBuffer
+from app.services.extraction_cache import ExtractionCache, get_extraction_cache
+from app.services.extraction_service import ExtractionService, ExtractionTimeoutError, get_extraction_service
+from app.services.extraction_limits import ExtractionLimitError
+from app.services.pattern_registry import PatternRegistry, PatternRegistryError, get_pattern_registry
+from app.services.categorizer import Categorizer, get_categorizer
+from app.services.merchant_dictionary import MerchantDictionary, get_merchant_dictionary
+from app.services.job_manager import JobManager, JobManagerClosedError, get_job_manager
+from app.services.data_exporter import EXPORT_FORMATS, available_export_formats
+from app.services.artifact_store import ArtifactStore, get_artifact_store
+from app.services.metrics import MetricsRegistry, get_metrics_registry, record_error
+from app.services.profiler import RequestProfiler, get_request_profiler
+from app.schemas.invoice import FaturaCartao
+from app.api.responses import JSONBytesResponse, dumps
+from app.core.config import BATCH_CONFIG
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/upload-invoice/")
+def check_export_format(export_format: str) -> None:
+    """
+    Valida o formato de exportação pedido.
+    
+    Args:
+        export_format: Formato informado pelo cliente
+    """
+    formats = available_export_formats()
+    if export_format in formats:
+        return
+    if export_format in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato de exportação '{export_format}' indisponível: requer o pacote pyarrow")
+    names = ", ".join(f"'{name}'" for name in formats[:-1])
+    raise HTTPException(status_code=400, detail=f"Formato de exportação deve ser {names} ou '{formats[-1]}'")
+
+async def export_file_response(
+    service: ExtractionService,
+    store: ArtifactStore,
+    export_format: str,
+    data: Any,
+    download_name: str,
+    erros: Optional[List[Dict]] = None,
+    batch: bool = False
+) -> FileResponse:
+    """
+    Exporta os dados no pool de processos e devolve o arquivo gerado.
+    
+    O arquivo fica no armazenamento de arquivos, que o reaproveita em
+    exportações idênticas e o remove na limpeza periódica.
+    
+    Args:
+        service: Serviço que executa a exportação
+        store: Armazenamento dos arquivos exportados
+        export_format: Formato de exportação (diferente de json)
+        data: Dados de uma fatura ou lista de faturas (se batch)
+        download_name: Nome sugerido para o download, sem extensão
+        erros: Arquivos do lote que não puderam ser processados (apenas em lote)
+        batch: Indica se data é uma lista de faturas
+    """
+    export = EXPORT_FORMATS[export_format]
+    if batch:
+        result_path = await service.export_artifact(export.batch_method, data, export.extension, root=store.root, erros=erros)
+    else:
+        result_path = await service.export_artifact(export.method, data, export.extension, root=store.root)
+    
+    return FileResponse(path=result_path, filename=f"{download_name}.{export.extension}", media_type=export.media_type)
+
+async def stream_batch_lines(
+    entries: List[Tuple[int, str, Optional[UploadBuffer]]],
+    extract_file: Callable[[int, str, Optional[UploadBuffer]], Awaitable[Tuple[Optional[Dict], Optional[Dict]]]],
+    uploads: List[UploadBuffer]
+) -> AsyncIterator[bytes]:
+    """
+    Gera as linhas NDJSON de um lote conforme cada arquivo termina.
+    
+    Cada fatura é serializada e liberada assim que fica pronta, de forma que
+    a memória não cresce com o tamanho do lote. Se o cliente desconectar, as
+    extrações pendentes são canceladas.
+    
+    Args:
+        entries: Tuplas (índice, nome, conteúdo) dos arquivos do lote
+        extract_file: Função que extrai um arquivo e retorna (dados, erro)
+        uploads: Arquivos lidos, removidos do spool ao final
+    """
+    async def run(idx: int, filename: str, upload: Optional[UploadBuffer]) -> Dict:
+        data, error = await extract_file(idx, filename, upload)
+        if data is None:
+            return {"tipo": "erro", **error}
+        return {"tipo": "fatura", "indice": idx, "arquivo": filename, "fatura": data}
+    
+    tasks = [asyncio.create_task(run(idx, filename, upload)) for idx, filename, upload in entries]
+    counts = {"fatura": 0, "erro": 0}
+    try:
+        for next_line in asyncio.as_completed(tasks):
+            line = await next_line
+            counts[line["tipo"]] += 1
+            yield dumps(line) + b"\n"
+        
+        yield dumps({"tipo": "resumo", "faturas": counts["fatura"], "erros": counts["erro"]}) + b"\n"
+    
+    finally:
+        for task in tasks:
+            task.cancel()
+        for upload in uploads:
+            upload.cleanup()
+
+@router.post("/upload-invoice/", responses={200: {"model": FaturaCartao, "description": "Dados extraídos (export_format json)"}})
 async def upload_invoice(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     export_format: str = Form("json"),
-    bank_id: Optional[str] = Form(None)
+    bank_id: Optional[str] = Form(None),
+    cache: ExtractionCache = Depends(get_extraction_cache),
+    service: ExtractionService = Depends(get_extraction_service),
+    registry: PatternRegistry = Depends(get_pattern_registry),
+    categorizer: Categorizer = Depends(get_categorizer),
+    merchants: MerchantDictionary = Depends(get_merchant_dictionary),
+    store: ArtifactStore = Depends(get_artifact_store)
 ):
     """
     Endpoint para upload de faturas de cartão em PDF.
-    Retorna os dados extraídos no formato especificado (json ou excel).
+    Retorna os dados extraídos no formato especificado (json, excel, csv, ndjson ou parquet).
     
     Args:
-        background_tasks: Tarefas em segundo plano
         file: Arquivo PDF da fatura
-        export_format: Formato de exportação (json ou excel)
+        export_format: Formato de exportação (json, excel, csv, ndjson ou parquet)
         bank_id: ID do banco emissor da fatura (opcional)
+        cache: Cache de resultados de extração
+        service: Serviço que executa a extração no pool de processos
+        registry: Registro de padrões dos bancos (a versão compõe a chave de cache)
+        categorizer: Regras de categorias (a versão também compõe a chave de cache)
+        merchants: Dicionário de estabelecimentos (a versão das correções também compõe a chave de cache)
+        store: Armazenamento dos arquivos exportados
     """
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Apenas arquivos PDF são aceitos")
     
-    if export_format not in ["json", "excel"]:
-        raise HTTPException(status_code=400, detail="Formato de exportação deve ser 'json' ou 'excel'")
+    check_export_format(export_format)
     
     # Gera um ID único para este processamento
     process_id = str(uuid.uuid4())
     
-    # Salva o arquivo temporariamente
-    temp_path = os.path.join("app/static/uploads", f"temp_{process_id}.pdf")
-    os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+    # Lê o arquivo em memória (ou no diretório de spool, se for grande)
+    upload = await UploadBuffer.read(file)
     
-    with open(temp_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    async def run_extraction() -> Dict:
+        # Extrai os dados do PDF no pool de processos
+        # (o banco é detectado automaticamente se não foi informado)
+        return await service.extract(upload.source, bank_id, name=upload.filename)
     
     try:
-        # Se o banco não foi especificado, tenta detectá-lo automaticamente
-        if not bank_id:
-            detected_bank = BankDetector.detect_bank(temp_path)
-            if detected_bank:
-                bank_id = detected_bank
-        
-        # Extrai os dados do PDF
-        extractor = PDFExtractor()
-        extracted_data = extractor.extract(temp_path, bank_id)
-        
-        # Valida os dados extraídos
-        try:
-            # Converte para o modelo Pydantic para validação
-            fatura_schema = FaturaCartao(**extracted_data)
-        except ValidationError as e:
-            raise HTTPException(status_code=422, detail=f"Dados extraídos inválidos: {str(e)}")
+        # Reenvios do mesmo PDF reaproveitam o resultado em cache
+        cache_key = ExtractionCache.make_key_from_digest(
+            upload.sha256, registry.version, "extract", bank_id or "auto", categorizer.version, merchants.overrides_version
+        )
+        # Os dados já foram validados na extração (Fatura e TransactionTable) e não passam de novo pelo esquema
+        extracted_data = await cache.get_or_compute(cache_key, run_extraction)
         
         # Exporta os dados para o formato solicitado
-        exporter = DataExporter()
-        
         if export_format == "json":
-            result_path = exporter.to_json(extracted_data, f"invoice_{process_id}.json")
-            return JSONResponse(content=extracted_data)
-        else:  # excel
-            result_path = exporter.to_excel(extracted_data, f"invoice_{process_id}.xlsx")
-            
-            # Adiciona tarefa para limpar o arquivo de resultado após um tempo
-            background_tasks.add_task(cleanup_temp_files, [result_path])
-            
-            return FileResponse(
-                path=result_path, 
-                filename=f"invoice_data_{process_id}.xlsx",
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            return JSONBytesResponse(extracted_data)
+        else:  # excel, csv, ndjson ou parquet
+            return await export_file_response(service, store, export_format, extracted_data, f"invoice_data_{process_id}")
+    
+    except HTTPException:
+        raise
+    
+    except ExtractionTimeoutError as e:
+        record_error("upload-invoice", e)
+        raise HTTPException(status_code=504, detail=str(e))
+    
+    except ExtractionLimitError as e:
+        # Documento patológico (páginas, texto ou tempo de CPU acima dos limites)
+        record_error("upload-invoice", e)
+        raise HTTPException(status_code=422, detail=e.to_dict())
     
     except Exception as e:
+        record_error("upload-invoice", e)
         raise HTTPException(status_code=500, detail=f"Erro ao processar o arquivo: {str(e)}")
     
     finally:
-        # Adiciona tarefa para limpar os arquivos temporários
-        background_tasks.add_task(cleanup_temp_files, [temp_path])
+        # Remove o arquivo de spool, se o envio não coube em memória
+        upload.cleanup()
 
 @router.get("/health/")
 async def health_check():
     """Endpoint para verificar a saúde da aplicação"""
     return {"status": "ok", "version": "0.1.0"}
     
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(registry: MetricsRegistry = Depends(get_metrics_registry)):
+    """
+    Retorna as métricas da aplicação no formato de texto do Prometheus:
+    tamanho dos envios, páginas por PDF, duração de cada etapa, bancos
+    detectados, acertos do cache e erros por tipo.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+    
+@router.get("/profiles")
+async def list_profiles(
+    limit: int = Query(20, ge=1, le=200),
+    profiler: RequestProfiler = Depends(get_request_profiler)
+):
+    """
+    Lista os perfis de CPU mais recentes (requisições enviadas com o cabeçalho
+    X-Profile ou sorteadas pela amostragem), com os arquivos de cada processo.
+    """
+    return {"directory": profiler.directory, "profiles": profiler.list_profiles(limit)}
+    
 @router.get("/banks/")
 async def list_banks():
     """
@@ -104,10 +223,20 @@ async def list_banks():
     available_banks = BankDetector.get_available_banks()
     return {"banks": available_banks}
     
+@router.get("/cache/stats/")
+async def cache_stats(cache: ExtractionCache = Depends(get_extraction_cache)):
+    """
+    Retorna os contadores de acertos e falhas do cache de extração.
+    """
+    return cache.stats()
+    
 @router.post("/detect-bank/")
 async def detect_bank(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    cache: ExtractionCache = Depends(get_extraction_cache),
+    service: ExtractionService = Depends(get_extraction_service),
+    registry: PatternRegistry = Depends(get_pattern_registry)
 ):
     """
     Detecta o banco emissor de uma fatura de cartão em PDF.
@@ -115,147 +244,318 @@ async def detect_bank(
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Apenas arquivos PDF são aceitos")
     
-    # Gera um ID único para este processamento
-    process_id = str(uuid.uuid4())
-    
-    # Salva o arquivo temporariamente
-    temp_path = os.path.join("app/static/uploads", f"temp_{process_id}.pdf")
-    os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+    # Lê o arquivo em memória (ou no diretório de spool, se for grande)
+    upload = await UploadBuffer.read(file)
     
-    with open(temp_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    async def run_detection() -> Dict:
+        return await service.detect(upload.source, name=upload.filename)
     
     try:
         # Detecta o banco
-        bank_id = BankDetector.detect_bank(temp_path)
+        cache_key = ExtractionCache.make_key_from_digest(upload.sha256, registry.version, "detect")
+        detection = await cache.get_or_compute(cache_key, run_detection)
+        bank_id = detection["bank_id"]
         available_banks = BankDetector.get_available_banks()
         
         if bank_id:
             bank_name = available_banks.get(bank_id, bank_id)
-            return {"detected": True, "bank_id": bank_id, "bank_name": bank_name}
+            return {
+                "detected": True,
+                "bank_id": bank_id,
+                "bank_name": bank_name,
+                "confidence": detection["confidence"],
+                "scores": detection["scores"],
+            }
         else:
-            return {"detected": False, "message": "Não foi possível identificar o banco emissor da fatura"}
+            return {
+                "detected": False,
+                "message": "Não foi possível identificar o banco emissor da fatura",
+                "scores": detection["scores"],
+            }
+    
+    except HTTPException:
+        raise
+    
+    except ExtractionTimeoutError as e:
+        record_error("detect-bank", e)
+        raise HTTPException(status_code=504, detail=str(e))
+    
+    except ExtractionLimitError as e:
+        # Documento patológico (páginas, texto ou tempo de CPU acima dos limites)
+        record_error("detect-bank", e)
+        raise HTTPException(status_code=422, detail=e.to_dict())
     
     except Exception as e:
+        record_error("detect-bank", e)
         raise HTTPException(status_code=500, detail=f"Erro ao processar o arquivo: {str(e)}")
     
     finally:
-        # Adiciona tarefa para limpar os arquivos temporários
-        background_tasks.add_task(cleanup_temp_files, [temp_path])
+        # Remove o arquivo de spool, se o envio não coube em memória
+        upload.cleanup()
     
 @router.post("/batch-process/")
 async def batch_process(
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
-    export_format: str = Form("excel")
+    export_format: str = Form("excel"),
+    stream: bool = Form(False),
+    cache: ExtractionCache = Depends(get_extraction_cache),
+    service: ExtractionService = Depends(get_extraction_service),
+    registry: PatternRegistry = Depends(get_pattern_registry),
+    categorizer: Categorizer = Depends(get_categorizer),
+    merchants: MerchantDictionary = Depends(get_merchant_dictionary),
+    store: ArtifactStore = Depends(get_artifact_store)
 ):
     """
     Endpoint para processar múltiplas faturas de uma vez.
     Retorna um arquivo com os dados consolidados.
+    
+    Os arquivos são extraídos em paralelo (até BATCH_MAX_CONCURRENCY ao mesmo
+    tempo), cada um com seu próprio tempo limite. Arquivos que falham aparecem
+    na lista de erros sem interromper o restante do lote.
+    
+    Com stream=true a resposta é NDJSON: uma linha por fatura (ou erro),
+    enviada assim que o arquivo termina de ser extraído, e uma linha final
+    de resumo. As linhas chegam na ordem de conclusão; o campo indice traz a
+    posição do arquivo no envio.
     """
     if not files:
         raise HTTPException(status_code=400, detail="Nenhum arquivo enviado")
     
-    if export_format not in ["json", "excel"]:
-        raise HTTPException(status_code=400, detail="Formato de exportação deve ser 'json' ou 'excel'")
+    check_export_format(export_format)
+    
+    if stream and export_format not in ["json", "ndjson"]:
+        raise HTTPException(status_code=400, detail="O modo streaming responde em NDJSON; use export_format 'json' ou 'ndjson'")
     
     # Gera um ID único para este processamento
     batch_id = str(uuid.uuid4())
     
-    # Lista para armazenar os caminhos dos arquivos temporários
-    temp_files = []
+    # Arquivos recebidos, para remover os que foram para o diretório de spool
+    uploads = []
+    
+    # Limita quantos arquivos do lote são extraídos ao mesmo tempo
+    semaphore = asyncio.Semaphore(BATCH_CONFIG["max_concurrency"])
+    
+    async def read_file(file: UploadFile) -> Optional[UploadBuffer]:
+        """Lê um arquivo do lote (None se não for PDF)"""
+        if not file.filename.lower().endswith('.pdf'):
+            return None
+        
+        # Lê o arquivo em memória (ou no diretório de spool, se for grande)
+        upload = await UploadBuffer.read(file)
+        uploads.append(upload)
+        return upload
+    
+    async def extract_file(idx: int, filename: str, upload: Optional[UploadBuffer]) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Extrai um arquivo do lote e retorna (dados, erro)"""
+        if upload is None:
+            return None, {"indice": idx, "arquivo": filename, "erro": "Apenas arquivos PDF são aceitos"}
+        
+        async def run_extraction() -> Dict:
+            return await service.extract(upload.source, timeout=BATCH_CONFIG["file_timeout"], name=upload.filename)
+        
+        # Extrai os dados do PDF
+        try:
+            async with semaphore:
+                cache_key = ExtractionCache.make_key_from_digest(
+                    upload.sha256, registry.version, "extract", "auto", categorizer.version, merchants.overrides_version
+                )
+                return await cache.get_or_compute(cache_key, run_extraction), None
+        except Exception as e:
+            # Registra o erro mas continua processando os outros arquivos
+            logger.warning(f"Erro ao processar {filename}: {str(e)}")
+            record_error("batch-process", e)
+            erro = {"indice": idx, "arquivo": filename, "erro": str(e) or type(e).__name__}
+            if isinstance(e, ExtractionLimitError):
+                erro["codigo"] = e.code
+            return None, erro
+    
+    async def process_file(idx: int, file: UploadFile) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Lê e extrai um arquivo do lote"""
+        return await extract_file(idx, file.filename, await read_file(file))
+    
+    if stream:
+        try:
+            # Os arquivos enviados são lidos antes de a resposta começar
+            entries = [(idx, file.filename, await read_file(file)) for idx, file in enumerate(files)]
+        except BaseException:
+            for upload in uploads:
+                upload.cleanup()
+            raise
+        
+        return StreamingResponse(
+            stream_batch_lines(entries, extract_file, uploads),
+            media_type="application/x-ndjson",
+            headers={"X-Batch-Id": batch_id},
+        )
     
     try:
-        all_data = []
+        # Extrai todos os arquivos em paralelo; gather preserva a ordem do envio
+        results = await asyncio.gather(*[process_file(idx, file) for idx, file in enumerate(files)])
         
-        # Processa cada arquivo
-        for idx, file in enumerate(files):
-            if not file.filename.lower().endswith('.pdf'):
-                continue
-                
-            # Salva o arquivo temporariamente
-            temp_path = os.path.join("app/static/uploads", f"temp_{batch_id}_{idx}.pdf")
-            os.makedirs(os.path.dirname(temp_path), exist_ok=True)
-            
-            with open(temp_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-                
-            temp_files.append(temp_path)
-            
-            # Extrai os dados do PDF
-            try:
-                extractor = PDFExtractor()
-                extracted_data = extractor.extract(temp_path)
-                all_data.append(extracted_data)
-            except Exception as e:
-                # Registra o erro mas continua processando os outros arquivos
-                print(f"Erro ao processar {file.filename}: {str(e)}")
+        all_data = [data for data, _ in results if data is not None]
+        errors = [error for _, error in results if error is not None]
         
         if not all_data:
-            raise HTTPException(status_code=400, detail="Nenhum arquivo válido para processar")
+            raise HTTPException(status_code=400, detail={"message": "Nenhum arquivo válido para processar", "erros": errors})
         
         # Exporta os dados consolidados
-        exporter = DataExporter()
-        
         if export_format == "json":
-            # Para JSON, retorna uma lista de resultados
-            result_path = exporter.to_json({"faturas": all_data}, f"batch_{batch_id}.json")
-            return JSONResponse(content={"faturas": all_data})
-        else:  # excel
-            # Para Excel, cria um arquivo com múltiplas planilhas (uma para cada fatura)
-            # A implementação atual do exporter precisa ser adaptada para isso
-            result_path = os.path.join("app/static/exports", f"batch_{batch_id}.xlsx")
-            
-            # Cria um Excel com múltiplas planilhas
-            with pd.ExcelWriter(result_path, engine='openpyxl') as writer:
-                for idx, data in enumerate(all_data):
-                    # Identificador para esta fatura
-                    sheet_name = f"Fatura {idx + 1}"
-                    
-                    # Resumo da fatura
-                    resumo = {
-                        'Titular': [data.get('titular', '')],
-                        'Número do Cartão': [data.get('numero_cartao', '')],
-                        'Data de Fechamento': [data.get('data_fechamento', '')],
-                        'Valor Total': [data.get('valor_total', '')],
-                    }
-                    pd.DataFrame(resumo).to_excel(writer, sheet_name=sheet_name, index=False)
-                    
-                    # Transações da fatura
-                    if data.get('transacoes'):
-                        transacoes_df = pd.DataFrame(data['transacoes'])
-                        transacoes_df.to_excel(writer, sheet_name=f"{sheet_name} - Transações", index=False)
-            
-            # Adiciona tarefa para limpar o arquivo de resultado após um tempo
-            background_tasks.add_task(cleanup_temp_files, [result_path])
-            
-            return FileResponse(
-                path=result_path, 
-                filename=f"batch_invoices_{batch_id}.xlsx",
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            # Para JSON, retorna uma lista de resultados (sem gravar arquivo)
+            return JSONBytesResponse({"faturas": all_data, "erros": errors})
+        else:
+            # Excel: uma planilha por fatura; CSV, NDJSON e Parquet: as transações de todas as faturas
+            return await export_file_response(
+                service, store, export_format, all_data, f"batch_invoices_{batch_id}", erros=errors, batch=True
             )
     
     finally:
-        # Adiciona tarefa para limpar os arquivos temporários
-        background_tasks.add_task(cleanup_temp_files, temp_files)
+        # Remove os arquivos que foram para o diretório de spool
+        for upload in uploads:
+            upload.cleanup()
 
 @router.get("/bank-patterns/{bank_id}")
-async def get_bank_patterns(bank_id: str):
+async def get_bank_patterns(bank_id: str, registry: PatternRegistry = Depends(get_pattern_registry)):
     """
     Retorna os padrões de expressão regular específicos de um banco para extração de faturas.
     
     Args:
         bank_id: ID do banco
+        registry: Registro de padrões dos bancos
     """
-    extractor = PDFExtractor()
+    snapshot = registry.snapshot()
+    bank = snapshot.get(bank_id)
     
-    if bank_id in extractor.BANK_EXTRACTORS:
-        return {"bank_id": bank_id, "patterns": extractor.BANK_EXTRACTORS[bank_id]}
+    if bank is not None:
+        return {
+            "bank_id": bank_id,
+            "bank_name": bank.name,
+            "version": snapshot.version,
+            "patterns": bank.definition.get("extraction", {}),
+            "detection": bank.definition.get("detection", []),
+        }
     else:
-        available_banks = list(extractor.BANK_EXTRACTORS.keys())
+        available_banks = list(snapshot.banks.keys())
         raise HTTPException(
             status_code=404, 
             detail=f"Banco não encontrado. Bancos disponíveis: {available_banks}"
         )
+
+@router.post("/admin/bank-patterns/reload")
+async def reload_bank_patterns(registry: PatternRegistry = Depends(get_pattern_registry)):
+    """
+    Recarrega o arquivo de padrões dos bancos sem reiniciar a aplicação.
+    Os processos de extração percebem a mudança do arquivo e recarregam por conta própria.
+    """
+    try:
+        snapshot = registry.reload()
+    except PatternRegistryError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return {"version": snapshot.version, "cache_version": snapshot.cache_version, "banks": list(snapshot.banks.keys())}
+
+@router.post("/jobs", status_code=202)
+async def submit_job(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    export_format: str = Form("json"),
+    bank_id: Optional[str] = Form(None),
+    jobs: JobManager = Depends(get_job_manager)
+):
+    """
+    Recebe um ou mais PDFs e retorna imediatamente o identificador do trabalho.
+    A extração roda em segundo plano; consulte o andamento em /jobs/{job_id}.
+    
+    Args:
+        request: Requisição, usada para montar os links de consulta
+        files: Lista de arquivos PDF
+        export_format: Formato padrão do resultado (json, excel, csv, ndjson ou parquet)
+        bank_id: ID do banco emissor das faturas (opcional)
+        jobs: Fila de trabalhos de extração
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="Nenhum arquivo enviado")
+    
+    check_export_format(export_format)
+    
+    entries = []
+    try:
+        for file in files:
+            if not file.filename.lower().endswith('.pdf'):
+                entries.append((file.filename, None, "Apenas arquivos PDF são aceitos"))
+            else:
+                entries.append((file.filename, await UploadBuffer.read(file), None))
+        
+        if all(upload is None for _, upload, _ in entries):
+            raise HTTPException(status_code=400, detail="Apenas arquivos PDF são aceitos")
+        
+        # Grava os PDFs e registra o trabalho fora do loop de eventos
+        job_id = await asyncio.to_thread(jobs.submit, entries, export_format, bank_id)
+    
+    except JobManagerClosedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    finally:
+        # Remove os arquivos de spool que não chegaram a ser gravados no trabalho
+        for _, upload, _ in entries:
+            if upload is not None:
+                upload.cleanup()
+    
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": str(request.url_for("get_job", job_id=job_id)),
+        "result_url": str(request.url_for("get_job_result", job_id=job_id)),
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    """
+    Retorna a situação, o andamento e os tempos de um trabalho.
+    
+    Args:
+        job_id: Identificador do trabalho
+        jobs: Fila de trabalhos de extração
+    """
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Trabalho não encontrado")
+    return status
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    export_format: Optional[str] = Query(None),
+    jobs: JobManager = Depends(get_job_manager),
+    service: ExtractionService = Depends(get_extraction_service),
+    store: ArtifactStore = Depends(get_artifact_store)
+):
+    """
+    Retorna o resultado de um trabalho concluído em JSON ou Excel.
+    
+    Args:
+        job_id: Identificador do trabalho
+        export_format: Formato do resultado (padrão: o informado no envio)
+        jobs: Fila de trabalhos de extração
+        service: Serviço que executa a exportação no pool de processos
+        store: Armazenamento dos arquivos exportados
+    """
+    job = jobs.store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabalho não encontrado")
+    
+    export_format = export_format or job["export_format"]
+    check_export_format(export_format)
+    
+    if job["status"] not in ["completed", "failed"]:
+        raise HTTPException(status_code=409, detail={"message": "O trabalho ainda não terminou", "status": job["status"]})
+    
+    result = jobs.result(job_id)
+    if not result["faturas"]:
+        raise HTTPException(status_code=422, detail={"message": "Nenhum arquivo do trabalho foi processado", "erros": result["erros"]})
+    
+    if export_format == "json":
+        return JSONBytesResponse({"job_id": job_id, **result})
+    
+    return await export_file_response(
+        service, store, export_format, result["faturas"], f"job_invoices_{job_id}", erros=result["erros"], batch=True
+    )
@@ -1,5 +1,6 @@
 import os
 import logging
+import tempfile
 from typing import Dict, Any
 
 # Configurações de logging
@@ -9,9 +10,10 @@ logging.basicConfig(
 )
 
 # Diretórios do projeto
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(os.path.dirname(CORE_DIR))
 STATIC_DIR = os.path.join(BASE_DIR, "app", "static")
-EXPORTS_DIR = os.path.join(STATIC_DIR, "exports")
+EXPORTS_DIR = os.getenv("ARTIFACTS_DIR") or os.path.join(STATIC_DIR, "exports")
 TEMPLATES_DIR = os.path.join(BASE_DIR, "app", "templates")
 
 # Configurações da API
@@ -23,7 +25,102 @@ API_CONFIG: Dict[str, Any] = {
     "redoc_url": "/redoc",
 }
 
-# Garantir que os diretórios necessários existam
-os.makedirs(STATIC_DIR, exist_ok=True)
-os.makedirs(EXPORTS_DIR, exist_ok=True)
-os.makedirs(TEMPLATES_DIR, exist_ok=True)
+# Arquivo versionado com os padrões de detecção e extração dos bancos
+BANK_PATTERNS_CONFIG: Dict[str, Any] = {
+    "path": os.getenv("BANK_PATTERNS_FILE") or os.path.join(CORE_DIR, "bank_patterns.json"),
+    "check_interval": float(os.getenv("BANK_PATTERNS_CHECK_INTERVAL_SECONDS", "2")),
+}
+
+# Arquivo com as regras de categorização das transações (palavras-chave por categoria)
+CATEGORY_RULES_CONFIG: Dict[str, Any] = {
+    "path": os.getenv("CATEGORY_RULES_FILE") or os.path.join(CORE_DIR, "category_rules.json"),
+    "check_interval": float(os.getenv("CATEGORY_RULES_CHECK_INTERVAL_SECONDS", "2")),
+}
+
+# Dicionário persistente de estabelecimentos (descrição original -> descrição limpa e categoria);
+# anotar os estabelecimentos novos no diário é opcional (MERCHANT_DICTIONARY_LEARN=1)
+MERCHANTS_DIR = os.getenv("MERCHANT_DICTIONARY_DIR") or os.path.join(STATIC_DIR, "merchants")
+MERCHANT_DICTIONARY_CONFIG: Dict[str, Any] = {
+    "path": os.path.join(MERCHANTS_DIR, "merchant_dictionary.bin"),
+    "journal_path": os.path.join(MERCHANTS_DIR, "merchant_dictionary.journal"),
+    "overrides_path": os.getenv("MERCHANT_OVERRIDES_FILE") or os.path.join(CORE_DIR, "merchant_overrides.json"),
+    "learn": os.getenv("MERCHANT_DICTIONARY_LEARN", "0") == "1",
+    "check_interval": float(os.getenv("MERCHANT_DICTIONARY_CHECK_INTERVAL_SECONDS", "2")),
+    "journal_flush_entries": int(os.getenv("MERCHANT_DICTIONARY_JOURNAL_FLUSH_ENTRIES", "256")),
+    "journal_max_bytes": int(os.getenv("MERCHANT_DICTIONARY_JOURNAL_MAX_BYTES", str(1024 * 1024))),
+}
+
+# Configurações do cache de resultados de extração
+EXTRACTION_CACHE_CONFIG: Dict[str, Any] = {
+    "memory_max_entries": int(os.getenv("EXTRACTION_CACHE_MEMORY_ENTRIES", "256")),
+    "disk_dir": os.getenv("EXTRACTION_CACHE_DIR") or None,
+    "disk_max_bytes": int(os.getenv("EXTRACTION_CACHE_DISK_MAX_BYTES", str(200 * 1024 * 1024))),
+    "ttl_seconds": int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(24 * 60 * 60))),
+}
+
+# Configurações do pool de processos de extração (EXTRACTION_WORKERS=0 usa threads)
+EXTRACTION_POOL_CONFIG: Dict[str, Any] = {
+    "max_workers": int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    "max_tasks_per_child": int(os.getenv("EXTRACTION_MAX_TASKS_PER_CHILD", "200")) or None,
+    "task_timeout": float(os.getenv("EXTRACTION_TASK_TIMEOUT_SECONDS", "60")),
+}
+
+# Limites de cada documento nos processos de extração (0 desativa o limite):
+# tempo de CPU, páginas e caracteres de texto por página e no documento
+EXTRACTION_LIMITS_CONFIG: Dict[str, Any] = {
+    "cpu_seconds": float(os.getenv("EXTRACTION_CPU_BUDGET_SECONDS", "30")),
+    "max_pages": int(os.getenv("EXTRACTION_MAX_PAGES", "500")),
+    "max_page_chars": int(os.getenv("EXTRACTION_MAX_PAGE_CHARS", "50000")),
+    "max_total_chars": int(os.getenv("EXTRACTION_MAX_TOTAL_CHARS", "5000000")),
+}
+
+# Configurações do processamento em lote
+BATCH_CONFIG: Dict[str, Any] = {
+    "max_concurrency": int(os.getenv("BATCH_MAX_CONCURRENCY", str(max(1, EXTRACTION_POOL_CONFIG["max_workers"])))),
+    "file_timeout": float(os.getenv("BATCH_FILE_TIMEOUT_SECONDS", "60")),
+}
+
+# Configurações dos trabalhos de extração assíncronos (estado em SQLite, PDFs em disco até o fim do trabalho)
+JOBS_DIR = os.getenv("JOBS_DIR") or os.path.join(STATIC_DIR, "jobs")
+JOBS_CONFIG: Dict[str, Any] = {
+    "db_path": os.path.join(JOBS_DIR, "jobs.sqlite3"),
+    "files_dir": os.path.join(JOBS_DIR, "files"),
+    "workers": int(os.getenv("JOBS_WORKERS", "2")),
+    "drain_timeout": float(os.getenv("JOBS_DRAIN_TIMEOUT_SECONDS", "30")),
+    "retention_seconds": int(os.getenv("JOBS_RETENTION_SECONDS", str(7 * 24 * 60 * 60))),
+    "lease_seconds": float(os.getenv("JOBS_LEASE_SECONDS", "60")),
+}
+
+# Configurações de recebimento de arquivos: PDFs até o limite ficam em memória,
+# os maiores são gravados no diretório de spool (de preferência um tmpfs)
+_DEFAULT_SPOOL_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+UPLOAD_CONFIG: Dict[str, Any] = {
+    "spool_threshold": int(os.getenv("UPLOAD_SPOOL_THRESHOLD_BYTES", str(4 * 1024 * 1024))),
+    "spool_dir": os.getenv("UPLOAD_SPOOL_DIR") or os.path.join(_DEFAULT_SPOOL_ROOT, "assistente-financeiro-uploads"),
+}
+
+# Armazenamento dos arquivos exportados (endereçados pelo conteúdo) e limpeza
+# periódica, que também remove os uploads abandonados no diretório de spool
+ARTIFACTS_CONFIG: Dict[str, Any] = {
+    "root": EXPORTS_DIR,
+    "uploads_dir": UPLOAD_CONFIG["spool_dir"],
+    "max_bytes": int(os.getenv("ARTIFACTS_MAX_BYTES", str(500 * 1024 * 1024))),
+    "ttl_seconds": int(os.getenv("ARTIFACTS_TTL_SECONDS", str(24 * 60 * 60))),
+    "upload_ttl_seconds": int(os.getenv("UPLOAD_SPOOL_TTL_SECONDS", str(60 * 60))),
+    "sweep_interval": float(os.getenv("ARTIFACTS_SWEEP_INTERVAL_SECONDS", "300")),
+}
+
+# Métricas expostas em GET /api/metrics (METRICS_ENABLED=0 desativa o registro)
+METRICS_CONFIG: Dict[str, Any] = {
+    "namespace": os.getenv("METRICS_NAMESPACE", "assistente_financeiro"),
+    "enabled": os.getenv("METRICS_ENABLED", "1") != "0",
+}
+
+# Perfil de CPU por requisição: ativado pelo cabeçalho X-Profile ou por amostragem
+# (PROFILING_SAMPLE_RATE entre 0 e 1); os arquivos ficam em PROFILES_DIR
+PROFILING_CONFIG: Dict[str, Any] = {
+    "directory": os.getenv("PROFILES_DIR") or os.path.join(STATIC_DIR, "profiles"),
+    "sample_rate": float(os.getenv("PROFILING_SAMPLE_RATE", "0")),
+    "header_enabled": os.getenv("PROFILING_HEADER_ENABLED", "1") != "0",
+    "max_files": int(os.getenv("PROFILING_MAX_FILES", "200")),
+}
@@ -1,14 +1,18 @@
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from app.models.transaction_table import TransactionTable
+from app.utils.money import parse_cents
 
-@dataclass
+@dataclass(slots=True)
 class Transacao:
-    """Classe para representar uma transação na fatura"""
+    """Classe para representar uma transação na fatura (sem __dict__ por instância)"""
     data: str
     descricao: str
     valor: float
     categoria: Optional[str] = None
+    # Valor exato em centavos, quando a transação vem do parser (ver app.utils.money)
+    centavos: Optional[int] = None
 
     def to_dict(self) -> Dict[str, Any]:
         """Converte o objeto para dicionário"""
@@ -20,25 +24,39 @@ class Transacao:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Fatura:
-    """Classe para representar uma fatura de cartão de crédito"""
+    """
+    Classe para representar uma fatura de cartão de crédito.
+    
+    Os valores das transações são validados ao entrar na TransactionTable;
+    o dicionário de to_dict é o resultado final da extração e não passa de
+    novo por validação.
+    """
     titular: Optional[str] = None
     numero_cartao: Optional[str] = None
     data_fechamento: Optional[str] = None
     data_vencimento: Optional[str] = None
     valor_total: Optional[str] = None
     banco: Optional[str] = None
-    transacoes: List[Transacao] = field(default_factory=list)
+    # Transações em colunas (ver TransactionTable), sem um objeto por linha
+    transacoes: TransactionTable = field(default_factory=TransactionTable)
     data_processamento: str = field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     
     def adicionar_transacao(self, transacao: Transacao) -> None:
         """Adiciona uma transação à fatura"""
-        self.transacoes.append(transacao)
+        if transacao.centavos is not None:
+            self.transacoes.append_cents(transacao.data, transacao.descricao, transacao.centavos, transacao.categoria)
+        else:
+            self.transacoes.append(transacao.data, transacao.descricao, transacao.valor, transacao.categoria)
         
     def calcular_total(self) -> float:
         """Calcula o valor total da fatura com base nas transações"""
-        return sum(t.valor for t in self.transacoes)
+        return self.transacoes.total_cents() / 100
+        
+    def calcular_total_centavos(self) -> int:
+        """Calcula o valor total da fatura em centavos (soma exata)"""
+        return self.transacoes.total_cents()
         
     def to_dict(self) -> Dict[str, Any]:
         """Converte o objeto para dicionário"""
@@ -48,7 +66,8 @@ class Fatura:
             "data_fechamento": self.data_fechamento,
             "data_vencimento": self.data_vencimento,
             "valor_total": self.valor_total,
+            "valor_total_centavos": parse_cents(self.valor_total),
             "banco": self.banco,
             "data_processamento": self.data_processamento,
-            "transacoes": [t.to_dict() for t in self.transacoes]
+            "transacoes": self.transacoes.to_records()
         }
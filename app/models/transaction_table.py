@@ -0,0 +1,379 @@
+"""
+Tabela colunar de transações.
+
+Cada coluna é um array compacto do módulo array: dia e mês em um byte,
+valor em centavos (int64) e descrição e categoria como índices em
+dicionários de textos distintos. Uma fatura com dezenas de milhares de
+linhas ocupa alguns bytes por transação, em vez de um objeto com __dict__
+por linha, e as somas e agrupamentos percorrem inteiros.
+"""
+import math
+from array import array
+from operator import getitem
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Colunas de uma transação no formato de dicionário (Transacao.to_dict)
+RECORD_FIELDS = ("data", "descricao", "valor", "categoria")
+
+# Textos das datas DD/MM, criados uma vez por dia e mês, e o caminho inverso
+_DATE_TEXT = [[f"{day:02d}/{month:02d}" if day and month else None for month in range(13)] for day in range(32)]
+_DATE_PARTS = {text: (day, month) for day, row in enumerate(_DATE_TEXT) for month, text in enumerate(row) if text}
+
+
+def _date_text(day: int, month: int) -> Optional[str]:
+    return _DATE_TEXT[day][month]
+
+
+class TransactionTable:
+    """
+    Transações de uma fatura (ou de um lote) em colunas.
+
+    Datas fora do formato DD/MM são guardadas à parte, por linha, com dia e
+    mês zerados. Fatias compartilham os dicionários de descrições e
+    categorias com a tabela original, que só crescem.
+    """
+
+    __slots__ = ("_days", "_months", "_cents", "_description_ids", "_category_ids", "_descriptions", "_description_index", "_categories", "_category_index", "_raw_dates")
+
+    def __init__(self):
+        """Inicializa uma tabela vazia"""
+        self._days = array("B")
+        self._months = array("B")
+        self._cents = array("q")
+        self._description_ids = array("I")
+        self._category_ids = array("I")
+        self._descriptions: List[str] = []
+        self._description_index: Dict[str, int] = {}
+        # O índice 0 das categorias é "sem categoria"
+        self._categories: List[Optional[str]] = [None]
+        self._category_index: Dict[Optional[str], int] = {None: 0}
+        self._raw_dates: Dict[int, str] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "TransactionTable":
+        """
+        Cria a tabela a partir de transações no formato de dicionário.
+
+        Args:
+            records: Dicionários com data, descricao, valor e categoria
+
+        Returns:
+            Nova tabela
+        """
+        table = cls()
+        append = table.append
+        for record in records:
+            append(record.get("data"), record.get("descricao"), record.get("valor"), record.get("categoria"))
+        return table
+
+    @classmethod
+    def coerce(cls, transactions: Union["TransactionTable", Iterable[Dict[str, Any]], None]) -> "TransactionTable":
+        """
+        Retorna as transações como tabela, convertendo listas de dicionários.
+
+        Args:
+            transactions: Tabela, lista de dicionários ou None
+
+        Returns:
+            A própria tabela ou uma nova tabela com as transações
+        """
+        if isinstance(transactions, cls):
+            return transactions
+        return cls.from_records(transactions or ())
+
+    def append(self, data: Optional[str], descricao: Optional[str], valor: Any, categoria: Optional[str] = None) -> None:
+        """
+        Acrescenta uma transação.
+
+        Args:
+            data: Data da transação (DD/MM)
+            descricao: Descrição da transação
+            valor: Valor em reais
+            categoria: Categoria da transação (opcional)
+        """
+        self.append_cents(data, descricao, round(valor * 100) if type(valor) is float and math.isfinite(valor) else _to_cents(valor), categoria)
+
+    def append_cents(self, data: Optional[str], descricao: Optional[str], cents: int, categoria: Optional[str] = None) -> None:
+        """
+        Acrescenta uma transação com o valor já em centavos (ver app.utils.money).
+
+        Args:
+            data: Data da transação (DD/MM)
+            descricao: Descrição da transação
+            cents: Valor em centavos
+            categoria: Categoria da transação (opcional)
+        """
+        parts = _DATE_PARTS.get(data)
+        if parts is None:
+            parts = _split_date(data)
+            if not parts[0]:
+                self._raw_dates[len(self._cents)] = data
+        self._days.append(parts[0])
+        self._months.append(parts[1])
+        self._cents.append(cents)
+
+        description_id = self._description_index.get(descricao)
+        if description_id is None:
+            description_id = self._description_id(descricao or "")
+        self._description_ids.append(description_id)
+        category_id = self._category_index.get(categoria)
+        if category_id is None:
+            category_id = self._category_id(categoria)
+        self._category_ids.append(category_id)
+
+    def extend(self, records: Iterable[Any]) -> None:
+        """
+        Acrescenta várias transações.
+
+        Args:
+            records: Objetos Transacao ou dicionários
+        """
+        append = self.append
+        for record in records:
+            if isinstance(record, dict):
+                append(record.get("data"), record.get("descricao"), record.get("valor"), record.get("categoria"))
+            elif getattr(record, "centavos", None) is not None:
+                self.append_cents(record.data, record.descricao, record.centavos, record.categoria)
+            else:
+                append(record.data, record.descricao, record.valor, record.categoria)
+
+    def _description_id(self, descricao: str) -> int:
+        index = self._description_index.get(descricao)
+        if index is None:
+            index = self._description_index[descricao] = len(self._descriptions)
+            self._descriptions.append(descricao)
+        return index
+
+    def _category_id(self, categoria: Optional[str]) -> int:
+        index = self._category_index.get(categoria)
+        if index is None:
+            index = self._category_index[categoria] = len(self._categories)
+            self._categories.append(categoria)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._cents)
+
+    def __bool__(self) -> bool:
+        return len(self._cents) > 0
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, TransactionTable):
+            return NotImplemented
+        return list(self.iter_tuples()) == list(other.iter_tuples())
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Dict[str, Any], "TransactionTable"]:
+        """
+        Retorna uma transação (como dicionário) ou uma fatia da tabela.
+
+        Args:
+            key: Posição ou fatia
+
+        Returns:
+            Dicionário da transação ou nova tabela com as linhas da fatia
+        """
+        if isinstance(key, slice):
+            return self._slice(key)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("índice de transação fora da tabela")
+        return {
+            "data": self._date_text(key),
+            "descricao": self._descriptions[self._description_ids[key]],
+            "valor": self._cents[key] / 100,
+            "categoria": self._categories[self._category_ids[key]],
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_records())
+
+    def _slice(self, key: slice) -> "TransactionTable":
+        table = TransactionTable.__new__(TransactionTable)
+        # Fatias dos arrays são cópias contíguas; os dicionários são compartilhados
+        table._days = self._days[key]
+        table._months = self._months[key]
+        table._cents = self._cents[key]
+        table._description_ids = self._description_ids[key]
+        table._category_ids = self._category_ids[key]
+        table._descriptions = self._descriptions
+        table._description_index = self._description_index
+        table._categories = self._categories
+        table._category_index = self._category_index
+        table._raw_dates = {}
+        if self._raw_dates:
+            for new, old in enumerate(range(*key.indices(len(self)))):
+                if old in self._raw_dates:
+                    table._raw_dates[new] = self._raw_dates[old]
+        return table
+
+    def _date_text(self, row: int) -> Optional[str]:
+        text = _date_text(self._days[row], self._months[row])
+        return self._raw_dates.get(row) if text is None else text
+
+    def set_description(self, row: int, descricao: str) -> None:
+        """Substitui a descrição de uma transação"""
+        self._description_ids[row] = self._description_id(descricao)
+
+    def set_category(self, row: int, categoria: Optional[str]) -> None:
+        """Substitui a categoria de uma transação"""
+        self._category_ids[row] = self._category_id(categoria)
+
+    def iter_tuples(self) -> Iterator[Tuple[Optional[str], str, int, Optional[str]]]:
+        """
+        Percorre as transações sem criar dicionários.
+
+        Returns:
+            Iterador de tuplas (data, descrição, valor em centavos, categoria)
+        """
+        descriptions, categories = self._descriptions, self._categories
+        rows = zip(self._dates(), self._cents, self._description_ids, self._category_ids)
+        return ((date, descriptions[description_id], cents, categories[category_id]) for date, cents, description_id, category_id in rows)
+
+    def _dates(self) -> Iterable[Optional[str]]:
+        """Textos das datas, linha a linha"""
+        # Sem chamadas de função por linha: linha da tabela pelo dia, texto pelo mês
+        dates = map(getitem, map(_DATE_TEXT.__getitem__, self._days), self._months)
+        if not self._raw_dates:
+            return dates
+        raw_dates = self._raw_dates
+        return (raw_dates.get(row) if text is None else text for row, text in enumerate(dates))
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        Converte as transações para o formato de dicionário (Transacao.to_dict).
+
+        Returns:
+            Lista de dicionários com data, descricao, valor e categoria
+        """
+        descriptions, categories = self._descriptions, self._categories
+        return [
+            {"data": date, "descricao": descriptions[description_id], "valor": cents / 100, "categoria": categories[category_id]}
+            for date, cents, description_id, category_id in zip(self._dates(), self._cents, self._description_ids, self._category_ids)
+        ]
+
+    def total_cents(self) -> int:
+        """Soma dos valores em centavos"""
+        return sum(self._cents)
+
+    def sum_by(self, column: str) -> Dict[Any, Tuple[int, int]]:
+        """
+        Soma os valores agrupados por uma coluna.
+
+        Args:
+            column: categoria, descricao ou mes
+
+        Returns:
+            Dicionário valor da coluna -> (total em centavos, quantidade), na ordem de aparição
+        """
+        if column == "categoria":
+            keys, labels = self._category_ids, self._categories
+        elif column == "descricao":
+            keys, labels = self._description_ids, self._descriptions
+        elif column == "mes":
+            keys, labels = self._months, None
+        else:
+            raise ValueError(f"Coluna de agrupamento desconhecida: {column}")
+
+        size = len(labels) if labels is not None else 13
+        totals, counts = [0] * size, [0] * size
+        for key, cents in zip(keys, self._cents):
+            totals[key] += cents
+            counts[key] += 1
+        return {
+            (labels[key] if labels is not None else key): (totals[key], counts[key])
+            for key in range(size) if counts[key]
+        }
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        Colunas como arrays do NumPy que compartilham a memória da tabela.
+
+        Descrição e categoria vêm como códigos (ver descriptions e categories).
+
+        Returns:
+            Dicionário coluna -> numpy.ndarray
+        """
+        import numpy
+
+        return {
+            "dia": numpy.frombuffer(self._days, dtype=numpy.uint8),
+            "mes": numpy.frombuffer(self._months, dtype=numpy.uint8),
+            "valor_centavos": numpy.frombuffer(self._cents, dtype=numpy.int64),
+            "descricao": numpy.frombuffer(self._description_ids, dtype=numpy.uint32),
+            "categoria": numpy.frombuffer(self._category_ids, dtype=numpy.uint32),
+        }
+
+    def to_pandas(self) -> Any:
+        """
+        Converte a tabela em DataFrame, com descrição e categoria como
+        colunas categóricas (os códigos não são copiados por linha).
+
+        Returns:
+            pandas.DataFrame com dia, mes, valor_centavos, descricao e categoria
+        """
+        import pandas
+
+        columns = self.to_numpy()
+        # Códigos do pandas são com sinal; a categoria "sem categoria" (0) vira -1 (ausente)
+        description_codes = columns["descricao"].astype("int32", copy=False)
+        category_codes = columns["categoria"].astype("int32") - 1
+        return pandas.DataFrame({
+            "dia": columns["dia"],
+            "mes": columns["mes"],
+            "valor_centavos": columns["valor_centavos"],
+            "descricao": pandas.Categorical.from_codes(description_codes, categories=pandas.Index(self._descriptions, dtype=object)),
+            "categoria": pandas.Categorical.from_codes(category_codes, categories=pandas.Index(self._categories[1:], dtype=object)),
+        }, copy=False)
+
+    @property
+    def descriptions(self) -> List[str]:
+        """Textos distintos das descrições, na ordem dos códigos"""
+        return self._descriptions
+
+    @property
+    def categories(self) -> List[Optional[str]]:
+        """Categorias distintas, na ordem dos códigos (o código 0 é None)"""
+        return self._categories
+
+    def nbytes(self) -> int:
+        """Memória ocupada pelas colunas (sem os dicionários de textos)"""
+        return sum(column.itemsize * len(column) for column in (self._days, self._months, self._cents, self._description_ids, self._category_ids))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Picklado coluna a coluna: os arrays viram bytes e cada texto aparece uma vez
+        return _rebuild, (
+            self._days, self._months, self._cents, self._description_ids, self._category_ids,
+            self._descriptions, self._categories, self._raw_dates,
+        )
+
+    def __repr__(self) -> str:
+        return f"TransactionTable({len(self)} transações, {len(self._descriptions)} descrições distintas)"
+
+
+def _rebuild(days, months, cents, description_ids, category_ids, descriptions, categories, raw_dates) -> TransactionTable:
+    table = TransactionTable.__new__(TransactionTable)
+    table._days, table._months, table._cents = days, months, cents
+    table._description_ids, table._category_ids = description_ids, category_ids
+    table._descriptions = descriptions
+    table._description_index = {text: index for index, text in enumerate(descriptions)}
+    table._categories = categories
+    table._category_index = {category: index for index, category in enumerate(categories)}
+    table._raw_dates = raw_dates
+    return table
+
+
+def _split_date(text: Any) -> Tuple[int, int]:
+    """Dia e mês de uma data DD/MM; (0, 0) se estiver em outro formato"""
+    if isinstance(text, str) and len(text) == 5 and text[2] == "/" and text[:2].isdigit() and text[3:].isdigit():
+        day, month = int(text[:2]), int(text[3:])
+        if 1 <= day <= 31 and 1 <= month <= 12:
+            return day, month
+    return 0, 0
+
+
+def _to_cents(valor: Any) -> int:
+    """Converte um valor em reais para centavos"""
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        raise ValueError(f"Valor de transação inválido: {valor!r}")
+    return int(round(valor * 100))
@@ -7,6 +7,7 @@ class Transacao(BaseModel):
     data: str = Field(..., description="Data da transação (DD/MM)")
     descricao: str = Field(..., description="Descrição do estabelecimento")
     valor: float = Field(..., description="Valor da transação")
+    categoria: Optional[str] = Field(None, description="Categoria da transação")
 
 class FaturaCartao(BaseModel):
     """Esquema para representar os dados extraídos de uma fatura de cartão de crédito"""
@@ -15,7 +16,9 @@ class FaturaCartao(BaseModel):
     data_fechamento: Optional[str] = Field(None, description="Data de fechamento da fatura")
     data_vencimento: Optional[str] = Field(None, description="Data de vencimento da fatura")
     valor_total: Optional[str] = Field(None, description="Valor total da fatura")
+    valor_total_centavos: Optional[int] = Field(None, description="Valor total da fatura em centavos")
     banco: Optional[str] = Field(None, description="Identificador do banco emissor da fatura")
+    data_processamento: Optional[str] = Field(None, description="Data e hora da extração")
     transacoes: List[Transacao] = Field(default_factory=list, description="Lista de transações")
 
 class ExportRequest(BaseModel):
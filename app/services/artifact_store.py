@@ -0,0 +1,258 @@
+"""
+Armazenamento dos arquivos exportados, endereçados pelo conteúdo, com cota
+de disco e limpeza periódica.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import ARTIFACTS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Diretório dos arquivos ainda em escrita, dentro da raiz do armazenamento
+TMP_DIRNAME = ".tmp"
+
+# Prefixo dos arquivos de upload gravados no diretório de spool (ver UploadBuffer)
+UPLOAD_PREFIX = "upload_"
+
+
+class ArtifactStore:
+    """
+    Dono dos arquivos exportados e do diretório de spool dos uploads.
+
+    Cada exportação é identificada pelo SHA-256 do método, dos dados e das
+    opções: exportar de novo o mesmo resultado devolve o arquivo existente sem
+    refazer o trabalho. Os arquivos são escritos em um diretório temporário e
+    movidos para o caminho final com os.replace, de forma que nenhum processo
+    enxerga um arquivo pela metade. O horário de modificação marca o último
+    uso e orienta a limpeza: arquivos mais antigos que o TTL são removidos e,
+    se a cota for excedida, os menos usados saem primeiro.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        uploads_dir: Optional[str] = None,
+        max_bytes: int = 500 * 1024 * 1024,
+        ttl_seconds: int = 24 * 60 * 60,
+        upload_ttl_seconds: int = 60 * 60,
+        sweep_interval: float = 300.0,
+    ):
+        """
+        Inicializa o armazenamento. Os diretórios são criados na primeira escrita.
+
+        Args:
+            root: Diretório dos arquivos exportados
+            uploads_dir: Diretório de spool dos uploads, limpo pela mesma rotina (opcional)
+            max_bytes: Cota de disco dos arquivos exportados
+            ttl_seconds: Tempo em segundos desde o último uso até a remoção de um arquivo exportado
+            upload_ttl_seconds: Idade a partir da qual um upload em spool é considerado abandonado
+            sweep_interval: Intervalo em segundos entre limpezas da thread de fundo
+        """
+        self.root = root
+        self.uploads_dir = uploads_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.upload_ttl_seconds = upload_ttl_seconds
+        self.sweep_interval = sweep_interval
+
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._sweep_lock = threading.Lock()
+
+    @property
+    def tmp_dir(self) -> str:
+        """Diretório dos arquivos em escrita"""
+        return os.path.join(self.root, TMP_DIRNAME)
+
+    @staticmethod
+    def key_for(method: str, data: Any, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Gera a chave de conteúdo de uma exportação.
+
+        Args:
+            method: Método de exportação do DataExporter
+            data: Dados exportados
+            options: Argumentos adicionais do método
+
+        Returns:
+            SHA-256 (hexadecimal) do método, dos dados e das opções
+        """
+        digest = hashlib.sha256(method.encode("utf-8"))
+        payload = json.dumps([data, options or {}], sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        digest.update(payload.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path_for(self, key: str, extension: str) -> str:
+        """
+        Caminho do arquivo de uma chave (subdiretório com os dois primeiros caracteres).
+
+        Args:
+            key: Chave de conteúdo
+            extension: Extensão do arquivo, sem ponto
+
+        Returns:
+            Caminho do arquivo
+        """
+        return os.path.join(self.root, key[:2], f"{key}.{extension}")
+
+    def export(self, method: str, data: Any, extension: str, **options: Any) -> str:
+        """
+        Exporta os dados com um método do DataExporter, reaproveitando o arquivo
+        de uma exportação idêntica.
+
+        Args:
+            method: Nome do método de exportação (to_json, to_excel...)
+            data: Dados a serem exportados
+            extension: Extensão do arquivo, sem ponto
+            options: Argumentos adicionais repassados ao método de exportação
+
+        Returns:
+            Caminho para o arquivo exportado
+        """
+        from app.services.data_exporter import DataExporter
+
+        path = self.path_for(self.key_for(method, data, options), extension)
+        if self._reuse(path):
+            return path
+
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        tmp_name = f"{uuid.uuid4().hex}.{extension}"
+        tmp_path = os.path.join(self.tmp_dir, tmp_name)
+        try:
+            getattr(DataExporter(output_dir=self.tmp_dir), method)(data, tmp_name, **options)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+        return path
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        Remove os arquivos expirados, os que excedem a cota e os uploads abandonados.
+
+        Returns:
+            Contadores da limpeza (arquivos removidos, bytes liberados e bytes em uso)
+        """
+        with self._sweep_lock:
+            now = time.time()
+            removed = freed = 0
+
+            artifacts: List[Tuple[float, int, str]] = []
+            for path, stat in _walk(self.root):
+                in_tmp = os.path.dirname(path) == self.tmp_dir
+                # Arquivos em escrita há mais tempo que o TTL dos uploads vêm de processos que morreram
+                ttl = self.upload_ttl_seconds if in_tmp else self.ttl_seconds
+                if now - stat.st_mtime > ttl:
+                    if _remove(path):
+                        removed += 1
+                        freed += stat.st_size
+                elif not in_tmp:
+                    artifacts.append((stat.st_mtime, stat.st_size, path))
+
+            # Cota: remove os arquivos usados há mais tempo até caber
+            used = sum(size for _, size, _ in artifacts)
+            if used > self.max_bytes:
+                for _, size, path in sorted(artifacts):
+                    if used <= self.max_bytes:
+                        break
+                    if _remove(path):
+                        removed += 1
+                        freed += size
+                        used -= size
+
+            if self.uploads_dir:
+                for path, stat in _walk(self.uploads_dir):
+                    if os.path.basename(path).startswith(UPLOAD_PREFIX) and now - stat.st_mtime > self.upload_ttl_seconds:
+                        if _remove(path):
+                            removed += 1
+                            freed += stat.st_size
+
+        if removed:
+            logger.info(f"Limpeza de arquivos: {removed} removido(s), {freed / 2**20:.1f} MiB liberados")
+        return {"removed": removed, "freed_bytes": freed, "used_bytes": used}
+
+    def start(self) -> None:
+        """Executa uma limpeza imediata e inicia a limpeza periódica em segundo plano"""
+        if self._thread is not None:
+            return
+
+        try:
+            self.sweep()
+        except Exception as e:
+            logger.error(f"Erro na limpeza inicial de arquivos: {str(e)}")
+
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stopping,), name="artifact-sweeper", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        """Interrompe a limpeza periódica"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+
+    def _run(self, stopping: threading.Event) -> None:
+        """Laço da thread de limpeza"""
+        while not stopping.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Erro na limpeza de arquivos: {str(e)}")
+
+    @staticmethod
+    def _reuse(path: str) -> bool:
+        """Marca o uso de um arquivo existente (para a ordem LRU) e indica se ele existe"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+def _walk(root: str):
+    """Percorre os arquivos de um diretório e dos seus subdiretórios com o resultado de stat"""
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path, entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+
+
+def _remove(path: str) -> bool:
+    """Remove um arquivo; retorna False se ele já não existia ou não pôde ser removido"""
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.error(f"Erro ao remover {path}: {str(e)}")
+        return False
+
+
+artifact_store = ArtifactStore(**ARTIFACTS_CONFIG)
+
+
+def get_artifact_store() -> ArtifactStore:
+    """
+    Retorna o armazenamento de arquivos compartilhado pelos endpoints.
+
+    Returns:
+        Instância de ArtifactStore
+    """
+    return artifact_store
@@ -0,0 +1,277 @@
+"""
+Categorização de transações por palavras-chave com um autômato Aho-Corasick.
+"""
+import re
+import logging
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.config import CATEGORY_RULES_CONFIG
+from app.utils.reloadable_file import ReloadableJSONFile
+
+logger = logging.getLogger(__name__)
+
+# Palavras da descrição: sequências de letras e dígitos (o resto é separador)
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+class CategoryRulesError(ValueError):
+    """Erro lançado quando o arquivo de regras de categorias é inválido"""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Normaliza um texto (minúsculas, sem acentos) e o divide em palavras.
+
+    Args:
+        text: Texto original
+
+    Returns:
+        Lista de palavras normalizadas
+    """
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(text)
+
+
+class KeywordAutomaton:
+    """
+    Autômato Aho-Corasick sobre palavras.
+
+    O alfabeto do autômato são as palavras normalizadas da descrição, não os
+    caracteres: cada palavra-chave (que pode ter várias palavras, como
+    "posto ipiranga") só casa com palavras inteiras, e "bar" não casa dentro
+    de "barbearia". A descrição é percorrida uma única vez, qualquer que seja
+    o número de regras.
+    """
+
+    def __init__(self):
+        """Inicializa o autômato vazio"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Melhor saída de cada estado já combinada com as dos estados de falha:
+        # (prioridade, -ordem da regra, categoria)
+        self._best: List[Optional[Tuple[int, int, str]]] = [None]
+        self._built = False
+
+    def add(self, words: List[str], category: str, priority: int, order: int) -> None:
+        """
+        Adiciona uma palavra-chave ao autômato.
+
+        Args:
+            words: Palavras normalizadas da palavra-chave
+            category: Categoria atribuída quando a palavra-chave aparece
+            priority: Prioridade (a maior vence quando várias casam)
+            order: Posição da regra no arquivo (a primeira vence em empates)
+        """
+        node = 0
+        for word in words:
+            next_node = self._goto[node].get(word)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+                self._goto[node][word] = next_node
+            node = next_node
+
+        output = (priority, -order, category)
+        if self._best[node] is None or output > self._best[node]:
+            self._best[node] = output
+        self._built = False
+
+    def build(self) -> None:
+        """Calcula os links de falha e propaga as saídas (busca em largura)"""
+        queue = deque()
+        for node in self._goto[0].values():
+            self._fail[node] = 0
+            queue.append(node)
+
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(word, 0)
+                self._fail[child] = fail
+
+                inherited = self._best[fail]
+                if inherited is not None and (self._best[child] is None or inherited > self._best[child]):
+                    self._best[child] = inherited
+
+        self._built = True
+
+    def best_match(self, words: Iterable[str]) -> Optional[str]:
+        """
+        Retorna a categoria de maior prioridade entre as palavras-chave encontradas.
+
+        Args:
+            words: Palavras normalizadas da descrição
+
+        Returns:
+            Categoria ou None se nenhuma palavra-chave casar
+        """
+        if not self._built:
+            self.build()
+
+        goto, fail, best_by_node = self._goto, self._fail, self._best
+        best = None
+        node = 0
+        for word in words:
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+
+            output = best_by_node[node]
+            if output is not None and (best is None or output > best):
+                best = output
+
+        return best[2] if best is not None else None
+
+    @property
+    def size(self) -> int:
+        """Número de estados do autômato"""
+        return len(self._goto)
+
+
+class CategoryRuleSet:
+    """
+    Versão imutável e compilada do arquivo de regras de categorias.
+    """
+
+    def __init__(self, data: Dict[str, Any], digest: str = "", mtime: float = 0.0):
+        """
+        Compila todas as regras em um único autômato.
+
+        Args:
+            data: Conteúdo do arquivo de regras
+            digest: SHA-256 do arquivo, usado para compor a versão de cache
+            mtime: Horário de modificação do arquivo carregado
+        """
+        if not isinstance(data.get("version"), int):
+            raise CategoryRulesError("O arquivo de regras deve ter um campo 'version' inteiro")
+        if not isinstance(data.get("categories"), list):
+            raise CategoryRulesError("O arquivo de regras deve ter uma lista 'categories'")
+
+        self.version: int = data["version"]
+        self.digest = digest
+        self.mtime = mtime
+        self.categories: List[str] = []
+        self.automaton = KeywordAutomaton()
+
+        order = 0
+        for category in data["categories"]:
+            name = category.get("name")
+            if not name:
+                raise CategoryRulesError(f"Categoria sem nome: {category!r}")
+            default_priority = category.get("priority", 0)
+            self.categories.append(name)
+
+            # Cada palavra-chave é um texto ou {"keyword": ..., "priority": ...}
+            for keyword in category.get("keywords", []):
+                priority = default_priority
+                if isinstance(keyword, dict):
+                    priority = keyword.get("priority", default_priority)
+                    keyword = keyword.get("keyword")
+                if not isinstance(keyword, str) or not isinstance(priority, (int, float)):
+                    raise CategoryRulesError(f"Palavra-chave inválida em {name}: {keyword!r}")
+
+                words = tokenize(keyword)
+                if not words:
+                    raise CategoryRulesError(f"Palavra-chave sem letras ou dígitos em {name}: {keyword!r}")
+
+                self.automaton.add(words, name, priority, order)
+                order += 1
+
+        self.rule_count = order
+        self.automaton.build()
+
+    @property
+    def cache_version(self) -> str:
+        """Versão usada nas chaves do cache de resultados"""
+        return f"{self.version}.{self.digest[:8]}"
+
+    def categorize(self, description: str) -> Optional[str]:
+        """
+        Categoriza uma transação com base na descrição.
+
+        Args:
+            description: Descrição da transação
+
+        Returns:
+            Categoria ou None se nenhuma regra casar
+        """
+        return self.automaton.best_match(tokenize(description))
+
+    def categorize_many(self, descriptions: Iterable[str]) -> List[Optional[str]]:
+        """
+        Categoriza as descrições de uma fatura inteira de uma vez.
+
+        Descrições repetidas (o mesmo estabelecimento várias vezes na fatura)
+        passam pelo autômato uma única vez.
+
+        Args:
+            descriptions: Descrições das transações
+
+        Returns:
+            Lista de categorias na mesma ordem das descrições
+        """
+        seen: Dict[str, Optional[str]] = {}
+        categories = []
+        for description in descriptions:
+            if description not in seen:
+                seen[description] = self.categorize(description)
+            categories.append(seen[description])
+        return categories
+
+
+class Categorizer(ReloadableJSONFile[CategoryRuleSet]):
+    """
+    Regras de categorias carregadas de um arquivo JSON configurável.
+
+    As regras são compiladas uma única vez por versão do arquivo, que é
+    recarregado automaticamente quando muda.
+    """
+
+    description = "arquivo de regras de categorias"
+    error_class = CategoryRulesError
+
+    def _build(self, data: Dict[str, Any], digest: str, mtime: float) -> CategoryRuleSet:
+        """Compila as regras em um autômato"""
+        rules = CategoryRuleSet(data, digest, mtime)
+        logger.info(f"Regras de categorias carregadas: versão {rules.version} ({rules.rule_count} palavras-chave)")
+        return rules
+
+    @property
+    def version(self) -> str:
+        """Versão de cache das regras atuais"""
+        return self.snapshot().cache_version
+
+    def categorize_many(self, descriptions: Iterable[str]) -> List[Optional[str]]:
+        """
+        Categoriza as descrições com as regras atuais.
+
+        Args:
+            descriptions: Descrições das transações
+
+        Returns:
+            Lista de categorias na mesma ordem das descrições
+        """
+        return self.snapshot().categorize_many(descriptions)
+
+
+categorizer = Categorizer(**CATEGORY_RULES_CONFIG)
+
+
+def get_categorizer() -> Categorizer:
+    """
+    Retorna as regras de categorias compartilhadas pelo processo.
+
+    Returns:
+        Instância de Categorizer
+    """
+    return categorizer
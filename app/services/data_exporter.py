@@ -1,13 +1,44 @@
+import io
 import json
-import pandas as pd
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, NamedTuple
 import os
 import logging
 from datetime import datetime
 from app.core.config import EXPORTS_DIR
+# O openpyxl (via xlsx_writer) só é importado quando uma exportação Excel acontece
+from app.services import table_writers
 
 logger = logging.getLogger(__name__)
 
+
+class ExportFormat(NamedTuple):
+    """Métodos do DataExporter e tipo do arquivo de um formato de exportação"""
+    method: str
+    batch_method: str
+    extension: str
+    media_type: str
+
+
+# Formatos aceitos no parâmetro export_format dos endpoints
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "json": ExportFormat("to_json", "to_json", "json", "application/json"),
+    "excel": ExportFormat("to_excel", "to_excel_batch", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ExportFormat("to_csv", "to_csv_batch", "csv", "text/csv; charset=utf-8"),
+    "ndjson": ExportFormat("to_ndjson", "to_ndjson_batch", "ndjson", "application/x-ndjson"),
+    "parquet": ExportFormat("to_parquet", "to_parquet_batch", "parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_export_formats() -> List[str]:
+    """
+    Retorna os formatos de exportação disponíveis neste ambiente.
+    
+    Returns:
+        Nomes dos formatos (parquet apenas com o pyarrow instalado)
+    """
+    return [name for name in EXPORT_FORMATS if name != "parquet" or table_writers.parquet_available()]
+
+
 class DataExporter:
     """
     Classe responsável por exportar os dados extraídos para diferentes formatos.
@@ -51,6 +82,9 @@ class DataExporter:
         """
         Exporta os dados para Excel.
         
+        As linhas são gravadas em streaming (modo write-only do openpyxl), sem
+        montar DataFrames nem manter a planilha inteira em memória.
+        
         Args:
             data: Dados a serem exportados
             filename: Nome do arquivo de saída
@@ -60,37 +94,9 @@ class DataExporter:
         """
         try:
             output_path = os.path.join(self.output_dir, filename)
-            
-            # Cria um Excel com múltiplas planilhas
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                # Planilha de resumo
-                resumo = {
-                    'Campo': ['Titular', 'Número do Cartão', 'Data de Fechamento', 'Data de Vencimento', 'Valor Total', 'Banco', 'Data de Processamento'],
-                    'Valor': [
-                        data.get('titular', 'Não informado'),
-                        data.get('numero_cartao', 'Não informado'),
-                        data.get('data_fechamento', 'Não informado'),
-                        data.get('data_vencimento', 'Não informado'),
-                        data.get('valor_total', 'Não informado'),
-                        data.get('banco', 'Não informado'),
-                        data.get('data_processamento', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-                    ]
-                }
-                
-                resumo_df = pd.DataFrame(resumo)
-                resumo_df.to_excel(writer, sheet_name='Resumo', index=False)
-                
-                # Planilha de transações
-                if data.get('transacoes') and len(data['transacoes']) > 0:
-                    transacoes_df = pd.DataFrame(data['transacoes'])
-                    transacoes_df.to_excel(writer, sheet_name='Transações', index=False)
-                    
-                    # Adiciona uma planilha de análise por categorias (se houver)
-                    self._add_category_analysis(writer, data.get('transacoes', []))
-                else:
-                    # Se não há transações, cria uma planilha vazia
-                    empty_df = pd.DataFrame({'Mensagem': ['Nenhuma transação encontrada']})
-                    empty_df.to_excel(writer, sheet_name='Transações', index=False)
+            from app.services import xlsx_writer
+
+            xlsx_writer.write_invoice(data, output_path)
             
             logger.info(f"Dados exportados para Excel: {output_path}")
             return output_path
@@ -99,46 +105,141 @@ class DataExporter:
             logger.error(f"Erro ao exportar para Excel: {str(e)}")
             raise
     
-    def _add_category_analysis(self, writer: pd.ExcelWriter, transacoes: List[Dict[str, Any]]) -> None:
+    def to_excel_bytes(self, data: Dict[str, Any]) -> bytes:
         """
-        Adiciona uma planilha com análise por categorias.
+        Exporta os dados para Excel em memória, sem criar arquivo.
         
         Args:
-            writer: ExcelWriter aberto
-            transacoes: Lista de transações
+            data: Dados a serem exportados
+            
+        Returns:
+            Conteúdo do arquivo xlsx
         """
-        # Verifica se há transações
-        if not transacoes:
-            return
+        buffer = io.BytesIO()
+        from app.services import xlsx_writer
+
+        xlsx_writer.write_invoice(data, buffer)
+        return buffer.getvalue()
+    
+    def to_excel_batch(self, faturas: List[Dict[str, Any]], filename: str, erros: Optional[List[Dict[str, Any]]] = None) -> str:
+        """
+        Exporta várias faturas para um único arquivo Excel, com uma planilha
+        de resumo e outra de transações para cada fatura.
+        
+        Args:
+            faturas: Lista com os dados de cada fatura
+            filename: Nome do arquivo de saída
+            erros: Arquivos do lote que não puderam ser processados (opcional)
             
+        Returns:
+            Caminho para o arquivo exportado
+        """
         try:
-            # Cria DataFrame
-            df = pd.DataFrame(transacoes)
+            output_path = os.path.join(self.output_dir, filename)
+            from app.services import xlsx_writer
+
+            xlsx_writer.write_batch(faturas, output_path, erros)
             
-            # Verifica se existe a coluna categoria
-            if 'categoria' not in df.columns:
-                df['categoria'] = 'Não Categorizado'
+            logger.info(f"Lote exportado para Excel: {output_path}")
+            return output_path
             
-            # Verifica se existe a coluna valor
-            if 'valor' not in df.columns:
-                return
+        except Exception as e:
+            logger.error(f"Erro ao exportar lote para Excel: {str(e)}")
+            raise
+    
+    def to_csv(self, data: Dict[str, Any], filename: str) -> str:
+        """
+        Exporta as transações para CSV, com os metadados da fatura no cabeçalho.
+        
+        Args:
+            data: Dados a serem exportados
+            filename: Nome do arquivo de saída
             
-            # Substitui valores None por 'Não Categorizado'
-            df['categoria'].fillna('Não Categorizado', inplace=True)
+        Returns:
+            Caminho para o arquivo exportado
+        """
+        return self._write_table(table_writers.write_csv, [data], filename, None, "CSV")
+    
+    def to_csv_batch(self, faturas: List[Dict[str, Any]], filename: str, erros: Optional[List[Dict[str, Any]]] = None) -> str:
+        """
+        Exporta as transações de várias faturas para um único CSV.
+        
+        Args:
+            faturas: Lista com os dados de cada fatura
+            filename: Nome do arquivo de saída
+            erros: Arquivos do lote que não puderam ser processados (opcional)
             
-            # Agrupa por categoria e soma os valores
-            categoria_df = df.groupby('categoria')['valor'].agg(['sum', 'count']).reset_index()
-            categoria_df.columns = ['Categoria', 'Valor Total', 'Quantidade']
+        Returns:
+            Caminho para o arquivo exportado
+        """
+        return self._write_table(table_writers.write_csv, faturas, filename, erros, "CSV")
+    
+    def to_ndjson(self, data: Dict[str, Any], filename: str) -> str:
+        """
+        Exporta a fatura para NDJSON: uma linha de metadados e uma por transação.
+        
+        Args:
+            data: Dados a serem exportados
+            filename: Nome do arquivo de saída
             
-            # Ordena por valor total (decrescente)
-            categoria_df = categoria_df.sort_values(by='Valor Total', ascending=False)
+        Returns:
+            Caminho para o arquivo exportado
+        """
+        return self._write_table(table_writers.write_ndjson, [data], filename, None, "NDJSON")
+    
+    def to_ndjson_batch(self, faturas: List[Dict[str, Any]], filename: str, erros: Optional[List[Dict[str, Any]]] = None) -> str:
+        """
+        Exporta várias faturas para um único arquivo NDJSON.
+        
+        Args:
+            faturas: Lista com os dados de cada fatura
+            filename: Nome do arquivo de saída
+            erros: Arquivos do lote que não puderam ser processados (opcional)
             
-            # Adiciona ao Excel
-            categoria_df.to_excel(writer, sheet_name='Análise por Categoria', index=False)
+        Returns:
+            Caminho para o arquivo exportado
+        """
+        return self._write_table(table_writers.write_ndjson, faturas, filename, erros, "NDJSON")
+    
+    def to_parquet(self, data: Dict[str, Any], filename: str) -> str:
+        """
+        Exporta as transações para Parquet com colunas tipadas (requer pyarrow).
+        
+        Args:
+            data: Dados a serem exportados
+            filename: Nome do arquivo de saída
+            
+        Returns:
+            Caminho para o arquivo exportado
+        """
+        return self._write_table(table_writers.write_parquet, [data], filename, None, "Parquet")
+    
+    def to_parquet_batch(self, faturas: List[Dict[str, Any]], filename: str, erros: Optional[List[Dict[str, Any]]] = None) -> str:
+        """
+        Exporta as transações de várias faturas para um único arquivo Parquet (requer pyarrow).
+        
+        Args:
+            faturas: Lista com os dados de cada fatura
+            filename: Nome do arquivo de saída
+            erros: Arquivos do lote que não puderam ser processados (opcional)
+            
+        Returns:
+            Caminho para o arquivo exportado
+        """
+        return self._write_table(table_writers.write_parquet, faturas, filename, erros, "Parquet")
+    
+    def _write_table(self, writer: Any, faturas: List[Dict[str, Any]], filename: str, erros: Optional[List[Dict[str, Any]]], label: str) -> str:
+        """Grava as faturas com um dos escritores de table_writers"""
+        try:
+            output_path = os.path.join(self.output_dir, filename)
+            writer(faturas, output_path, erros)
+            
+            logger.info(f"Dados exportados para {label}: {output_path}")
+            return output_path
             
         except Exception as e:
-            logger.warning(f"Não foi possível gerar a análise por categorias: {str(e)}")
-            # Se falhar, não interrompe o processo, apenas não adiciona a planilha
+            logger.error(f"Erro ao exportar para {label}: {str(e)}")
+            raise
     
     def generate_report(self, data: Dict[str, Any], output_format: str = "json") -> str:
         """
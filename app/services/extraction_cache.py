@@ -0,0 +1,378 @@
+"""
+Cache de resultados de extração endereçado pelo conteúdo do PDF.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core.config import EXTRACTION_CACHE_CONFIG
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Sentinela para diferenciar "não está no cache" de um valor None armazenado
+_MISSING = object()
+
+
+class ExtractionCache:
+    """
+    Cache em dois níveis para resultados de extração.
+
+    As chaves são derivadas do SHA-256 do conteúdo enviado e da versão dos
+    padrões dos bancos, de forma que reenviar o mesmo PDF não executa o
+    pipeline de extração novamente. O primeiro nível é um LRU em memória; o
+    segundo, opcional, grava os resultados em disco com limite de tamanho e
+    expiração por TTL. Chamadas concorrentes para a mesma chave aguardam uma
+    única extração em andamento.
+    """
+
+    def __init__(
+        self,
+        memory_max_entries: int = 256,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 200 * 1024 * 1024,
+        ttl_seconds: int = 24 * 60 * 60,
+    ):
+        """
+        Inicializa o cache.
+
+        Args:
+            memory_max_entries: Número máximo de resultados mantidos em memória
+            disk_dir: Diretório do nível em disco (desabilitado se None)
+            disk_max_bytes: Tamanho máximo ocupado pelo nível em disco
+            ttl_seconds: Tempo de vida de cada resultado em segundos
+        """
+        self.memory_max_entries = memory_max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        # Chamadas que aguardaram uma extração já em andamento (nem acerto nem falha)
+        self.coalesced = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content: bytes, patterns_version: Any, *parts: Any) -> str:
+        """
+        Gera a chave de cache para um conteúdo.
+
+        Args:
+            content: Bytes do arquivo enviado
+            patterns_version: Versão dos padrões de extração dos bancos
+            parts: Componentes adicionais (tipo de operação, banco informado etc.)
+
+        Returns:
+            Chave de cache
+        """
+        return ExtractionCache.make_key_from_digest(hashlib.sha256(content).hexdigest(), patterns_version, *parts)
+
+    @staticmethod
+    def make_key_from_digest(digest: str, patterns_version: Any, *parts: Any) -> str:
+        """
+        Gera a chave de cache a partir do SHA-256 já calculado do conteúdo.
+
+        Args:
+            digest: SHA-256 (hexadecimal) do arquivo enviado
+            patterns_version: Versão dos padrões de extração dos bancos
+            parts: Componentes adicionais (tipo de operação, banco informado etc.)
+
+        Returns:
+            Chave de cache
+        """
+        suffix = ":".join(str(part) for part in parts)
+        return f"{digest}:v{patterns_version}:{suffix}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Busca um resultado no cache, primeiro em memória e depois em disco.
+
+        Args:
+            key: Chave de cache
+            default: Valor retornado quando a chave não existe
+
+        Returns:
+            Valor armazenado ou o valor padrão
+        """
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Armazena um resultado nos dois níveis do cache.
+
+        Args:
+            key: Chave de cache
+            value: Valor serializável em JSON
+        """
+        self._memory_set(key, value, time.time())
+        if self.disk_dir:
+            self._disk_set(key, value)
+
+    async def set_async(self, key: str, value: Any) -> None:
+        """
+        Armazena um resultado nos dois níveis do cache sem bloquear o loop de eventos.
+
+        A gravação em disco e a limpeza do diretório rodam em uma thread.
+
+        Args:
+            key: Chave de cache
+            value: Valor serializável em JSON
+        """
+        self._memory_set(key, value, time.time())
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_set, key, value)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Retorna o valor em cache ou executa a computação uma única vez.
+
+        Se outra requisição já estiver calculando a mesma chave, aguarda o
+        resultado dela em vez de iniciar uma nova extração (contada em
+        coalesced, não como falha). Se essa requisição for cancelada (cliente
+        desconectado, por exemplo), as que aguardam não herdam o cancelamento:
+        uma delas passa a calcular o valor. A leitura do nível em disco roda
+        no pool de threads do loop.
+
+        Args:
+            key: Chave de cache
+            compute: Função assíncrona que produz o valor
+
+        Returns:
+            Valor em cache ou recém-calculado
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            now = time.time()
+            value = self._memory_get(key, now)
+            if value is _MISSING and self.disk_dir and key not in self._inflight:
+                value = await loop.run_in_executor(None, self._disk_lookup, key, now)
+            if value is not _MISSING:
+                return value
+
+            # Conferido depois da leitura do disco: outra chamada pode ter começado a calcular
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            with self._lock:
+                self.coalesced += 1
+            value = await asyncio.shield(inflight)
+            if value is not _MISSING:
+                return value
+
+        with self._lock:
+            self.misses += 1
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            # Sem valor calculado: quem aguarda volta ao início e recalcula
+            self._inflight.pop(key, None)
+            future.set_result(_MISSING)
+            raise
+        except BaseException as e:
+            self._inflight.pop(key, None)
+            future.set_exception(e)
+            # Evita o aviso de exceção não recuperada quando ninguém está aguardando
+            future.exception()
+            raise
+        self._inflight.pop(key, None)
+        self._memory_set(key, value, time.time())
+        future.set_result(value)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_set, key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do cache.
+
+        Returns:
+            Dicionário com acertos, falhas e ocupação
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "coalesced": self.coalesced,
+                "memory_entries": len(self._memory),
+                "inflight": len(self._inflight),
+                "disk_enabled": bool(self.disk_dir),
+            }
+
+    def collect_metrics(self) -> List[metrics.CollectedMetric]:
+        """
+        Contadores do cache no formato dos coletores de métricas (lidos só na exposição).
+
+        Returns:
+            Métricas de acertos por nível, falhas, chamadas agrupadas e entradas em memória
+        """
+        stats = self.stats()
+        return [
+            ("extraction_cache_hits", "counter", "Acertos do cache de extração por nível",
+             [({"layer": "memory"}, stats["memory_hits"]), ({"layer": "disk"}, stats["disk_hits"])]),
+            ("extraction_cache_misses", "counter", "Falhas do cache de extração", [({}, stats["misses"])]),
+            ("extraction_cache_coalesced", "counter", "Chamadas que aguardaram uma extração já em andamento",
+             [({}, stats["coalesced"])]),
+            ("extraction_cache_memory_entries", "gauge", "Resultados no nível em memória do cache", [({}, stats["memory_entries"])]),
+        ]
+
+    def clear(self) -> None:
+        """Remove todos os resultados armazenados e zera os contadores"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.misses = self.memory_hits = self.disk_hits = self.coalesced = 0
+
+        if self.disk_dir:
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith('.json'):
+                    self._remove_file(entry.path)
+
+    def _lookup(self, key: str) -> Any:
+        """Busca a chave nos dois níveis e atualiza os contadores"""
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is _MISSING and self.disk_dir:
+            value = self._disk_lookup(key, now)
+        if value is _MISSING:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    def _memory_get(self, key: str, now: float) -> Any:
+        """Busca a chave no LRU em memória (conta só os acertos)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+        return _MISSING
+
+    def _disk_lookup(self, key: str, now: float) -> Any:
+        """Busca a chave no disco e a promove para a memória (conta só os acertos)"""
+        value = self._disk_get(key, now)
+        if value is not _MISSING:
+            self._memory_set(key, value, now)
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+        return value
+
+    def _memory_set(self, key: str, value: Any, stored_at: float) -> None:
+        """Insere no LRU em memória descartando os itens menos usados"""
+        with self._lock:
+            self._memory[key] = (stored_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        """Caminho do arquivo em disco para uma chave"""
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.json")
+
+    def _disk_get(self, key: str, now: float) -> Any:
+        """Lê um resultado do disco respeitando o TTL"""
+        path = self._disk_path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl_seconds:
+                self._remove_file(path)
+                return _MISSING
+            with open(path, 'r', encoding='utf-8') as file:
+                value = json.load(file)
+            # Atualiza o horário de acesso para a política LRU do disco
+            os.utime(path, None)
+            return value
+        except FileNotFoundError:
+            return _MISSING
+        except Exception as e:
+            logger.warning(f"Erro ao ler entrada do cache em disco {path}: {str(e)}")
+            self._remove_file(path)
+            return _MISSING
+
+    def _disk_set(self, key: str, value: Any) -> None:
+        """Grava um resultado em disco de forma atômica e aplica o limite de tamanho"""
+        path = self._disk_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(value, file, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar entrada do cache em disco {path}: {str(e)}")
+            self._remove_file(temp_path)
+            return
+
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Remove entradas expiradas e, se necessário, as menos usadas até caber no limite"""
+        now = time.time()
+        entries = []
+        total = 0
+
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                self._remove_file(entry.path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        if total <= self.disk_max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            self._remove_file(path)
+            total -= size
+            if total <= self.disk_max_bytes:
+                break
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        """Remove um arquivo ignorando a sua ausência"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+extraction_cache = ExtractionCache(**EXTRACTION_CACHE_CONFIG)
+metrics.registry.register_collector(extraction_cache.collect_metrics)
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """
+    Retorna a instância de cache compartilhada pelos endpoints.
+
+    Returns:
+        Instância de ExtractionCache
+    """
+    return extraction_cache
@@ -0,0 +1,220 @@
+"""
+Limites de recursos de uma extração: tempo de CPU, páginas e caracteres.
+
+Cada tarefa de extração ou detecção roda dentro de ExtractionLimits.guard.
+O ParsedDocument confere o número de páginas quando ele é lido, antes de
+qualquer decodificação, e o texto de cada página quando o extrai. O tempo
+de CPU é limitado de duas formas. No processo do pool, a tarefa roda na
+thread principal, e um temporizador de CPU (ITIMER_PROF) interrompe até uma
+expressão regular presa em backtracking. Depois de disparar, o temporizador
+repete a interrupção a cada TIMER_REPEAT_SECONDS até o fim da tarefa, então
+um except genérico que engula o erro não deixa a tarefa seguir sem limite.
+Nas threads (EXTRACTION_WORKERS=0), o tempo é conferido a cada página e
+depois da detecção do banco.
+
+Um documento que excede um limite gera ExtractionLimitError. A API responde
+com 422 e um corpo estruturado (ver ExtractionLimitError.to_dict).
+"""
+import time
+import signal
+import threading
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from app.core.config import EXTRACTION_LIMITS_CONFIG
+
+# Intervalo (tempo de CPU) entre as interrupções depois que o orçamento acaba
+TIMER_REPEAT_SECONDS = 0.05
+
+
+class ExtractionLimitError(ValueError):
+    """Erro lançado quando um documento excede um limite da extração"""
+
+    def __init__(self, message: str, code: str, limit: float):
+        """
+        Args:
+            message: Descrição do limite excedido
+            code: Identificador do limite (cpu_budget, max_pages, max_page_chars, max_total_chars)
+            limit: Valor configurado do limite
+        """
+        super().__init__(message)
+        self.code = code
+        self.limit = limit
+
+    def __reduce__(self):
+        # Atravessa o pool de processos com o código e o limite
+        return self.__class__, (str(self), self.code, self.limit)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Corpo da resposta de erro (detail do 422)"""
+        return {"message": str(self), "code": self.code, "limit": self.limit}
+
+
+class ExtractionBudget:
+    """Consumo de uma tarefa em andamento: tempo de CPU e caracteres extraídos"""
+
+    __slots__ = ("limits", "started", "chars", "active")
+
+    def __init__(self, limits: "ExtractionLimits"):
+        self.limits = limits
+        self.started = time.thread_time()
+        self.chars = 0
+        # Falso ao sair de guard: uma interrupção atrasada do temporizador é ignorada
+        self.active = True
+
+    def check_time(self) -> None:
+        """Confere o tempo de CPU gasto pela tarefa"""
+        cpu_seconds = self.limits.cpu_seconds
+        if cpu_seconds and time.thread_time() - self.started > cpu_seconds:
+            raise _cpu_budget_error(cpu_seconds)
+
+    def check_page(self, page_num: int, text: str) -> None:
+        """
+        Confere o texto de uma página recém-extraída.
+
+        Args:
+            page_num: Índice da página (começando em 0)
+            text: Texto extraído da página
+        """
+        limits = self.limits
+        if limits.max_page_chars and len(text) > limits.max_page_chars:
+            raise ExtractionLimitError(
+                f"A página {page_num + 1} tem {len(text)} caracteres; o limite é {limits.max_page_chars}",
+                "max_page_chars", limits.max_page_chars,
+            )
+        self.chars += len(text)
+        if limits.max_total_chars and self.chars > limits.max_total_chars:
+            raise ExtractionLimitError(
+                f"O documento passa de {limits.max_total_chars} caracteres de texto",
+                "max_total_chars", limits.max_total_chars,
+            )
+        self.check_time()
+
+
+# Tarefa em andamento na thread atual (lida pelo ParsedDocument ao extrair páginas)
+_current_budget: ContextVar[Optional[ExtractionBudget]] = ContextVar("current_budget", default=None)
+
+
+def check_page_count(page_count: int) -> None:
+    """
+    Confere o número de páginas de um documento contra os limites da tarefa
+    em andamento (não faz nada fora de ExtractionLimits.guard).
+
+    Args:
+        page_count: Número de páginas do documento
+    """
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.limits.check_pages(page_count)
+
+
+def check_time() -> None:
+    """
+    Confere o tempo de CPU da tarefa em andamento (não faz nada fora de
+    ExtractionLimits.guard).
+    """
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.check_time()
+
+
+def check_page(page_num: int, text: str) -> None:
+    """
+    Confere o texto de uma página contra os limites da tarefa em andamento
+    (não faz nada fora de ExtractionLimits.guard).
+
+    Args:
+        page_num: Índice da página (começando em 0)
+        text: Texto extraído da página
+    """
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.check_page(page_num, text)
+
+
+class ExtractionLimits:
+    """
+    Limites aplicados a cada documento dentro dos processos de extração.
+
+    Limites iguais a 0 ficam desativados.
+    """
+
+    def __init__(self, cpu_seconds: float = 30.0, max_pages: int = 500, max_page_chars: int = 50000, max_total_chars: int = 5000000):
+        """
+        Inicializa os limites.
+
+        Args:
+            cpu_seconds: Tempo de CPU por documento
+            max_pages: Número máximo de páginas
+            max_page_chars: Número máximo de caracteres de texto em uma página
+            max_total_chars: Número máximo de caracteres de texto no documento
+        """
+        self.cpu_seconds = cpu_seconds
+        self.max_pages = max_pages
+        self.max_page_chars = max_page_chars
+        self.max_total_chars = max_total_chars
+
+    def check_pages(self, page_count: int) -> None:
+        """Confere o número de páginas do documento"""
+        if self.max_pages and page_count > self.max_pages:
+            raise ExtractionLimitError(
+                f"O documento tem {page_count} páginas; o limite é {self.max_pages}",
+                "max_pages", self.max_pages,
+            )
+
+    @contextmanager
+    def guard(self) -> Iterator[ExtractionBudget]:
+        """
+        Aplica os limites ao trabalho feito dentro do bloco.
+
+        Yields:
+            Consumo da tarefa
+
+        Raises:
+            ExtractionLimitError: Se um limite for excedido
+        """
+        budget = ExtractionBudget(self)
+        token = _current_budget.set(budget)
+        timer = self.cpu_seconds > 0 and _can_use_timer()
+        if timer:
+            previous = signal.signal(signal.SIGPROF, functools.partial(self._on_timer, budget))
+            signal.setitimer(signal.ITIMER_PROF, self.cpu_seconds, TIMER_REPEAT_SECONDS)
+        try:
+            yield budget
+        finally:
+            budget.active = False
+            if timer:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+                signal.signal(signal.SIGPROF, previous)
+            _current_budget.reset(token)
+
+    def _on_timer(self, budget: ExtractionBudget, signum: int, frame: Any) -> None:
+        """Interrompe a tarefa quando o temporizador de CPU dispara"""
+        if budget.active:
+            raise _cpu_budget_error(self.cpu_seconds)
+
+
+def _cpu_budget_error(cpu_seconds: float) -> ExtractionLimitError:
+    return ExtractionLimitError(
+        f"Tempo de CPU de {cpu_seconds:g}s excedido ao processar o documento",
+        "cpu_budget", cpu_seconds,
+    )
+
+
+def _can_use_timer() -> bool:
+    """O temporizador de CPU só pode ser usado na thread principal, em sistemas com setitimer"""
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+extraction_limits = ExtractionLimits(**EXTRACTION_LIMITS_CONFIG)
+
+
+def get_extraction_limits() -> ExtractionLimits:
+    """
+    Retorna os limites de extração compartilhados pelo processo.
+
+    Returns:
+        Instância de ExtractionLimits
+    """
+    return extraction_limits
@@ -0,0 +1,259 @@
+"""
+Serviço que executa a extração e a exportação fora do loop de eventos,
+em um pool de processos aquecido.
+"""
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from app.core.config import ARTIFACTS_CONFIG, EXTRACTION_POOL_CONFIG
+from app.services import metrics, profiler
+from app.services.extraction_limits import get_extraction_limits
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionTimeoutError(TimeoutError):
+    """Erro lançado quando uma tarefa de extração excede o tempo limite"""
+
+
+class ExtractionServiceClosedError(RuntimeError):
+    """Erro lançado quando uma tarefa é enviada depois do desligamento do serviço"""
+
+
+def _init_worker() -> None:
+    """
+    Inicializa um processo do pool: importa o PyPDF2 e compila os padrões
+    dos bancos uma única vez, antes da primeira tarefa.
+    """
+    import PyPDF2  # noqa: F401
+    from app.services.pdf_extractor import PDFExtractor
+
+    metrics.enable_worker_mode()
+    PDFExtractor.warm_up()
+
+
+def _call_task(profile_id: Optional[str], func: Callable[..., Any], *args: Any) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """
+    Executa uma tarefa (perfilada, se a requisição pediu um perfil) e devolve
+    o resultado com as métricas registradas no processo do pool.
+    """
+    result = profiler.get_request_profiler().run(profile_id, func, *args)
+    return result, metrics.collect_worker_deltas()
+
+
+def _extract_task(source: Union[bytes, str], bank_id: Optional[str] = None, name: Optional[str] = None) -> Dict[str, Any]:
+    """Extrai os dados de uma fatura dentro de um processo do pool"""
+    from app.services.merchant_dictionary import get_merchant_dictionary
+    from app.services.pdf_extractor import PDFExtractor
+    from app.utils.parsed_document import ParsedDocument
+
+    document = ParsedDocument.open(source, name=name)
+    try:
+        with get_extraction_limits().guard():
+            return PDFExtractor().extract(document, bank_id)
+    finally:
+        # Fora do limite de CPU: a gravação do diário e uma eventual compactação não contam para o documento
+        get_merchant_dictionary().flush_journal()
+
+
+def _detect_task(source: Union[bytes, str], name: Optional[str] = None) -> Dict[str, Any]:
+    """Detecta o banco de uma fatura dentro de um processo do pool"""
+    from app.utils.bank_detector import BankDetector
+    from app.utils.parsed_document import ParsedDocument
+
+    document = ParsedDocument.open(source, name=name)
+    with get_extraction_limits().guard():
+        return BankDetector.detect(document)
+
+
+def _export_artifact_task(root: str, method: str, data: Any, extension: str, options: Dict[str, Any]) -> str:
+    """Exporta para o armazenamento de arquivos dentro de um processo do pool"""
+    from app.services.artifact_store import ArtifactStore
+
+    with metrics.stage("export"):
+        return ArtifactStore(root).export(method, data, extension, **options)
+
+
+class ExtractionService:
+    """
+    Executa tarefas de CPU (PyPDF2, expressões regulares, pandas/openpyxl)
+    em um ProcessPoolExecutor para que os endpoints assíncronos não bloqueiem
+    o loop de eventos.
+
+    Com max_workers igual a 0 as tarefas rodam no pool de threads padrão do
+    loop, o que é útil em desenvolvimento e nos testes.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_tasks_per_child: Optional[int] = None,
+        task_timeout: Optional[float] = None,
+    ):
+        """
+        Inicializa o serviço.
+
+        Args:
+            max_workers: Número de processos do pool (0 usa threads)
+            max_tasks_per_child: Tarefas executadas por processo antes de ser reciclado
+            task_timeout: Tempo limite padrão de cada tarefa em segundos
+        """
+        self.max_workers = max_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.task_timeout = task_timeout
+        self._executor: Optional[Executor] = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Cria o pool de processos e volta a aceitar tarefas depois de um shutdown"""
+        with self._lock:
+            self._closed = False
+        self._ensure_started()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Encerra o pool de processos. Tarefas enviadas depois disso falham com
+        ExtractionServiceClosedError até uma nova chamada de start.
+
+        Args:
+            wait: Aguarda a conclusão das tarefas em andamento
+        """
+        with self._lock:
+            self._closed = True
+        self._discard_executor(wait)
+
+    def _ensure_started(self) -> Optional[Executor]:
+        """
+        Cria o pool de processos sob demanda (as threads da fila de trabalhos
+        também chamam) e devolve o executor das tarefas.
+
+        Raises:
+            ExtractionServiceClosedError: Se o serviço já foi encerrado
+        """
+        with self._lock:
+            if self._closed:
+                raise ExtractionServiceClosedError("O serviço de extração foi encerrado")
+            if self._executor is not None or self.max_workers <= 0:
+                return self._executor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+        logger.info(f"Pool de extração iniciado com {self.max_workers} processo(s)")
+        return self._executor
+
+    def _discard_executor(self, wait: bool) -> None:
+        """Encerra o pool atual sem fechar o serviço (o próximo _run cria outro)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+            logger.info("Pool de extração encerrado")
+
+    async def extract(
+        self,
+        source: Union[bytes, str],
+        bank_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Extrai os dados de uma fatura.
+
+        Args:
+            source: Conteúdo do PDF em memória ou caminho para o arquivo
+            bank_id: Identificador do banco emissor (opcional)
+            timeout: Tempo limite em segundos (usa o padrão do serviço se None)
+            name: Nome original do arquivo, quando source é o conteúdo
+
+        Returns:
+            Dicionário com os dados extraídos
+        """
+        return await self._run(_extract_task, source, bank_id, name, timeout=timeout)
+
+    async def detect(self, source: Union[bytes, str], timeout: Optional[float] = None, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Detecta o banco emissor de uma fatura com a sua confiança.
+
+        Args:
+            source: Conteúdo do PDF em memória ou caminho para o arquivo
+            timeout: Tempo limite em segundos (usa o padrão do serviço se None)
+            name: Nome original do arquivo, quando source é o conteúdo
+
+        Returns:
+            Dicionário com bank_id, confidence e a pontuação de cada banco
+        """
+        return await self._run(_detect_task, source, name, timeout=timeout)
+
+    async def export_artifact(
+        self,
+        method: str,
+        data: Any,
+        extension: str,
+        root: str = ARTIFACTS_CONFIG["root"],
+        **options: Any
+    ) -> str:
+        """
+        Exporta dados para o armazenamento de arquivos, reaproveitando o arquivo
+        de uma exportação idêntica.
+
+        Args:
+            method: Nome do método de exportação
+            data: Dados a serem exportados
+            extension: Extensão do arquivo, sem ponto
+            root: Raiz do armazenamento de arquivos
+            options: Argumentos adicionais repassados ao método de exportação
+
+        Returns:
+            Caminho para o arquivo exportado
+        """
+        return await self._run(_export_artifact_task, root, method, data, extension, options)
+
+    async def _run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Submete uma tarefa ao pool e aguarda o resultado sem bloquear o loop"""
+        executor = self._ensure_started()
+        loop = asyncio.get_running_loop()
+        timeout = self.task_timeout if timeout is None else timeout
+
+        # O perfil da requisição não chega sozinho aos processos (nem às threads) do pool
+        try:
+            future = loop.run_in_executor(executor, _call_task, profiler.current_profile_id(), func, *args)
+        except RuntimeError:
+            # O pool foi encerrado entre _ensure_started e o envio da tarefa
+            if self._closed:
+                raise ExtractionServiceClosedError("O serviço de extração foi encerrado")
+            raise
+        try:
+            result, deltas = await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise ExtractionTimeoutError(f"Tempo limite de {timeout:g}s excedido ao processar o arquivo")
+        except BrokenProcessPool:
+            # Um processo morreu (falta de memória, sinal...): recria o pool na próxima tarefa
+            logger.error("Pool de extração corrompido; será recriado")
+            self._discard_executor(wait=False)
+            raise
+
+        # Métricas registradas no processo do pool (com threads, já estão no registro deste processo)
+        if deltas:
+            metrics.registry.merge(deltas)
+        return result
+
+
+extraction_service = ExtractionService(**EXTRACTION_POOL_CONFIG)
+
+
+def get_extraction_service() -> ExtractionService:
+    """
+    Retorna a instância do serviço compartilhada pelos endpoints.
+
+    Returns:
+        Instância de ExtractionService
+    """
+    return extraction_service
@@ -0,0 +1,436 @@
+"""
+Trabalhos de extração assíncronos: o cliente envia os PDFs, recebe um
+identificador e consulta o andamento e o resultado depois.
+"""
+import os
+import time
+import uuid
+import queue
+import shutil
+import socket
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import BATCH_CONFIG, JOBS_CONFIG
+from app.services.job_store import JobStore, RUNNING, COMPLETED, FAILED, PENDING
+from app.services.extraction_cache import ExtractionCache, get_extraction_cache
+from app.services.extraction_service import ExtractionService, ExtractionServiceClosedError, get_extraction_service
+from app.services.pattern_registry import get_pattern_registry
+from app.services.categorizer import get_categorizer
+from app.services.merchant_dictionary import get_merchant_dictionary
+from app.services import metrics
+from app.utils.upload_buffer import UploadBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class JobManagerClosedError(RuntimeError):
+    """Erro lançado quando um trabalho é enviado durante o desligamento"""
+
+
+class JobManager:
+    """
+    Fila de trabalhos de extração persistida em SQLite.
+
+    Cada trabalho reúne um ou mais PDFs, gravados em disco até o fim do
+    trabalho. Threads de trabalho consomem a fila e extraem os arquivos de
+    cada trabalho em paralelo no pool do ExtractionService, gravando o
+    resultado de cada arquivo assim que ele termina. Trabalhos na fila ou
+    interrompidos por um desligamento são retomados quando o lease expira,
+    sem repetir os arquivos já concluídos.
+
+    Com vários processos sobre o mesmo banco, cada trabalho é reivindicado
+    por um único gerenciador (JobStore.claim_job), que renova o heartbeat a
+    cada terço de lease_seconds. Trabalhos com heartbeat expirado voltam à
+    fila e são retomados por qualquer processo.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        files_dir: str,
+        workers: int = 2,
+        drain_timeout: float = 30.0,
+        retention_seconds: int = 7 * 24 * 60 * 60,
+        service: Optional[ExtractionService] = None,
+        cache: Optional[ExtractionCache] = None,
+        max_concurrency: Optional[int] = None,
+        file_timeout: Optional[float] = None,
+        lease_seconds: float = 60.0,
+    ):
+        """
+        Inicializa o gerenciador. O banco de dados só é aberto em start().
+
+        Args:
+            db_path: Caminho do arquivo SQLite com o estado dos trabalhos
+            files_dir: Diretório dos PDFs que aguardam processamento
+            workers: Número de trabalhos processados ao mesmo tempo
+            drain_timeout: Tempo máximo em segundos para concluir os trabalhos em andamento ao desligar
+            retention_seconds: Tempo em segundos que os trabalhos concluídos ficam disponíveis
+            service: Serviço de extração (padrão: o compartilhado pelos endpoints)
+            cache: Cache de resultados de extração (padrão: o compartilhado pelos endpoints)
+            max_concurrency: Arquivos de um trabalho extraídos ao mesmo tempo (padrão do lote)
+            file_timeout: Tempo limite de cada arquivo em segundos (padrão do lote)
+            lease_seconds: Tempo sem heartbeat após o qual um trabalho em execução volta à fila
+        """
+        self.db_path = db_path
+        self.files_dir = files_dir
+        self.workers = max(1, workers)
+        self.drain_timeout = drain_timeout
+        self.retention_seconds = retention_seconds
+        self.service = service or get_extraction_service()
+        self.cache = cache or get_extraction_cache()
+        self.max_concurrency = max_concurrency or BATCH_CONFIG["max_concurrency"]
+        self.file_timeout = file_timeout or BATCH_CONFIG["file_timeout"]
+        self.lease_seconds = lease_seconds
+        # Dono dos trabalhos reivindicados por este gerenciador
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._store: Optional[JobStore] = None
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> JobStore:
+        """Banco de dados dos trabalhos, aberto na primeira utilização"""
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = JobStore(self.db_path)
+        return self._store
+
+    @property
+    def running(self) -> bool:
+        """Indica se as threads de trabalho estão ativas"""
+        return bool(self._threads)
+
+    def start(self) -> None:
+        """
+        Inicia as threads de trabalho e retoma os trabalhos pendentes.
+
+        Remove também os trabalhos que passaram do tempo de retenção.
+        """
+        store = self.store
+        with self._lock:
+            if self._threads:
+                return
+
+            self._closed = False
+            self.purge()
+
+            # Cada geração de threads tem a sua fila e o seu sinal de parada
+            self._queue = queue.Queue()
+            self._stopping = threading.Event()
+            self._scan()
+
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(self._queue, self._stopping),
+                    name=f"job-worker-{index}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+        logger.info(f"Fila de trabalhos iniciada com {self.workers} thread(s)")
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """
+        Para de aceitar trabalhos e aguarda as extrações em andamento.
+
+        Trabalhos que ainda não começaram continuam na fila persistida. Os
+        trabalhos em andamento não iniciam novos arquivos e ficam RUNNING até o
+        lease expirar, quando são retomados por este ou por outro processo.
+
+        Args:
+            timeout: Tempo máximo de espera em segundos (padrão: drain_timeout)
+
+        Returns:
+            True se todas as threads de trabalho pararam a tempo
+        """
+        with self._lock:
+            self._closed = True
+            threads, self._threads = self._threads, []
+            self._stopping.set()
+
+        deadline = time.monotonic() + (self.drain_timeout if timeout is None else timeout)
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        drained = not any(thread.is_alive() for thread in threads)
+        if drained:
+            logger.info("Fila de trabalhos encerrada")
+        else:
+            logger.warning("Tempo de desligamento excedido; os trabalhos em andamento serão retomados quando o lease expirar")
+        return drained
+
+    def submit(
+        self,
+        files: List[Tuple[str, Optional[UploadBuffer], Optional[str]]],
+        export_format: str = "json",
+        bank_id: Optional[str] = None,
+    ) -> str:
+        """
+        Registra um trabalho e o coloca na fila.
+
+        Args:
+            files: Tuplas (nome, conteúdo, erro) na ordem de envio; arquivos
+                recusados têm conteúdo None e a mensagem de erro
+            export_format: Formato padrão do resultado (json, excel, csv, ndjson ou parquet)
+            bank_id: Banco emissor informado pelo cliente (opcional)
+
+        Returns:
+            Identificador do trabalho
+        """
+        if self._closed:
+            raise JobManagerClosedError("O serviço está sendo desligado e não aceita novos trabalhos")
+        self.start()
+
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.files_dir, job_id)
+        rows = []
+        try:
+            for idx, (filename, upload, error) in enumerate(files):
+                if upload is None:
+                    rows.append((filename, None, None, error))
+                else:
+                    path = upload.persist(os.path.join(job_dir, f"{idx}.pdf"))
+                    rows.append((filename, path, upload.sha256, None))
+
+            self.store.create_job(job_id, export_format, bank_id, rows, time.time())
+        except BaseException:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        self._queue.put(job_id)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a situação, o andamento e os tempos de um trabalho.
+
+        Args:
+            job_id: Identificador do trabalho
+
+        Returns:
+            Dicionário com os dados do trabalho ou None se não existir
+        """
+        job = self.store.get_job(job_id)
+        if job is None:
+            return None
+
+        files = self.store.get_files(job_id)
+        completed = sum(1 for file in files if file["status"] == COMPLETED)
+        failed = sum(1 for file in files if file["status"] == FAILED)
+        total = job["total_files"]
+
+        now = time.time()
+        started_at, finished_at = job["started_at"], job["finished_at"]
+
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "export_format": job["export_format"],
+            "bank_id": job["bank_id"],
+            "progress": {
+                "total": total,
+                "processed": completed + failed,
+                "completed": completed,
+                "failed": failed,
+                "percent": round(100 * (completed + failed) / total, 1) if total else 100.0,
+            },
+            "timings": {
+                "created_at": _isoformat(job["created_at"]),
+                "started_at": _isoformat(started_at),
+                "finished_at": _isoformat(finished_at),
+                "queued_seconds": _elapsed(job["created_at"], started_at or now),
+                "running_seconds": _elapsed(started_at, finished_at or now) if started_at else None,
+            },
+            "files": [
+                {
+                    "index": file["idx"],
+                    "filename": file["filename"],
+                    "status": file["status"],
+                    "error": file["error"],
+                    "duration_seconds": _elapsed(file["started_at"], file["finished_at"]) if file["started_at"] and file["finished_at"] else None,
+                }
+                for file in files
+            ],
+        }
+
+    def result(self, job_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Retorna os dados extraídos e os erros de um trabalho, na ordem de envio.
+
+        Args:
+            job_id: Identificador do trabalho
+
+        Returns:
+            Dicionário com as faturas extraídas e os erros por arquivo
+        """
+        faturas, erros = [], []
+        for file in self.store.get_files(job_id, with_results=True):
+            if file["status"] == COMPLETED:
+                faturas.append(file["result"])
+            elif file["status"] == FAILED:
+                erros.append({"indice": file["idx"], "arquivo": file["filename"], "erro": file["error"]})
+        return {"faturas": faturas, "erros": erros}
+
+    def purge(self) -> int:
+        """
+        Remove os trabalhos concluídos há mais tempo que o de retenção.
+
+        Returns:
+            Número de trabalhos removidos
+        """
+        job_ids = self.store.purge(time.time() - self.retention_seconds)
+        for job_id in job_ids:
+            shutil.rmtree(os.path.join(self.files_dir, job_id), ignore_errors=True)
+        return len(job_ids)
+
+    def _scan(self) -> None:
+        """
+        Devolve à fila os trabalhos com heartbeat expirado e coloca na fila
+        local os trabalhos que aguardam (inclusive os enviados a outros
+        processos; quem chegar primeiro os reivindica).
+        """
+        store = self.store
+        now = time.time()
+        self._last_scan = now
+        requeued = store.requeue_expired(now - self.lease_seconds)
+        if requeued:
+            logger.info(f"{requeued} trabalho(s) interrompido(s) devolvido(s) à fila")
+        for job_id in store.queued_job_ids():
+            self._queue.put(job_id)
+
+    def _worker(self, jobs: "queue.Queue[str]", stopping: threading.Event) -> None:
+        """Laço de uma thread de trabalho: cada trabalho roda em um loop de eventos próprio"""
+        while not stopping.is_set():
+            try:
+                job_id = jobs.get(timeout=0.5)
+            except queue.Empty:
+                # Fila local vazia: procura trabalhos abandonados por outros processos
+                with self._lock:
+                    if jobs is self._queue and time.time() - self._last_scan >= self.lease_seconds:
+                        self._scan()
+                continue
+            if stopping.is_set():
+                # O trabalho continua na fila persistida
+                break
+
+            try:
+                asyncio.run(self._run_job(job_id, stopping))
+            except Exception as e:
+                logger.error(f"Erro ao executar o trabalho {job_id}: {str(e)}")
+                metrics.record_error("jobs", e)
+
+    async def _run_job(self, job_id: str, stopping: threading.Event) -> None:
+        """Extrai os arquivos pendentes de um trabalho e registra o resultado"""
+        store = self.store
+        job = store.get_job(job_id)
+        # Só executa o trabalho se a reivindicação atômica der certo (outro processo pode tê-lo pego)
+        if job is None or not store.claim_job(job_id, self.owner, time.time()):
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            await self._run_files(job_id, job, stopping)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renova o heartbeat do trabalho enquanto ele roda"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.store.heartbeat(job_id, self.owner, time.time()):
+                logger.warning(f"O trabalho {job_id} não pertence mais a este processo")
+                return
+
+    async def _run_files(self, job_id: str, job: Dict[str, Any], stopping: threading.Event) -> None:
+        """
+        Extrai os arquivos pendentes de um trabalho já reivindicado.
+
+        Durante o desligamento, os arquivos que faltam não são iniciados nem
+        marcados como falhos: o trabalho fica RUNNING, o heartbeat para e,
+        quando o lease expira, requeue_expired o devolve à fila.
+        """
+        store = self.store
+        pending = [file for file in store.get_files(job_id) if file["status"] in (PENDING, RUNNING)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        interrupted = False
+
+        async def process_file(file: Dict[str, Any]) -> None:
+            nonlocal interrupted
+            async with semaphore:
+                if stopping.is_set() or not store.start_file(job_id, self.owner, file["idx"], time.time()):
+                    interrupted = True
+                    return
+                try:
+                    data = await self._extract(file, job["bank_id"])
+                except Exception as e:
+                    if isinstance(e, ExtractionServiceClosedError) or stopping.is_set():
+                        # Erro causado pelo desligamento: o arquivo é refeito quando o trabalho for retomado
+                        interrupted = True
+                        return
+                    logger.warning(f"Erro ao processar {file['filename']} do trabalho {job_id}: {str(e)}")
+                    metrics.record_error("jobs", e)
+                    store.fail_file(job_id, self.owner, file["idx"], str(e) or type(e).__name__, time.time())
+                else:
+                    store.complete_file(job_id, self.owner, file["idx"], data, time.time())
+
+        await asyncio.gather(*[process_file(file) for file in pending])
+        if interrupted:
+            logger.info(f"Trabalho {job_id} interrompido; será retomado quando o lease expirar")
+            return
+
+        completed = any(file["status"] == COMPLETED for file in store.get_files(job_id))
+        if store.finish_job(job_id, self.owner, COMPLETED if completed else FAILED, time.time()):
+            shutil.rmtree(os.path.join(self.files_dir, job_id), ignore_errors=True)
+
+    async def _extract(self, file: Dict[str, Any], bank_id: Optional[str]) -> Dict[str, Any]:
+        """
+        Extrai um arquivo do trabalho, reaproveitando o cache de resultados.
+
+        Usa apenas get/set_async do cache: get_or_compute deduplica as chamadas com
+        futures do loop de eventos da aplicação, e cada trabalho roda em um loop
+        próprio.
+        """
+        cache_key = ExtractionCache.make_key_from_digest(
+            file["sha256"], get_pattern_registry().version, "extract", bank_id or "auto", get_categorizer().version,
+            get_merchant_dictionary().overrides_version,
+        )
+        data = self.cache.get(cache_key)
+        if data is None:
+            data = await self.service.extract(file["path"], bank_id, timeout=self.file_timeout, name=file["filename"])
+            await self.cache.set_async(cache_key, data)
+        return data
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    """Converte um horário (epoch) para ISO 8601"""
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds") if timestamp else None
+
+
+def _elapsed(start: float, end: float) -> float:
+    """Diferença em segundos, arredondada em milissegundos"""
+    return round(max(0.0, end - start), 3)
+
+
+job_manager = JobManager(**JOBS_CONFIG)
+
+
+def get_job_manager() -> JobManager:
+    """
+    Retorna a fila de trabalhos compartilhada pelos endpoints.
+
+    Returns:
+        Instância de JobManager
+    """
+    return job_manager
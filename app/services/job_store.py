@@ -0,0 +1,298 @@
+"""
+Persistência dos trabalhos de extração assíncronos em um arquivo SQLite local.
+"""
+import os
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    export_format TEXT NOT NULL,
+    bank_id TEXT,
+    total_files INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT,
+    sha256 TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    result TEXT,
+    started_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+"""
+
+# Colunas acrescentadas depois da primeira versão do esquema (bancos já existentes)
+MIGRATIONS = {
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "heartbeat": "ALTER TABLE jobs ADD COLUMN heartbeat REAL",
+}
+
+# Situações de um trabalho e de cada arquivo
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+PENDING = "pending"
+
+# Restringe a escrita de um arquivo ao processo que ainda detém o trabalho
+_OWNED = " AND EXISTS (SELECT 1 FROM jobs WHERE jobs.id = job_files.job_id AND jobs.owner = ? AND jobs.status = ?)"
+
+
+class JobStore:
+    """
+    Estado dos trabalhos e dos seus arquivos em SQLite.
+
+    Uma única conexão (modo WAL) é compartilhada pelas threads da aplicação,
+    protegida por um lock; as operações são pequenas e não justificam um
+    pool de conexões.
+
+    Vários processos (workers do uvicorn) podem usar o mesmo arquivo. Um
+    trabalho só roda depois de reivindicado (claim_job): a troca de queued
+    para running é atômica, registra o dono e um horário de heartbeat que o
+    dono renova enquanto executa. Só voltam à fila os trabalhos cujo
+    heartbeat expirou.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Abre (ou cria) o banco de dados.
+
+        Args:
+            db_path: Caminho do arquivo SQLite
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                self._conn.execute(statement)
+
+    def create_job(
+        self,
+        job_id: str,
+        export_format: str,
+        bank_id: Optional[str],
+        files: List[Tuple[str, Optional[str], Optional[str], Optional[str]]],
+        created_at: float,
+    ) -> None:
+        """
+        Registra um trabalho novo.
+
+        Args:
+            job_id: Identificador do trabalho
+            export_format: Formato padrão do resultado (json, excel, csv, ndjson ou parquet)
+            bank_id: Banco informado pelo cliente (opcional)
+            files: Tuplas (nome, caminho, sha256, erro) de cada arquivo; arquivos
+                recusados no envio têm caminho None e a mensagem de erro
+            created_at: Horário de criação (epoch)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, status, export_format, bank_id, total_files, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, export_format, bank_id, len(files), created_at),
+                )
+                self._conn.executemany(
+                    "INSERT INTO job_files (job_id, idx, filename, path, sha256, status, error, finished_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (job_id, idx, filename, path, sha256, FAILED if error else PENDING, error, created_at if error else None)
+                        for idx, (filename, path, sha256, error) in enumerate(files)
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna os dados de um trabalho ou None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_files(self, job_id: str, with_results: bool = False) -> List[Dict[str, Any]]:
+        """
+        Retorna os arquivos de um trabalho na ordem de envio.
+
+        Args:
+            job_id: Identificador do trabalho
+            with_results: Inclui os dados extraídos de cada arquivo
+
+        Returns:
+            Lista de dicionários com os dados de cada arquivo
+        """
+        columns = "idx, filename, path, sha256, status, error, started_at, finished_at"
+        if with_results:
+            columns += ", result"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM job_files WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+
+        files = []
+        for row in rows:
+            item = dict(row)
+            if with_results and item["result"] is not None:
+                item["result"] = json.loads(item["result"])
+            files.append(item)
+        return files
+
+    def queued_job_ids(self) -> List[str]:
+        """Trabalhos na fila, do mais antigo para o mais novo"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def claim_job(self, job_id: str, owner: str, now: float) -> bool:
+        """
+        Reivindica um trabalho da fila para execução (mantém o primeiro horário de início).
+
+        Args:
+            job_id: Identificador do trabalho
+            owner: Identificador de quem executa (processo e gerenciador)
+            now: Horário atual (epoch), usado como início e primeiro heartbeat
+
+        Returns:
+            True se o trabalho estava na fila e passou a pertencer a owner
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, heartbeat = ?, started_at = COALESCE(started_at, ?) "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, owner, now, now, job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: str, owner: str, now: float) -> bool:
+        """
+        Renova o heartbeat de um trabalho em execução.
+
+        Returns:
+            False se o trabalho não pertence mais a owner
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND owner = ? AND status = ?",
+                (now, job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def finish_job(self, job_id: str, owner: str, status: str, finished_at: float) -> bool:
+        """
+        Registra o fim do trabalho, se ele ainda pertence a owner.
+
+        Returns:
+            True se o fim foi registrado
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, owner = NULL WHERE id = ? AND owner = ? AND status = ?",
+                (status, finished_at, job_id, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def start_file(self, job_id: str, owner: str, idx: int, started_at: float) -> bool:
+        """Marca um arquivo como em processamento, se o trabalho ainda pertence a owner"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE job_files SET status = ?, started_at = ? WHERE job_id = ? AND idx = ?" + _OWNED,
+                (RUNNING, started_at, job_id, idx, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def complete_file(self, job_id: str, owner: str, idx: int, result: Dict[str, Any], finished_at: float) -> bool:
+        """Grava os dados extraídos de um arquivo, se o trabalho ainda pertence a owner"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE job_files SET status = ?, result = ?, error = NULL, finished_at = ? WHERE job_id = ? AND idx = ?"
+                + _OWNED,
+                (COMPLETED, json.dumps(result, ensure_ascii=False), finished_at, job_id, idx, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def fail_file(self, job_id: str, owner: str, idx: int, error: str, finished_at: float) -> bool:
+        """Registra o erro de um arquivo, se o trabalho ainda pertence a owner"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE job_files SET status = ?, error = ?, finished_at = ? WHERE job_id = ? AND idx = ?" + _OWNED,
+                (FAILED, error, finished_at, job_id, idx, owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def requeue_expired(self, expired_before: float) -> int:
+        """
+        Devolve à fila os trabalhos cujo dono parou de renovar o heartbeat
+        (processo encerrado ou desligamento no meio do trabalho).
+
+        Args:
+            expired_before: Heartbeats anteriores a este horário (epoch) estão expirados
+
+        Returns:
+            Número de trabalhos devolvidos à fila
+        """
+        expired = "SELECT id FROM jobs WHERE status = ? AND (heartbeat IS NULL OR heartbeat < ?)"
+        with self._lock:
+            # BEGIN IMMEDIATE: outro processo não renova nem reivindica no meio da troca
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    f"UPDATE job_files SET status = ?, started_at = NULL WHERE status = ? AND job_id IN ({expired})",
+                    (PENDING, RUNNING, RUNNING, expired_before),
+                )
+                cursor = self._conn.execute(
+                    f"UPDATE jobs SET status = ?, owner = NULL WHERE id IN ({expired})",
+                    (QUEUED, RUNNING, expired_before),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def purge(self, finished_before: float) -> List[str]:
+        """
+        Remove os trabalhos concluídos antes de um horário.
+
+        Args:
+            finished_before: Horário limite (epoch)
+
+        Returns:
+            Identificadores dos trabalhos removidos
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (finished_before,)
+            ).fetchall()
+            job_ids = [row["id"] for row in rows]
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+        return job_ids
+
+    def close(self) -> None:
+        """Fecha a conexão com o banco de dados"""
+        with self._lock:
+            self._conn.close()
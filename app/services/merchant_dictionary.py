@@ -0,0 +1,647 @@
+"""
+Dicionário persistente de estabelecimentos: descrição original da transação
+para descrição limpa e categoria.
+
+Os mesmos estabelecimentos se repetem em todas as faturas, então o resultado
+da limpeza e da categorização é gravado em um arquivo compacto, mapeado em
+memória (mmap) por todos os processos, com consulta O(1). As regras de
+palavras-chave só são usadas para os estabelecimentos ainda desconhecidos.
+
+Com learn ativado, os estabelecimentos novos ficam em um buffer e vão para
+o diário em uma única escrita ao fim de cada documento. Quando o diário passa de
+journal_max_bytes, o processo que o gravou faz a compactação.
+
+Uso (compactação e reconstrução offline):
+    python -m app.services.merchant_dictionary compact
+    python -m app.services.merchant_dictionary rebuild
+    python -m app.services.merchant_dictionary stats
+"""
+import os
+import re
+import sys
+import json
+import atexit
+import mmap
+import time
+import zlib
+import struct
+import logging
+import argparse
+import threading
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from app.core.config import MERCHANT_DICTIONARY_CONFIG
+from app.services.categorizer import get_categorizer
+from app.services.pattern_registry import get_pattern_registry
+from app.utils.reloadable_file import ReloadableJSONFile
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalho: assinatura, versão do formato, reservado, entradas, buckets, tamanho dos metadados
+HEADER = struct.Struct('<4sHHIII')
+MAGIC = b'GZMD'
+FORMAT_VERSION = 1
+# Cada bucket guarda o deslocamento (u32) de um registro; 0 indica bucket vazio
+BUCKET = struct.Struct('<I')
+# Registro: tamanho da chave, da descrição e da categoria (NO_CATEGORY se não houver)
+RECORD = struct.Struct('<HHH')
+NO_CATEGORY = 0xFFFF
+# Separador entre o escopo (regras de limpeza do banco) e a descrição na chave
+SCOPE_SEPARATOR = '\x1f'
+# Formato das chaves (muda quando merchant_key muda; tabelas antigas são ignoradas)
+KEY_VERSION = 2
+# Marcadores de parcela ("PARC 02/10", "PARCELA 2 DE 10", "02/10") e demais dígitos ficam fora da chave
+INSTALLMENT_PATTERN = re.compile(r'\bparc(?:ela)?\.?\s*\d+\s*(?:/|de\b)\s*\d+|\d+\s*/\s*\d+')
+DIGITS_PATTERN = re.compile(r'\d+')
+
+
+class MerchantEntry(NamedTuple):
+    """Descrição limpa e categoria de um estabelecimento"""
+    descricao: str
+    categoria: Optional[str]
+
+
+def merchant_key(scope: str, description: str) -> Optional[str]:
+    """
+    Chave normalizada de um estabelecimento: sem diferenciar maiúsculas, sem
+    marcadores de parcela e sem dígitos, para que as compras parceladas e os
+    códigos de cada compra não criem uma entrada por transação.
+
+    Args:
+        scope: Regras de limpeza aplicadas (banco_do_brasil ou generic)
+        description: Descrição original da transação
+
+    Returns:
+        Chave do dicionário ou None se não sobrar texto (descrição só com números)
+    """
+    description = DIGITS_PATTERN.sub('', INSTALLMENT_PATTERN.sub(' ', description.casefold()))
+    description = ' '.join(description.split())
+    return f"{scope}{SCOPE_SEPARATOR}{description}" if description else None
+
+
+class MerchantTable:
+    """
+    Tabela hash somente leitura sobre um arquivo mapeado em memória.
+
+    O arquivo tem um cabeçalho, os metadados em JSON (versões das regras
+    usadas na construção), um vetor de buckets com endereçamento aberto e os
+    registros. Como o arquivo é mapeado e nunca alterado no lugar (a
+    compactação grava um arquivo novo e o troca atomicamente), todos os
+    processos compartilham as mesmas páginas do cache do sistema operacional.
+    """
+
+    def __init__(self, path: str):
+        """
+        Abre e mapeia o arquivo.
+
+        Args:
+            path: Caminho para o arquivo do dicionário
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.count, self.bucket_count, meta_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Arquivo de dicionário inválido: {path}")
+
+        meta_start = HEADER.size
+        self.meta: Dict[str, Any] = json.loads(self._mm[meta_start:meta_start + meta_size].decode('utf-8'))
+        self._buckets_start = meta_start + _padded(meta_size)
+        self._mask = self.bucket_count - 1
+
+    def get(self, key: str) -> Optional[MerchantEntry]:
+        """
+        Busca uma chave na tabela.
+
+        Args:
+            key: Chave normalizada (ver merchant_key)
+
+        Returns:
+            Entrada encontrada ou None
+        """
+        raw_key = key.encode('utf-8')
+        index = zlib.crc32(raw_key) & self._mask
+        mm = self._mm
+        for _ in range(self.bucket_count):
+            offset = BUCKET.unpack_from(mm, self._buckets_start + index * BUCKET.size)[0]
+            if offset == 0:
+                return None
+            key_size, description_size, category_size = RECORD.unpack_from(mm, offset)
+            start = offset + RECORD.size
+            if mm[start:start + key_size] == raw_key:
+                return self._entry(start + key_size, description_size, category_size)
+            index = (index + 1) & self._mask
+        return None
+
+    def items(self) -> Iterator[Tuple[str, MerchantEntry]]:
+        """Percorre todos os registros da tabela"""
+        mm = self._mm
+        for index in range(self.bucket_count):
+            offset = BUCKET.unpack_from(mm, self._buckets_start + index * BUCKET.size)[0]
+            if offset == 0:
+                continue
+            key_size, description_size, category_size = RECORD.unpack_from(mm, offset)
+            start = offset + RECORD.size
+            key = mm[start:start + key_size].decode('utf-8')
+            yield key, self._entry(start + key_size, description_size, category_size)
+
+    def _entry(self, start: int, description_size: int, category_size: int) -> MerchantEntry:
+        """Decodifica a descrição e a categoria de um registro"""
+        mm = self._mm
+        description = mm[start:start + description_size].decode('utf-8')
+        if category_size == NO_CATEGORY:
+            return MerchantEntry(description, None)
+        start += description_size
+        return MerchantEntry(description, mm[start:start + category_size].decode('utf-8'))
+
+    def close(self) -> None:
+        """Desfaz o mapeamento do arquivo"""
+        self._mm.close()
+
+    @staticmethod
+    def write(path: str, entries: Dict[str, MerchantEntry], meta: Dict[str, Any]) -> None:
+        """
+        Grava uma tabela nova de forma atômica.
+
+        Args:
+            path: Caminho do arquivo do dicionário
+            entries: Entradas por chave normalizada
+            meta: Metadados (versões das regras usadas)
+        """
+        bucket_count = 8
+        while bucket_count < 2 * len(entries):
+            bucket_count *= 2
+        mask = bucket_count - 1
+
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        buckets_start = HEADER.size + _padded(len(meta_bytes))
+        offset = buckets_start + bucket_count * BUCKET.size
+
+        buckets = [0] * bucket_count
+        records = []
+        for key, entry in entries.items():
+            raw_key = key.encode('utf-8')
+            description = entry.descricao.encode('utf-8')
+            category = entry.categoria.encode('utf-8') if entry.categoria is not None else b''
+            if max(len(raw_key), len(description), len(category)) >= NO_CATEGORY:
+                continue
+
+            index = zlib.crc32(raw_key) & mask
+            while buckets[index]:
+                index = (index + 1) & mask
+            buckets[index] = offset
+
+            category_size = len(category) if entry.categoria is not None else NO_CATEGORY
+            record = RECORD.pack(len(raw_key), len(description), category_size) + raw_key + description + category
+            records.append(record)
+            offset += len(record)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(records), bucket_count, len(meta_bytes)))
+                file.write(meta_bytes.ljust(_padded(len(meta_bytes)), b'\0'))
+                file.write(b''.join(BUCKET.pack(bucket) for bucket in buckets))
+                file.writelines(records)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+class OverrideSnapshot(NamedTuple):
+    """Correções indexadas pela descrição normalizada e a versão de cache do arquivo"""
+    merchants: Dict[str, Dict[str, Any]]
+    cache_version: str
+
+
+class MerchantOverrides(ReloadableJSONFile[OverrideSnapshot]):
+    """
+    Correções do usuário por estabelecimento, aplicadas sobre o resultado do
+    dicionário e das regras. A chave é a descrição limpa, sem diferenciar
+    maiúsculas e espaços.
+    """
+
+    description = "arquivo de correções de estabelecimentos"
+
+    def _build(self, data: Dict[str, Any], digest: str, mtime: float) -> OverrideSnapshot:
+        """Indexa as correções pela descrição normalizada"""
+        overrides = {}
+        for merchant in data.get("merchants", []):
+            if not isinstance(merchant, dict) or not merchant.get("match"):
+                raise ValueError(f"Correção de estabelecimento inválida: {merchant!r}")
+            overrides[_override_key(merchant["match"])] = merchant
+        # O digest muda a cada edição, mesmo sem alterar o campo version
+        return OverrideSnapshot(overrides, f"{data.get('version', 0)}.{digest[:8]}")
+
+    @property
+    def version(self) -> str:
+        """Versão de cache do snapshot atual"""
+        return self.snapshot().cache_version
+
+
+class MerchantDictionary:
+    """
+    Dicionário de estabelecimentos compartilhado pelos processos.
+
+    A consulta verifica a tabela mapeada em memória e, em seguida, os
+    estabelecimentos aprendidos pelo próprio processo. Os estabelecimentos
+    novos são anotados em um diário (uma linha JSON por estabelecimento) que
+    a compactação incorpora à tabela: offline (linha de comando) ou
+    automaticamente quando o diário passa de journal_max_bytes. A tabela só é usada se tiver
+    sido construída com as versões atuais dos padrões dos bancos e das regras
+    de categorias; caso contrário, tudo volta a passar pelas regras até a
+    próxima reconstrução.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        journal_path: str,
+        overrides_path: Optional[str] = None,
+        learn: bool = False,
+        check_interval: float = 2.0,
+        max_learned: int = 50000,
+        journal_flush_entries: int = 256,
+        journal_max_bytes: int = 1024 * 1024,
+    ):
+        """
+        Inicializa o dicionário.
+
+        Args:
+            path: Caminho do arquivo da tabela
+            journal_path: Caminho do diário de estabelecimentos novos
+            overrides_path: Caminho do arquivo JSON de correções do usuário
+            learn: Se os estabelecimentos novos devem ser anotados no diário (desativado por padrão)
+            check_interval: Intervalo mínimo em segundos entre verificações da tabela
+            max_learned: Número máximo de estabelecimentos aprendidos mantidos em memória
+            journal_flush_entries: Estabelecimentos novos acumulados antes de gravar o diário
+            journal_max_bytes: Tamanho do diário que dispara a compactação (0 desativa)
+        """
+        self.path = path
+        self.journal_path = journal_path
+        self.learn_enabled = learn
+        self.check_interval = check_interval
+        self.max_learned = max_learned
+        self.journal_flush_entries = journal_flush_entries
+        self.journal_max_bytes = journal_max_bytes
+        self.overrides = MerchantOverrides(overrides_path, check_interval) if overrides_path else None
+
+        self._table: Optional[MerchantTable] = None
+        self._table_usable = False
+        self._last_check = 0.0
+        self._learned: Dict[str, MerchantEntry] = {}
+        self._versions: Optional[Tuple[str, str]] = None
+        self._journal_buffer: List[str] = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def current_versions() -> Tuple[str, str]:
+        """Versões atuais dos padrões dos bancos e das regras de categorias"""
+        return get_pattern_registry().version, get_categorizer().version
+
+    @property
+    def overrides_version(self) -> str:
+        """Versão de cache das correções do usuário (compõe a chave do cache de extração)"""
+        if self.overrides is None:
+            return "-"
+        try:
+            return self.overrides.version
+        except (OSError, ValueError):
+            return "-"
+
+    def lookup(self, scope: str, description: str) -> Optional[MerchantEntry]:
+        """
+        Busca um estabelecimento pela descrição original.
+
+        Args:
+            scope: Regras de limpeza aplicadas (banco_do_brasil ou generic)
+            description: Descrição original da transação
+
+        Returns:
+            Entrada com a descrição limpa e a categoria, ou None se desconhecido
+        """
+        self._refresh()
+        key = merchant_key(scope, description)
+
+        entry = self._table.get(key) if self._table_usable and key is not None else None
+        if entry is None and key is not None:
+            entry = self._learned.get(key)
+
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def learn(self, scope: str, description: str, entry: MerchantEntry) -> None:
+        """
+        Registra um estabelecimento resolvido pelas regras. A linha do diário
+        fica no buffer até flush_journal ou até juntar journal_flush_entries.
+
+        Args:
+            scope: Regras de limpeza aplicadas
+            description: Descrição original da transação
+            entry: Descrição limpa e categoria calculadas
+        """
+        key = merchant_key(scope, description)
+        if key is None:
+            return
+        with self._lock:
+            if key in self._learned:
+                return
+            if len(self._learned) >= self.max_learned:
+                self._learned.clear()
+            self._learned[key] = entry
+            if not self.learn_enabled:
+                return
+            self._journal_buffer.append(json.dumps({"scope": scope, "descricao": description}, ensure_ascii=False) + "\n")
+            full = len(self._journal_buffer) >= self.journal_flush_entries
+
+        if full:
+            self._write_journal()
+
+    def flush_journal(self) -> None:
+        """
+        Grava os estabelecimentos pendentes no diário e compacta o diário se
+        ele passou de journal_max_bytes. Chamado ao fim de cada documento.
+        """
+        if not self._write_journal() or not self.journal_max_bytes:
+            return
+        try:
+            size = os.path.getsize(self.journal_path)
+        except OSError:
+            return
+        if size > self.journal_max_bytes:
+            try:
+                summary = compact(self, blocking=False)
+            except Exception as e:
+                logger.warning(f"Erro ao compactar o dicionário de estabelecimentos: {str(e)}")
+                return
+            if summary is not None:
+                logger.info(f"Dicionário de estabelecimentos compactado: {summary['total']} estabelecimentos")
+
+    def _write_journal(self) -> bool:
+        """Grava o buffer no diário; retorna True se algo foi gravado"""
+        with self._lock:
+            lines, self._journal_buffer = self._journal_buffer, []
+        if not lines:
+            return False
+
+        try:
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            # Uma única escrita em modo append: os blocos de processos diferentes não se misturam
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, "".join(lines).encode('utf-8'))
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.warning(f"Erro ao gravar o diário de estabelecimentos: {str(e)}")
+            return False
+        return True
+
+    def override(self, description: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a correção do usuário para uma descrição limpa.
+
+        Args:
+            description: Descrição limpa da transação
+
+        Returns:
+            Correção com "descricao" e/ou "categoria", ou None
+        """
+        if self.overrides is None:
+            return None
+        try:
+            return self.overrides.snapshot().merchants.get(_override_key(description))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Correções de estabelecimentos indisponíveis: {str(e)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do dicionário.
+
+        Returns:
+            Dicionário com acertos, falhas e tamanho da tabela
+        """
+        self._refresh()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "table_entries": self._table.count if self._table else 0,
+            "table_usable": self._table_usable,
+            "learned_entries": len(self._learned),
+            "journal_pending": len(self._journal_buffer),
+        }
+
+    def _refresh(self) -> None:
+        """Reabre a tabela se o arquivo mudou e confere as versões das regras"""
+        now = time.monotonic()
+        if self._versions is not None and now - self._last_check < self.check_interval:
+            return
+
+        with self._lock:
+            self._last_check = now
+
+            versions = self.current_versions()
+            if versions != self._versions:
+                # Regras novas: o que foi aprendido com as antigas não vale mais
+                self._learned.clear()
+                self._versions = versions
+
+            try:
+                stat = os.stat(self.path)
+                identity = (stat.st_ino, stat.st_mtime_ns)
+            except OSError:
+                identity = None
+
+            if identity is None:
+                self._close_table()
+            elif self._table is None or self._table.identity != identity:
+                self._close_table()
+                try:
+                    self._table = MerchantTable(self.path)
+                    # Permite o aviso abaixo se a tabela nova estiver desatualizada
+                    self._table_usable = True
+                except (OSError, ValueError) as e:
+                    logger.error(f"Erro ao abrir o dicionário de estabelecimentos: {str(e)}")
+
+            if self._table is not None:
+                usable = _built_with(self._table.meta, versions)
+                if not usable and self._table_usable:
+                    logger.warning("Dicionário de estabelecimentos construído com regras antigas; execute a reconstrução")
+                self._table_usable = usable
+            else:
+                self._table_usable = False
+
+    def _close_table(self) -> None:
+        """Fecha a tabela atual (quem ainda a usa mantém o mapeamento válido até terminar)"""
+        self._table = None
+        self._table_usable = False
+
+
+def _override_key(description: str) -> str:
+    """Chave das correções: descrição sem diferenciar maiúsculas e espaços"""
+    return " ".join(description.split()).upper()
+
+
+def _built_with(meta: Dict[str, Any], versions: Tuple[str, str]) -> bool:
+    """Se a tabela foi construída com o formato de chave e as versões das regras atuais"""
+    return (meta.get("key_version"), meta.get("patterns_version"), meta.get("rules_version")) == (KEY_VERSION, *versions)
+
+
+def _padded(size: int) -> int:
+    """Arredonda um tamanho para múltiplo de 4 bytes (alinhamento dos buckets)"""
+    return (size + 3) & ~3
+
+
+def compact(dictionary: Optional[MerchantDictionary] = None, rebuild: bool = False, blocking: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Incorpora o diário à tabela e grava um arquivo novo.
+
+    Os estabelecimentos do diário são resolvidos com as regras atuais. As
+    entradas já existentes são mantidas se a tabela tiver sido construída
+    com as versões atuais das regras; caso contrário (ou com rebuild=True),
+    todas são recalculadas. Um arquivo de trava impede duas compactações ao
+    mesmo tempo.
+
+    Args:
+        dictionary: Dicionário a compactar (o compartilhado se None)
+        rebuild: Recalcula todas as entradas, mesmo com as regras atuais
+        blocking: Aguarda outra compactação em andamento (se False, retorna None)
+
+    Returns:
+        Resumo com o número de entradas mantidas, recalculadas e o total
+    """
+    dictionary = dictionary or get_merchant_dictionary()
+    dictionary._write_journal()
+
+    os.makedirs(os.path.dirname(dictionary.path) or '.', exist_ok=True)
+    with open(f"{dictionary.path}.lock", 'a') as lock_file:
+        if not _lock_file(lock_file, blocking):
+            return None
+        return _compact_locked(dictionary, rebuild)
+
+
+def _lock_file(lock_file: Any, blocking: bool) -> bool:
+    """Trava exclusiva entre processos (liberada ao fechar o arquivo)"""
+    try:
+        import fcntl
+    except ImportError:
+        # Sem flock (Windows): só a compactação pela linha de comando é segura
+        return blocking
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _compact_locked(dictionary: MerchantDictionary, rebuild: bool) -> Dict[str, Any]:
+    """Compactação propriamente dita (ver compact), com a trava já obtida"""
+    from app.services.pdf_extractor import PDFExtractor
+
+    versions = MerchantDictionary.current_versions()
+
+    # O diário é renomeado antes da leitura; os processos passam a gravar em um diário novo
+    pending_path = f"{dictionary.journal_path}.compacting"
+    if os.path.exists(dictionary.journal_path):
+        os.replace(dictionary.journal_path, pending_path)
+
+    entries: Dict[str, MerchantEntry] = {}
+    to_resolve: Dict[str, List[str]] = {}
+
+    if os.path.exists(dictionary.path):
+        table = MerchantTable(dictionary.path)
+        try:
+            current = _built_with(table.meta, versions)
+            for key, entry in table.items():
+                if current and not rebuild:
+                    entries[key] = entry
+                else:
+                    scope, description = key.split(SCOPE_SEPARATOR, 1)
+                    to_resolve.setdefault(scope, []).append(description)
+        finally:
+            table.close()
+    kept = len(entries)
+
+    if os.path.exists(pending_path):
+        with open(pending_path, 'r', encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                    scope, description = record["scope"], record["descricao"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if merchant_key(scope, description) not in entries:
+                    to_resolve.setdefault(scope, []).append(description)
+
+    extractor = PDFExtractor()
+    resolved = 0
+    for scope, descriptions in to_resolve.items():
+        # Uma descrição por chave (as parcelas e os códigos de um estabelecimento são resolvidos uma vez)
+        by_key = {merchant_key(scope, description): description for description in descriptions}
+        by_key.pop(None, None)
+        for key, entry in zip(by_key, extractor.resolve_merchants(scope, list(by_key.values()))):
+            entries[key] = entry
+            resolved += 1
+
+    meta = {
+        "key_version": KEY_VERSION,
+        "patterns_version": versions[0],
+        "rules_version": versions[1],
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    MerchantTable.write(dictionary.path, entries, meta)
+
+    if os.path.exists(pending_path):
+        os.remove(pending_path)
+
+    return {"kept": kept, "resolved": resolved, "total": len(entries)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Linha de comando para compactar, reconstruir e inspecionar o dicionário"""
+    parser = argparse.ArgumentParser(description="Dicionário de estabelecimentos")
+    parser.add_argument("command", choices=["compact", "rebuild", "stats"])
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print(json.dumps(get_merchant_dictionary().stats(), indent=2))
+        return 0
+
+    summary = compact(rebuild=args.command == "rebuild")
+    print(
+        f"Dicionário gravado em {get_merchant_dictionary().path}: {summary['total']} estabelecimentos "
+        f"({summary['kept']} mantidos, {summary['resolved']} recalculados)"
+    )
+    return 0
+
+
+merchant_dictionary = MerchantDictionary(**MERCHANT_DICTIONARY_CONFIG)
+# Estabelecimentos ainda no buffer quando o processo termina
+atexit.register(merchant_dictionary._write_journal)
+
+
+def get_merchant_dictionary() -> MerchantDictionary:
+    """
+    Retorna o dicionário de estabelecimentos compartilhado pelo processo.
+
+    Returns:
+        Instância de MerchantDictionary
+    """
+    return merchant_dictionary
+
+
+if __name__ == "__main__":
+    sys.exit(main())
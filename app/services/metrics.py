@@ -0,0 +1,332 @@
+"""
+Métricas da aplicação (contadores e histogramas) expostas no formato de
+texto do Prometheus, sem dependências nem serviços externos.
+
+Registrar um valor custa uma busca em dicionário e uma soma sob um lock;
+o texto só é montado quando alguém consulta GET /api/metrics. Os processos
+do pool de extração registram nas suas próprias cópias das métricas e
+devolvem os incrementos junto com o resultado de cada tarefa (ver
+collect_worker_deltas), que o processo principal soma às suas.
+"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from app.core.config import METRICS_CONFIG
+
+# Limites dos histogramas
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Amostras de um coletor: (nome, tipo, descrição, [(rótulos, valor)])
+CollectedMetric = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    """Contador monotônico com rótulos"""
+
+    type = "counter"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """
+        Incrementa o contador.
+
+        Args:
+            labels: Valores dos rótulos, na ordem de labelnames
+            amount: Valor somado
+        """
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Valor atual do contador para os rótulos"""
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def drain(self) -> Dict[LabelValues, float]:
+        """Retorna os valores acumulados e zera o contador"""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[LabelValues, float]) -> None:
+        """Soma valores drenados de outro processo"""
+        with self._lock:
+            for labels, amount in values.items():
+                self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """Amostras no formato de exposição"""
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, amount in values:
+            yield f"{self.name}_total", dict(zip(self.labelnames, labels)), amount
+
+
+class Histogram:
+    """Histograma com limites fixos e rótulos"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        # Por rótulos: [contagem de cada faixa (a última é +Inf), soma, total]
+        self._values: Dict[LabelValues, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Registra uma observação.
+
+        Args:
+            value: Valor observado
+            labels: Valores dos rótulos, na ordem de labelnames
+        """
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels: str) -> int:
+        """Número de observações para os rótulos"""
+        with self._lock:
+            entry = self._values.get(labels)
+            return entry[2] if entry else 0
+
+    def drain(self) -> Dict[LabelValues, List[Any]]:
+        """Retorna as observações acumuladas e zera o histograma"""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[LabelValues, List[Any]]) -> None:
+        """Soma observações drenadas de outro processo"""
+        with self._lock:
+            for labels, (counts, total, count) in values.items():
+                entry = self._values.get(labels)
+                if entry is None:
+                    entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                entry[0] = [current + extra for current, extra in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """Amostras no formato de exposição (faixas acumuladas, soma e total)"""
+        with self._lock:
+            values = sorted((labels, (list(entry[0]), entry[1], entry[2])) for labels, entry in self._values.items())
+        for labels, (counts, total, count) in values:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**base, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", base, total
+            yield f"{self.name}_count", base, count
+
+
+class MetricsRegistry:
+    """
+    Conjunto das métricas de um processo.
+
+    Além das métricas registradas, aceita coletores: funções chamadas apenas
+    na exposição, para valores que já são contados em outro lugar (como os
+    acertos do cache de extração).
+    """
+
+    def __init__(self, namespace: str = "", enabled: bool = True):
+        """
+        Inicializa o registro.
+
+        Args:
+            namespace: Prefixo dos nomes das métricas
+            enabled: Se False, registrar valores não faz nada
+        """
+        self.namespace = namespace
+        self.enabled = enabled
+        self.worker = False
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[CollectedMetric]]] = []
+
+    def _full_name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Cria e registra um contador (o sufixo _total é adicionado na exposição)"""
+        metric = Counter(self, self._full_name(name), documentation, labelnames)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        """Cria e registra um histograma"""
+        metric = Histogram(self, self._full_name(name), documentation, labelnames, buckets)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[CollectedMetric]]) -> None:
+        """
+        Registra uma função chamada na exposição.
+
+        Args:
+            collector: Função que retorna tuplas (nome, tipo, descrição, [(rótulos, valor)])
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Monta o texto de exposição (formato 0.0.4 do Prometheus).
+
+        Returns:
+            Texto com todas as métricas
+        """
+        lines = []
+        for metric in self._metrics.values():
+            # No formato 0.0.4 a família de um contador leva o sufixo _total, como as amostras
+            family = f"{metric.name}_total" if metric.type == "counter" else metric.name
+            lines.append(f"# HELP {family} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {family} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(_sample_line(name, labels, value))
+
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                family = self._full_name(f"{name}_total" if kind == "counter" else name)
+                lines.append(f"# HELP {family} {_escape_help(documentation)}")
+                lines.append(f"# TYPE {family} {kind}")
+                for labels, value in samples:
+                    lines.append(_sample_line(family, labels, value))
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """Retorna e zera os valores de todas as métricas (usado nos processos do pool)"""
+        deltas = {name: metric.drain() for name, metric in self._metrics.items()}
+        return {name: values for name, values in deltas.items() if values}
+
+    def merge(self, deltas: Dict[str, Dict[LabelValues, Any]]) -> None:
+        """Soma os valores drenados de outro processo às métricas deste"""
+        for name, values in deltas.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+
+def _format_value(value: float) -> str:
+    """Formata um número como no formato de exposição"""
+    if isinstance(value, int):
+        return str(value)
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(float(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _sample_line(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+        return f"{name}{{{rendered}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+registry = MetricsRegistry(**METRICS_CONFIG)
+
+UPLOAD_BYTES = registry.histogram("upload_size_bytes", "Tamanho dos PDFs recebidos", buckets=SIZE_BUCKETS)
+PDF_PAGES = registry.histogram("pdf_pages", "Páginas de cada PDF extraído", buckets=PAGE_BUCKETS)
+STAGE_SECONDS = registry.histogram(
+    "stage_duration_seconds",
+    "Duração de cada etapa do processamento (save, validate, detect, extract_text, parse, categorize, export)",
+    ["stage"],
+)
+DETECTED_BANKS = registry.counter("detected_bank", "Faturas por banco detectado (unknown quando nenhum atinge a pontuação mínima)", ["bank"])
+ERRORS = registry.counter("errors", "Erros por endpoint e tipo de exceção", ["endpoint", "type"])
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Retorna o registro de métricas do processo.
+
+    Returns:
+        Instância de MetricsRegistry
+    """
+    return registry
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Mede a duração de um bloco como uma etapa do processamento.
+
+    Args:
+        name: Nome da etapa (rótulo stage)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, name)
+
+
+def record_error(endpoint: str, error: BaseException) -> None:
+    """
+    Conta um erro pelo tipo da exceção.
+
+    Args:
+        endpoint: Endpoint (ou componente) em que o erro ocorreu
+        error: Exceção capturada
+    """
+    ERRORS.inc(endpoint, type(error).__name__)
+
+
+def enable_worker_mode() -> None:
+    """Marca o processo como processo do pool: os valores passam a ser devolvidos ao processo principal"""
+    registry.worker = True
+
+
+def collect_worker_deltas() -> Optional[Dict[str, Dict[LabelValues, Any]]]:
+    """
+    Drena os valores registrados em um processo do pool.
+
+    Returns:
+        Incrementos a somar no processo principal, ou None fora de um processo do pool
+    """
+    if not registry.worker:
+        return None
+    return registry.drain() or None
@@ -0,0 +1,277 @@
+"""
+Registro versionado dos padrões de detecção e extração de cada banco.
+"""
+import re
+import logging
+from typing import Any, Dict, FrozenSet, List, Optional, Pattern, Tuple
+from app.core.config import BANK_PATTERNS_CONFIG
+from app.utils.reloadable_file import ReloadableJSONFile
+
+logger = logging.getLogger(__name__)
+
+
+class PatternRegistryError(ValueError):
+    """Erro lançado quando o arquivo de padrões é inválido"""
+
+
+class BankPatterns:
+    """Padrões já compilados de um banco"""
+
+    def __init__(self, bank_id: str, definition: Dict[str, Any]):
+        """
+        Compila os padrões de um banco a partir da sua definição no arquivo.
+
+        Args:
+            bank_id: Identificador do banco
+            definition: Definição do banco lida do arquivo de padrões
+        """
+        self.bank_id = bank_id
+        self.name: str = definition.get("name", bank_id)
+        self.definition = definition
+
+        # Cada sinal de detecção é um padrão (peso 1) ou {"pattern": ..., "weight": ...}
+        signals = [_detection_signal(signal, bank_id) for signal in definition.get("detection", [])]
+        self.detection_signals: List[Tuple[str, float]] = signals
+        self.detection: List[Pattern] = [
+            _compile(pattern, re.IGNORECASE, bank_id, "detection") for pattern, _ in signals
+        ]
+        self.extraction: Dict[str, Optional[Pattern]] = {
+            field: _compile(pattern, 0, bank_id, field) if pattern else None
+            for field, pattern in definition.get("extraction", {}).items()
+        }
+        self.transaction_lines: List[Pattern] = [
+            _compile(pattern, 0, bank_id, "transaction_lines") for pattern in definition.get("transaction_lines", [])
+        ]
+        # Cada linha ignorada é um texto ou {"text": ..., "section": ...} (texto que abre uma seção do extrato)
+        skip_lines = [_skip_line(entry, bank_id) for entry in definition.get("skip_lines", [])]
+        self.skip_lines: List[str] = [word for word, _ in skip_lines]
+        self.skip_sections: List[Optional[str]] = [section for _, section in skip_lines]
+        # Seções cujas transações são créditos (pagamentos, estornos) e entram com valor negativo
+        self.credit_sections: FrozenSet[str] = frozenset(definition.get("credit_sections", []))
+        self.cities: List[Pattern] = [
+            _compile(rf'(?<!\s)\s+{re.escape(city)}\s*$', re.IGNORECASE, bank_id, "cities") for city in definition.get("cities", [])
+        ]
+        self.line_classifier, self.line_groups = self._build_line_classifier()
+
+    def _build_line_classifier(self) -> Tuple[Optional[Pattern], Dict[str, Tuple[str, Any]]]:
+        """
+        Combina as regras de linha do extrato em uma única expressão.
+
+        As alternativas seguem a ordem de verificação das linhas: o cabeçalho
+        da tabela ("Data Descrição Valor"), as linhas ignoradas (um grupo k0,
+        k1, ... por texto, no início da linha e sem diferenciar maiúsculas) e
+        os padrões de transação, na ordem do arquivo (t0, t1, ...). Um único
+        match na linha diz qual regra venceu (lastgroup); a primeira letra
+        das linhas ignoradas é conferida antes, então linhas que começam pela
+        data passam direto aos padrões de transação.
+
+        Returns:
+            Expressão combinada (None se o banco não tiver padrões de linha) e
+            o mapa do nome do grupo para o tipo da linha e o detalhe: a seção
+            aberta pela linha ignorada ou o índice do primeiro grupo
+            (data, descrição, valor) do padrão de transação
+        """
+        if not self.transaction_lines:
+            return None, {}
+
+        groups: Dict[str, Tuple[str, Any]] = {"header": ("header", None)}
+        alternatives = [r"(?P<header>Data\s+Descrição\s+Valor)"]
+        words = [word for word in self.skip_lines if word]
+        if words:
+            first = "".join(sorted({char for word in words for char in (word[0], word[0].lower())}))
+            names = []
+            for index, (word, section) in enumerate(zip(self.skip_lines, self.skip_sections)):
+                if word:
+                    groups[f"k{index}"] = ("skip", section)
+                    names.append(f"(?P<k{index}>{re.escape(word)})")
+            alternatives.append(f"(?=[{re.escape(first)}])(?i:{'|'.join(names)})")
+
+        # Índice do próximo grupo: header, os grupos k e, a cada padrão, o grupo t e os grupos do padrão
+        next_group = 2 + len(words)
+        for index, pattern in enumerate(self.transaction_lines):
+            if pattern.groups < 3:
+                raise PatternRegistryError(f"Padrão sem data, descrição e valor em {self.bank_id}.transaction_lines: {pattern.pattern!r}")
+            groups[f"t{index}"] = ("transaction", next_group + 1)
+            alternatives.append(f"(?P<t{index}>{pattern.pattern})")
+            next_group += 1 + pattern.groups
+
+        classifier = _compile("|".join(alternatives), 0, self.bank_id, "transaction_lines")
+        return classifier, groups
+
+
+class PatternSnapshot:
+    """
+    Versão imutável e compilada do arquivo de padrões.
+
+    O registro troca o snapshot inteiro de uma vez ao recarregar, então quem
+    já obteve um snapshot continua usando um conjunto consistente de padrões.
+    """
+
+    def __init__(self, data: Dict[str, Any], digest: str, mtime: float):
+        """
+        Compila todos os padrões do arquivo.
+
+        Args:
+            data: Conteúdo do arquivo de padrões
+            digest: SHA-256 do arquivo, usado para compor a versão de cache
+            mtime: Horário de modificação do arquivo carregado
+        """
+        if not isinstance(data.get("version"), int):
+            raise PatternRegistryError("O arquivo de padrões deve ter um campo 'version' inteiro")
+        if not isinstance(data.get("banks"), dict) or not data["banks"]:
+            raise PatternRegistryError("O arquivo de padrões deve definir ao menos um banco em 'banks'")
+
+        self.version: int = data["version"]
+        self.digest = digest
+        self.mtime = mtime
+        self.default_bank: Optional[str] = data.get("default_bank")
+        self.defaults: Dict[str, Pattern] = {
+            field: _compile(pattern, 0, "defaults", field) for field, pattern in data.get("defaults", {}).items()
+        }
+        self.banks: Dict[str, BankPatterns] = {
+            bank_id: BankPatterns(bank_id, definition) for bank_id, definition in data["banks"].items()
+        }
+
+        if self.default_bank and self.default_bank not in self.banks:
+            raise PatternRegistryError(f"Banco padrão desconhecido: {self.default_bank}")
+
+        detection = data.get("detection", {})
+        self.min_detection_score: float = float(detection.get("min_score", 1.0))
+        self.detector, self.detector_signals = self._build_detector()
+
+    def _build_detector(self) -> Tuple[Optional[Pattern], Dict[str, Tuple[str, float]]]:
+        """
+        Combina os sinais de detecção de todos os bancos em uma única expressão.
+
+        Cada sinal vira um grupo nomeado (s0, s1, ...), de forma que uma única
+        varredura do texto informa qual sinal casou em cada posição. Os sinais
+        de maior peso vêm primeiro na alternância, então numa mesma posição o
+        sinal mais forte prevalece.
+
+        Returns:
+            Expressão combinada (None se não houver sinais) e o mapa do nome
+            do grupo para o banco e o peso do sinal
+        """
+        signals = [
+            (weight, bank_id, pattern)
+            for bank_id, bank in self.banks.items()
+            for pattern, weight in bank.detection_signals
+        ]
+        if not signals:
+            return None, {}
+
+        ordered = sorted(enumerate(signals), key=lambda item: -item[1][0])
+        groups = {}
+        alternatives = []
+        for index, (weight, bank_id, pattern) in ordered:
+            name = f"s{index}"
+            groups[name] = (bank_id, weight)
+            alternatives.append(f"(?P<{name}>{pattern})")
+
+        detector = _compile("|".join(alternatives), re.IGNORECASE, "detection", "combinado")
+        return detector, groups
+
+    @property
+    def cache_version(self) -> str:
+        """
+        Versão usada nas chaves do cache de resultados: o número de versão do
+        arquivo mais um prefixo do seu hash, para que uma edição sem incremento
+        de versão também invalide os resultados antigos.
+        """
+        return f"{self.version}.{self.digest[:8]}"
+
+    def get(self, bank_id: str) -> Optional[BankPatterns]:
+        """Retorna os padrões de um banco ou None"""
+        return self.banks.get(bank_id)
+
+    def extraction_patterns(self, bank_id: str) -> Dict[str, Pattern]:
+        """
+        Retorna os padrões de extração de um banco já combinados com os padrões genéricos.
+
+        Bancos sem padrões de extração próprios usam os do banco padrão.
+        Campos sem padrão no banco (ou definidos como null) usam o padrão genérico.
+
+        Args:
+            bank_id: Identificador do banco
+
+        Returns:
+            Dicionário com o campo e o padrão compilado
+        """
+        bank = self.banks.get(bank_id)
+        if bank is None or not bank.extraction:
+            bank = self.banks.get(self.default_bank)
+
+        patterns = dict(self.defaults)
+        if bank is not None:
+            patterns.update({field: pattern for field, pattern in bank.extraction.items() if pattern is not None})
+        return patterns
+
+
+class PatternRegistry(ReloadableJSONFile[PatternSnapshot]):
+    """
+    Registro dos padrões dos bancos carregado de um arquivo JSON.
+
+    Todos os padrões são compilados uma única vez por carga. O arquivo é
+    verificado a cada check_interval segundos e recarregado quando muda;
+    reload() força uma nova carga (usado pelo endpoint administrativo). Se o
+    arquivo novo for inválido, o snapshot anterior continua em uso.
+    """
+
+    description = "arquivo de padrões dos bancos"
+    error_class = PatternRegistryError
+
+    def _build(self, data: Dict[str, Any], digest: str, mtime: float) -> PatternSnapshot:
+        """Compila os padrões de todos os bancos"""
+        snapshot = PatternSnapshot(data, digest, mtime)
+        logger.info(f"Padrões dos bancos carregados: versão {snapshot.version} ({len(snapshot.banks)} bancos)")
+        return snapshot
+
+    @property
+    def version(self) -> str:
+        """Versão de cache do snapshot atual"""
+        return self.snapshot().cache_version
+
+
+def _detection_signal(signal: Any, bank_id: str) -> Tuple[str, float]:
+    """Normaliza um sinal de detecção para (padrão, peso)"""
+    if isinstance(signal, str):
+        return signal, 1.0
+    if isinstance(signal, dict) and isinstance(signal.get("pattern"), str):
+        weight = signal.get("weight", 1.0)
+        if not isinstance(weight, (int, float)) or weight <= 0:
+            raise PatternRegistryError(f"Peso inválido em {bank_id}.detection: {weight!r}")
+        return signal["pattern"], float(weight)
+    raise PatternRegistryError(f"Sinal de detecção inválido em {bank_id}: {signal!r}")
+
+
+def _skip_line(entry: Any, bank_id: str) -> Tuple[str, Optional[str]]:
+    """Normaliza uma linha ignorada para (texto em maiúsculas, seção aberta ou None)"""
+    if isinstance(entry, str):
+        return entry.upper(), None
+    if isinstance(entry, dict) and isinstance(entry.get("text"), str):
+        section = entry.get("section")
+        if section is not None and not isinstance(section, str):
+            raise PatternRegistryError(f"Seção inválida em {bank_id}.skip_lines: {section!r}")
+        return entry["text"].upper(), section
+    raise PatternRegistryError(f"Linha ignorada inválida em {bank_id}: {entry!r}")
+
+
+def _compile(pattern: str, flags: int, bank_id: str, field: str) -> Pattern:
+    """Compila um padrão informando o banco e o campo em caso de erro"""
+    try:
+        return re.compile(pattern, flags)
+    except re.error as e:
+        raise PatternRegistryError(f"Padrão inválido em {bank_id}.{field}: {pattern!r} ({str(e)})")
+
+
+pattern_registry = PatternRegistry(**BANK_PATTERNS_CONFIG)
+
+
+def get_pattern_registry() -> PatternRegistry:
+    """
+    Retorna o registro de padrões compartilhado pelo processo.
+
+    Returns:
+        Instância de PatternRegistry
+    """
+    return pattern_registry
@@ -1,128 +1,273 @@
-import PyPDF2
 import re
-from typing import Dict, List, Any, Optional
+import time
+from typing import Dict, Iterable, Iterator, List, Any, Match, Optional, Pattern, Tuple, Union
 import logging
 from datetime import datetime
 from app.models.invoice import Fatura, Transacao
 from app.utils.pdf_utils import PDFValidator
 from app.utils.bank_detector import BankDetector
+from app.utils.parsed_document import ParsedDocument
+from app.services.pattern_registry import BankPatterns, PatternSnapshot, get_pattern_registry
+from app.services.categorizer import get_categorizer
+from app.services.merchant_dictionary import MerchantDictionary, MerchantEntry, get_merchant_dictionary
+from app.services.extraction_limits import check_time
+from app.services import metrics
+from app.utils.money import cents_to_decimal, parse_cents_column
 
 logger = logging.getLogger(__name__)
 
+# Tamanho máximo da descrição de uma transação nos padrões (o mesmo limite de
+# bank_patterns.json): evita backtracking em textos longos; uma descrição maior
+# não é reconhecida como transação
+MAX_DESCRIPTION_CHARS = 200
+
+# Padrões genéricos de limpeza, compilados uma única vez
+DEFAULT_TRANSACTION_PATTERN = re.compile(rf"(\d{{2}}/\d{{2}})\s++([^\d]{{1,{MAX_DESCRIPTION_CHARS}}})\s++([\d\.,]+)")
+BR_SUFFIX_PATTERN = re.compile(r'(?<!\s)\s+BR\s*$')
+BRASIL_SUFFIX_PATTERN = re.compile(r'(?<!\s)\s+BRASIL\s*$')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+LINE_DATE_PATTERN = re.compile(r'^(\d{2}/\d{2})')
+
+# Campos do cabeçalho da fatura, procurados página a página até serem encontrados
+HEADER_FIELDS = ('titular', 'numero_cartao', 'data_fechamento', 'data_vencimento', 'valor_total')
+# Texto sem transação levado de uma página para a seguinte no padrão genérico
+MAX_CARRY_CHARS = 1024
+
+
+class BBLineState:
+    """
+    Seção corrente de um extrato do Banco do Brasil, mantida de uma página para a seguinte.
+    
+    O extrato começa no preâmbulo (dados do titular e totais); o cabeçalho da
+    tabela (Data, Descrição, Valor) abre a seção de transações, e as linhas
+    ignoradas com seção no arquivo de padrões abrem os blocos seguintes
+    ("pagamentos", "categoria", "rodape"). As transações logo abaixo do
+    título de uma seção de crédito do banco (credit_sections, como
+    "pagamentos") são pagamentos e estornos, e não compras: entram na fatura
+    com valor negativo. A primeira linha que não é transação (outro título,
+    mesmo fora da lista de linhas ignoradas) encerra a seção de crédito.
+    """
+    
+    __slots__ = ("section", "block", "lines", "transactions")
+    
+    def __init__(self):
+        self.section = "preambulo"
+        # Linha que abriu o bloco atual (por exemplo "Restaurantes")
+        self.block: Optional[str] = None
+        self.lines = 0
+        self.transactions = 0
+
 class PDFExtractor:
     """
     Classe responsável por extrair dados de faturas de cartão de crédito em PDF.
     """
     
-    # Mapeamento de bancos para expressões regulares específicas
-    BANK_EXTRACTORS = {
-        'banco_do_brasil': {
-            'titular': r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+\(Cartão\s+\d+\)",
-            'numero_cartao': r"Cartão\s+(\d+)",
-            'data_fechamento': None,  # Será extraído através de lógica específica
-            'data_vencimento': r"Vencimento\s*(\d{2}/\d{2}/\d{4})",
-            'valor_total': r"Total.*?R\$\s*([\d\.,]+)",
-            'transacao_pattern': r"(\d{2}/\d{2})\s+([^R$]+?)\s+(?:BR\s+)?R\$\s*([\d\.,]+)"
-        },
-        # Outros bancos serão adicionados no futuro
-    }
+    # Os padrões de cada banco ficam no registro de padrões (app/core/bank_patterns.json),
+    # compilados uma única vez por versão e recarregados quando o arquivo muda.
     
-    def extract(self, pdf_path: str, bank_id: Optional[str] = None) -> Dict[str, Any]:
+    @classmethod
+    def warm_up(cls) -> None:
+        """
+        Carrega e compila os padrões dos bancos e as regras de categorias.
+        Chamado na inicialização dos processos de extração para que a primeira
+        fatura processada não pague o custo de compilação.
+        """
+        get_pattern_registry().snapshot()
+        get_categorizer().snapshot()
+    
+    def extract(self, source: Union[str, ParsedDocument], bank_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Extrai dados de uma fatura de cartão de crédito em PDF.
         
+        As páginas são processadas uma a uma (ver _iter_transaction_batches),
+        sem montar o texto completo do documento.
+        
         Args:
-            pdf_path: Caminho para o arquivo PDF
+            source: Caminho para o arquivo PDF ou documento já carregado
             bank_id: Identificador do banco emissor da fatura (opcional)
             
         Returns:
             Um dicionário com os dados extraídos
         """
-        # Detecta o banco se não for especificado
-        if not bank_id:
-            bank_id = BankDetector.detect_bank(pdf_path)
-            if not bank_id:
-                logger.warning("Não foi possível identificar o banco automaticamente. Usando padrões genéricos.")
-                bank_id = 'generic'
+        document, bank_id = self._prepare(source, bank_id)
         try:
-            logger.info(f"Iniciando extração do arquivo: {pdf_path}")
+            logger.info(f"Iniciando extração do arquivo: {document.name}")
             
             # Valida se é um PDF válido
-            if not PDFValidator.validate_pdf(pdf_path):
-                raise ValueError(f"Arquivo PDF inválido: {pdf_path}")
-            
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                
-                # Instancia o modelo da fatura
-                fatura = Fatura()
-                fatura.banco = bank_id
-                
-                # Processa cada página do PDF
-                full_text = ""
-                for page_num in range(len(reader.pages)):
-                    page = reader.pages[page_num]
-                    text = page.extract_text()
-                    full_text += text
-                
-                # Obtém os padrões específicos para o banco identificado
-                patterns = self.BANK_EXTRACTORS.get(bank_id, self.BANK_EXTRACTORS.get('banco_do_brasil'))
-                logger.info(f"Usando padrões do banco: {bank_id}")
-                
-                # Extrai informações básicas usando expressões regulares específicas do banco
-                fatura.titular = self._extract_pattern(full_text, patterns.get('titular', r"Nome:\s*([^\n]*)"))
-                fatura.numero_cartao = self._extract_pattern(full_text, patterns.get('numero_cartao', r"Cartão:\s*([•\*\d]+)"))
-                
-                # Para data de fechamento do BB, usa lógica específica
-                if bank_id == 'banco_do_brasil':
-                    fatura.data_fechamento = self._extract_bb_closing_date(full_text)
-                else:
-                    fatura.data_fechamento = self._extract_pattern(full_text, patterns.get('data_fechamento', r"Fechamento:\s*(\d{2}/\d{2}/\d{4})"))
-                
-                fatura.data_vencimento = self._extract_pattern(full_text, patterns.get('data_vencimento', r"Vencimento\s*(\d{2}/\d{2}/\d{4})"))
-                fatura.valor_total = self._extract_pattern(full_text, patterns.get('valor_total', r"Total\s*R\$\s*([\d\.,]+)"))
-                
-                # Extrai transações usando o padrão específico do banco
-                transacao_pattern = patterns.get('transacao_pattern', r"(\d{2}/\d{2})\s+([^\d]+?)\s+(R?\$?\s*[\d\.,]+)")
-                
-                # Para o Banco do Brasil, usa um método específico
-                if bank_id == 'banco_do_brasil':
-                    transacoes = self._extract_bb_transactions(full_text)
-                else:
-                    transacoes = self._extract_transactions(full_text, transacao_pattern)
-                    
+            with metrics.stage("validate"):
+                valid = PDFValidator.validate_pdf(document)
+            if not valid:
+                raise ValueError(f"Arquivo PDF inválido: {document.name}")
+            
+            # Instancia o modelo da fatura
+            fatura = Fatura()
+            fatura.banco = bank_id
+            
+            # Obtém os padrões específicos para o banco identificado
+            # (campos sem padrão próprio usam os padrões genéricos do registro)
+            snapshot = get_pattern_registry().snapshot()
+            logger.info(f"Usando padrões do banco: {bank_id} (versão {snapshot.version})")
+            
+            # Percorre as páginas preenchendo o cabeçalho e as transações
+            for transacoes in self._iter_transaction_batches(document, bank_id, snapshot, fatura):
                 for transacao in transacoes:
                     fatura.adicionar_transacao(transacao)
-                
-                # Calcula o valor total se não foi encontrado na fatura
-                if not fatura.valor_total:
-                    total = fatura.calcular_total()
-                    fatura.valor_total = f"{total:.2f}"
-                
-                logger.info("Extração concluída com sucesso")
-                return fatura.to_dict()
-                
+            
+            # Calcula o valor total se não foi encontrado na fatura
+            if not fatura.valor_total:
+                # Total calculado em formato decimal ("1234.56"), como nas versões anteriores
+                fatura.valor_total = str(cents_to_decimal(fatura.calcular_total_centavos()))
+            
+            logger.info("Extração concluída com sucesso")
+            return fatura.to_dict()
+            
         except Exception as e:
             logger.error(f"Erro ao extrair dados do PDF: {str(e)}")
             raise
     
-    def _extract_pattern(self, text: str, pattern: str) -> Optional[str]:
+    def _prepare(self, source: Union[str, ParsedDocument], bank_id: Optional[str]) -> Tuple[ParsedDocument, str]:
+        """
+        Abre o documento e detecta o banco, se não foi informado.
+        
+        Args:
+            source: Caminho para o arquivo PDF ou documento já carregado
+            bank_id: Identificador do banco emissor da fatura (opcional)
+            
+        Returns:
+            Documento aberto e identificador do banco ('generic' se desconhecido)
+        """
+        # Abre o PDF uma única vez; detecção e extração compartilham o mesmo documento
+        document = ParsedDocument.open(source)
+        
+        # Detecta o banco se não for especificado
+        if not bank_id:
+            bank_id = BankDetector.detect_bank(document)
+            # A detecção pode ter lido todas as páginas; confere o tempo antes de extrair
+            check_time()
+            if not bank_id:
+                logger.warning("Não foi possível identificar o banco automaticamente. Usando padrões genéricos.")
+                bank_id = 'generic'
+        return document, bank_id
+    
+    def _iter_transaction_batches(
+        self,
+        document: ParsedDocument,
+        bank_id: str,
+        snapshot: PatternSnapshot,
+        fatura: Optional[Fatura] = None,
+    ) -> Iterator[List[Transacao]]:
+        """
+        Percorre as páginas do documento e entrega as transações de cada uma.
+        
+        O texto das páginas é concatenado sem separador (como em
+        ParsedDocument.text), então a última linha incompleta de uma página é
+        levada para a seguinte. Se a fatura for informada, os campos do
+        cabeçalho são procurados em cada página até serem encontrados.
+        
+        Args:
+            document: Documento PDF carregado
+            bank_id: Identificador do banco
+            snapshot: Padrões dos bancos em uso
+            fatura: Fatura cujo cabeçalho deve ser preenchido (opcional)
+            
+        Returns:
+            Iterador com as transações já categorizadas de cada página
+        """
+        patterns = snapshot.extraction_patterns(bank_id)
+        is_bb = bank_id == 'banco_do_brasil'
+        scope = 'banco_do_brasil' if is_bb else 'generic'
+        bank = snapshot.get('banco_do_brasil') if is_bb else None
+        transaction_pattern = patterns.get('transacao_pattern') or DEFAULT_TRANSACTION_PATTERN
+        merchants = get_merchant_dictionary()
+        
+        # Campos do cabeçalho ainda não encontrados (a data de fechamento do BB usa lógica própria)
+        header = {}
+        if fatura is not None:
+            header = {
+                field: patterns.get(field) for field in HEADER_FIELDS
+                if patterns.get(field) is not None and not (is_bb and field == 'data_fechamento')
+            }
+        
+        last_page = document.page_count - 1
+        carry = ""
+        bb_state = BBLineState() if is_bb else None
+        # Tempo de cada etapa somado em todas as páginas e registrado uma vez por documento
+        clock = time.perf_counter
+        timings = {"extract_text": 0.0, "parse": 0.0, "categorize": 0.0}
+        pages = iter(document.iter_pages())
+        for page_num in range(last_page + 1):
+            start = clock()
+            page_text = next(pages)
+            parse_start = clock()
+            timings["extract_text"] += parse_start - start
+            chunk = carry + page_text
+            final = page_num == last_page
+            
+            for field, pattern in list(header.items()):
+                value = self._extract_pattern(chunk, pattern)
+                if value is not None:
+                    setattr(fatura, field, value)
+                    del header[field]
+            
+            if is_bb:
+                lines = chunk.split('\n')
+                carry = "" if final else lines.pop()
+                if fatura is not None and fatura.data_fechamento is None:
+                    fatura.data_fechamento = self._bb_closing_date_from_lines(lines)
+                parsed = list(self._parse_bb_lines(lines, bank, merchants, bb_state))
+            else:
+                matches = list(transaction_pattern.finditer(chunk))
+                parsed = self._parse_transaction_matches(matches, merchants)
+                # O texto depois da última transação pode continuar na página seguinte
+                last_end = matches[-1].end() if matches else 0
+                carry = "" if final else chunk[last_end:][-MAX_CARRY_CHARS:]
+            
+            categorize_start = clock()
+            timings["parse"] += categorize_start - parse_start
+            transacoes = self._finish_batch(scope, parsed)
+            timings["categorize"] += clock() - categorize_start
+            if transacoes:
+                yield transacoes
+        
+        metrics.PDF_PAGES.observe(last_page + 1)
+        for name, seconds in timings.items():
+            metrics.STAGE_SECONDS.observe(seconds, name)
+    
+    def _finish_batch(self, scope: str, parsed: List[Tuple[Transacao, Optional[str]]]) -> List[Transacao]:
+        """
+        Categoriza as transações de um lote e aplica as correções do usuário.
+        
+        Args:
+            scope: Regras de limpeza aplicadas às descrições
+            parsed: Pares (transação, descrição original se o estabelecimento não estava no dicionário)
+            
+        Returns:
+            Lista de transações prontas
+        """
+        self._categorize_pending(scope, [(transacao, raw) for transacao, raw in parsed if raw is not None])
+        transacoes = [transacao for transacao, _ in parsed]
+        self._apply_merchant_overrides(transacoes)
+        return transacoes
+    
+    def _extract_pattern(self, text: str, pattern: Optional[Pattern]) -> Optional[str]:
         """
         Extrai informações usando expressões regulares.
         
         Args:
             text: Texto a ser processado
-            pattern: Padrão de expressão regular
+            pattern: Padrão de expressão regular compilado
             
         Returns:
             String extraída ou None se não encontrada
         """
-        match = re.search(pattern, text)
+        if pattern is None:
+            return None
+        match = pattern.search(text)
         if match:
             return match.group(1).strip()
         return None
     
-    def _extract_transactions(self, text: str, transaction_pattern: str = None) -> List[Transacao]:
+    def _extract_transactions(self, text: str, transaction_pattern: Optional[Pattern] = None) -> List[Transacao]:
         """
         Extrai as transações da fatura.
         Este método usa o padrão específico do banco para extrair as transações.
@@ -134,64 +279,81 @@ class PDFExtractor:
         Returns:
             Lista de objetos Transacao
         """
-        transactions = []
-        
         if not transaction_pattern:
             # Padrão padrão para encontrar transações
             # Formato: DD/MM Descrição do estabelecimento 999,99
-            transaction_pattern = r"(\d{2}/\d{2})\s+([^\d]+)\s+([\d\.,]+)"
-        
-        # Para o Banco do Brasil, vamos usar um padrão mais específico
-        # que considera o formato: DD/MM DESCRICAO CIDADE BR R$ VALOR
-        if 'banco_do_brasil' in transaction_pattern:
-            # Padrão específico para o BB que lida melhor com números nas descrições
-            bb_pattern = r"(\d{2}/\d{2})\s+(.*?)\s+(?:BR\s+)?R\$\s*([\d\.,]+)(?:\s|$)"
-            matches = re.finditer(bb_pattern, text, re.MULTILINE)
-        else:
-            matches = re.finditer(transaction_pattern, text)
-            
-        for match in matches:
-            if len(match.groups()) >= 3:
-                date = match.group(1)
-                description = match.group(2).strip()
-                
-                # Remove informações que não fazem parte da descrição real
-                # Para o BB, remove códigos e referências extras
-                if description.startswith('SALDO FATURA ANTERIOR') or description.startswith('Pagamentos/Créditos'):
-                    continue
-                    
-                # Limpa a descrição removendo códigos extras e padronizando
-                description = self._clean_description(description)
-                
-                # Se a descrição ficou vazia, pula essa transação
-                if not description:
-                    continue
-                
-                # Trata o valor que pode ter formatos diferentes
-                value_text = match.group(3).strip()
-                # Remove prefixos comuns como "R$" ou "$"
-                value_text = re.sub(r'^R\$\s*', '', value_text)
-                value_text = re.sub(r'^\$\s*', '', value_text)
-                # Normaliza o valor para formato decimal com ponto
-                value = value_text.replace('.', '').replace(',', '.')
-                
-                try:
-                    # Tenta converter para float
-                    valor_float = float(value)
-                    
-                    # Criamos um objeto Transacao
-                    transacao = Transacao(
-                        data=date,
-                        descricao=description,
-                        valor=valor_float,
-                        categoria=self._categorize_transaction(description)
-                    )
-                    
-                    transactions.append(transacao)
-                except ValueError:
-                    logger.warning(f"Não foi possível converter o valor '{value}' para float. Transação ignorada.")
-        
-        return transactions
+            transaction_pattern = DEFAULT_TRANSACTION_PATTERN
+        
+        parsed = self._parse_transaction_matches(list(transaction_pattern.finditer(text)), get_merchant_dictionary())
+        return self._finish_batch('generic', parsed)
+    
+    def _parse_transaction_matches(self, matches: List[Match], merchants: MerchantDictionary) -> List[Tuple[Transacao, Optional[str]]]:
+        """
+        Converte os casamentos do padrão de transação de um trecho em transações.
+        
+        Os valores são convertidos em centavos de uma vez, como uma coluna.
+        
+        Args:
+            matches: Casamentos com data, descrição e valor
+            merchants: Dicionário de estabelecimentos
+            
+        Returns:
+            Pares (transação, descrição original se o estabelecimento não
+            estava no dicionário)
+        """
+        matches = [match for match in matches if len(match.groups()) >= 3]
+        values = parse_cents_column([match.group(3) for match in matches])
+        parsed = []
+        for match, cents in zip(matches, values):
+            item = self._parse_transaction_match(match, merchants, cents)
+            if item is not None:
+                parsed.append(item)
+        return parsed
+    
+    def _parse_transaction_match(self, match: Match, merchants: MerchantDictionary, cents: Optional[int]) -> Optional[Tuple[Transacao, Optional[str]]]:
+        """
+        Converte um casamento do padrão de transação em uma transação.
+        
+        Args:
+            match: Casamento com data, descrição e valor
+            merchants: Dicionário de estabelecimentos
+            cents: Valor do casamento em centavos (None se não for um valor)
+            
+        Returns:
+            Par (transação, descrição original se o estabelecimento não estava
+            no dicionário) ou None se não for uma transação
+        """        
+        date = match.group(1)
+        description = match.group(2).strip()
+        
+        # Remove informações que não fazem parte da descrição real
+        # Para o BB, remove códigos e referências extras
+        if description.startswith('SALDO FATURA ANTERIOR') or description.startswith('Pagamentos/Créditos'):
+            return None
+            
+        # Limpa a descrição removendo códigos extras e padronizando; a categoria
+        # vem do dicionário (a chave ignora dígitos e parcelas, a descrição não)
+        raw_description = description
+        merchant = merchants.lookup('generic', raw_description)
+        description = self._clean_description(raw_description)
+        
+        # Se a descrição ficou vazia, pula essa transação
+        if not description:
+            return None
+        
+        if cents is None:
+            logger.warning(f"Não foi possível converter o valor '{match.group(3).strip()}'. Transação ignorada.")
+            return None
+        
+        # Criamos um objeto Transacao
+        transacao = Transacao(
+            data=date,
+            descricao=description,
+            valor=cents / 100,
+            categoria=merchant.categoria if merchant else None,
+            centavos=cents
+        )
+        return transacao, (None if merchant else raw_description)
     
     def _clean_description(self, description: str) -> str:
         """
@@ -204,11 +366,11 @@ class PDFExtractor:
             Descrição limpa e padronizada
         """
         # Remove códigos de país e outras informações extras
-        description = re.sub(r'\s+BR\s*$', '', description)
-        description = re.sub(r'\s+BRASIL\s*$', '', description)
+        description = BR_SUFFIX_PATTERN.sub('', description)
+        description = BRASIL_SUFFIX_PATTERN.sub('', description)
         
         # Remove múltiplos espaços
-        description = re.sub(r'\s+', ' ', description)
+        description = WHITESPACE_PATTERN.sub(' ', description)
         
         # Remove espaços no início e fim
         description = description.strip()
@@ -222,125 +384,169 @@ class PDFExtractor:
             
         return description
         
-    def _extract_bb_transactions(self, text: str) -> List[Transacao]:
+    def _extract_bb_transactions(self, text: str, bank: Optional[BankPatterns] = None) -> List[Transacao]:
         """
         Método específico para extrair transações do Banco do Brasil.
         
         Args:
             text: Texto completo da fatura
+            bank: Padrões do Banco do Brasil (usa os do registro se None)
             
         Returns:
             Lista de objetos Transacao
         """
-        transactions = []
+        parsed = list(self._parse_bb_lines(text.split('\n'), bank, get_merchant_dictionary()))
+        return self._finish_batch('banco_do_brasil', parsed)
+    
+    def _classify_bb_lines(
+        self,
+        lines: Iterable[str],
+        bank: BankPatterns,
+        state: Optional[BBLineState] = None,
+    ) -> List[Tuple[Tuple[str, str, str], str]]:
+        """
+        Classifica as linhas de um extrato do Banco do Brasil em uma única passagem.
         
-        # Divide o texto em linhas para processamento linha por linha
-        lines = text.split('\n')
+        Cada linha é casada uma vez com o classificador do banco (cabeçalho da
+        tabela, linhas ignoradas e padrões de transação combinados em uma
+        expressão, ver BankPatterns.line_classifier); o grupo vencedor diz o
+        tipo da linha e atualiza a seção corrente.
         
-        # Estados para controlar quando estamos em seções de transações
-        in_transaction_section = False
+        Args:
+            lines: Linhas do texto da fatura
+            bank: Padrões do Banco do Brasil
+            state: Seção corrente, atualizada no lugar (opcional)
+            
+        Returns:
+            Lista de ((data, descrição, valor), linha, crédito) das transações,
+            na ordem do texto; crédito indica uma linha de seção de crédito
+        """
+        if bank.line_classifier is None:
+            return []
+        if state is None:
+            state = BBLineState()
+        classify = bank.line_classifier.match
+        groups = bank.line_groups
         
-        for i, line in enumerate(lines):
+        credit_sections = bank.credit_sections
+        credit = state.section in credit_sections
+        found = []
+        count = 0
+        for line in lines:
             line = line.strip()
             
             # Pula linhas vazias
             if not line:
                 continue
+            count += 1
             
-            # Identifica início de seção de transações
-            if 'Data' in line and 'Descrição' in line and 'Valor' in line:
-                in_transaction_section = True
+            # Formato esperado: DD/MM DESCRIÇÃO CIDADE BR R$ VALOR
+            # Ou: DD/MM DESCRIÇÃO R$ VALOR
+            match = classify(line)
+            kind, detail = groups[match.lastgroup] if match is not None else ("other", None)
+            if kind == "transaction":
+                found.append((match.group(detail, detail + 1, detail + 2), line, credit))
                 continue
-                
-            # Pula cabeçalhos e informações que não são transações
-            if any(skip in line.upper() for skip in [
-                'SALDO FATURA ANTERIOR', 
-                'PAGAMENTOS/CRÉDITOS', 
-                'LAZER', 
-                'RESTAURANTES',
-                'SAÚDE',
-                'SERVIÇOS',
-                'PÁGINA'
-            ]):
+            
+            # Os créditos são só as transações logo abaixo do título do bloco de
+            # pagamentos: qualquer outra linha encerra o bloco
+            credit = False
+            if kind == "header":
+                state.section, state.block = "transacoes", None
+            elif detail is not None:
+                # Linha ignorada que abre um bloco (categoria, pagamentos, rodapé)
+                state.section, state.block = detail, line
+                credit = detail in credit_sections
+            elif state.section in credit_sections:
+                # Título fora da lista de linhas ignoradas (por exemplo "Vestuário")
+                state.section, state.block = "transacoes", line
+        
+        state.lines += count
+        state.transactions += len(found)
+        return found
+    
+    def _parse_bb_lines(
+        self,
+        lines: Iterable[str],
+        bank: Optional[BankPatterns],
+        merchants: MerchantDictionary,
+        state: Optional[BBLineState] = None,
+    ) -> Iterator[Tuple[Transacao, Optional[str]]]:
+        """
+        Percorre linhas de uma fatura do Banco do Brasil e entrega as transações encontradas.
+        
+        Args:
+            lines: Linhas do texto da fatura
+            bank: Padrões do Banco do Brasil (usa os do registro se None)
+            merchants: Dicionário de estabelecimentos
+            state: Seção corrente do extrato, mantida entre páginas (opcional)
+            
+        Returns:
+            Iterador de pares (transação, descrição original se o
+            estabelecimento não estava no dicionário)
+        """
+        if bank is None:
+            bank = get_pattern_registry().snapshot().get('banco_do_brasil')
+        
+        # Primeiro separa as linhas de transação; os valores são convertidos
+        # em centavos de uma vez, como uma coluna
+        matches = self._classify_bb_lines(lines, bank, state)
+        
+        values = parse_cents_column([fields[2] for fields, _, _ in matches])
+        for ((date, description, value_text), line, credit), cents in zip(matches, values):
+            description = description.strip()
+            
+            # Limpa a descrição; a categoria vem do dicionário (a chave ignora dígitos e parcelas)
+            raw_description = description
+            merchant = merchants.lookup('banco_do_brasil', raw_description)
+            description = self._clean_bb_description(raw_description, bank.cities)
+            
+            # Se a descrição ficou vazia, pula
+            if not description:
                 continue
             
-            # Verifica se a linha contém uma transação válida
-            # Formato esperado: DD/MM DESCRIÇÃO CIDADE BR R$ VALOR
-            # Ou: DD/MM DESCRIÇÃO R$ VALOR
-            transaction_patterns = [
-                r'^(\d{2}/\d{2})\s+(.+?)\s+BR\s+R\$\s*([\d\.,]+)$',
-                r'^(\d{2}/\d{2})\s+(.+?)\s+R\$\s*([\d\.,]+)$',
-                r'^(\d{2}/\d{2})\s+(.+?)\s+([\d\.,]+)$'
-            ]
-            
-            match = None
-            for pattern in transaction_patterns:
-                match = re.match(pattern, line)
-                if match:
-                    break
+            if cents is None:
+                logger.warning(f"Não foi possível converter o valor '{value_text}'. Transação ignorada: {line}")
+                continue
             
-            if match:
-                date = match.group(1)
-                description = match.group(2).strip()
-                value_text = match.group(3)
-                
-                # Limpa a descrição
-                description = self._clean_bb_description(description)
-                
-                # Se a descrição ficou vazia, pula
-                if not description:
-                    continue
-                
-                try:
-                    # Converte o valor para float
-                    # Remove pontos de milhares e converte vírgula para ponto decimal
-                    if ',' in value_text and '.' in value_text:
-                        # Formato: 1.234,56
-                        value_text = value_text.replace('.', '').replace(',', '.')
-                    elif ',' in value_text:
-                        # Formato: 234,56
-                        value_text = value_text.replace(',', '.')
-                    
-                    valor_float = float(value_text)
-                    
-                    # Cria o objeto Transacao
-                    transacao = Transacao(
-                        data=date,
-                        descricao=description,
-                        valor=valor_float,
-                        categoria=self._categorize_transaction(description)
-                    )
-                    
-                    transactions.append(transacao)
-                    
-                except ValueError:
-                    logger.warning(f"Não foi possível converter o valor '{value_text}' para float. Transação ignorada: {line}")
-                    continue
-        
-        return transactions
+            # Pagamentos e créditos abatem o valor da fatura
+            if credit:
+                cents = -abs(cents)
+            
+            # Cria o objeto Transacao
+            transacao = Transacao(
+                data=date,
+                descricao=description,
+                valor=cents / 100,
+                categoria=merchant.categoria if merchant else None,
+                centavos=cents
+            )
+            yield transacao, (None if merchant else raw_description)
     
-    def _clean_bb_description(self, description: str) -> str:
+    def _clean_bb_description(self, description: str, cities: Optional[List[Pattern]] = None) -> str:
         """
         Limpa especificamente as descrições do Banco do Brasil.
         
         Args:
             description: Descrição original
+            cities: Padrões compilados das cidades a remover (usa os do registro se None)
             
         Returns:
             Descrição limpa
         """
         # Remove códigos de país
-        description = re.sub(r'\s+BR\s*$', '', description)
-        description = re.sub(r'\s+BRASIL\s*$', '', description)
+        description = BR_SUFFIX_PATTERN.sub('', description)
+        description = BRASIL_SUFFIX_PATTERN.sub('', description)
         
         # Remove cidade no final se estiver presente
         # Padrão comum: "ESTABELECIMENTO CIDADE"
-        cities = ['BRASILIA', 'SAO PAULO', 'OSASCO', 'CURITIBA', 'SANTANA DE PA']
+        if cities is None:
+            cities = get_pattern_registry().snapshot().get('banco_do_brasil').cities
         for city in cities:
-            description = re.sub(rf'\s+{city}\s*$', '', description, flags=re.IGNORECASE)
+            description = city.sub('', description)
         
         # Remove múltiplos espaços
-        description = re.sub(r'\s+', ' ', description).strip()
+        description = WHITESPACE_PATTERN.sub(' ', description).strip()
         
         return description
     
@@ -355,41 +561,99 @@ class PDFExtractor:
         Returns:
             Data de fechamento ou None se não encontrada
         """
-        # Procura por padrões que indiquem data de fechamento
-        # No BB, geralmente está próximo ao início das transações
-        
-        # Padrão 1: Procura pela primeira data que aparece nas transações
-        # que seria próxima à data de fechamento
-        lines = text.split('\n')
-        transaction_dates = []
+        return self._bb_closing_date_from_lines(text.split('\n'))
+    
+    def _bb_closing_date_from_lines(self, lines: Iterable[str]) -> Optional[str]:
+        """
+        Procura a data de fechamento do Banco do Brasil em linhas da fatura.
         
+        Args:
+            lines: Linhas do texto da fatura
+            
+        Returns:
+            Data de fechamento ou None se não encontrada
+        """
+        # Procura pela primeira data que aparece nas transações, que seria
+        # próxima à data de fechamento (no BB, geralmente está próxima ao
+        # início das transações)
         for line in lines:
-            line = line.strip()
             # Procura por linhas que começam com data
-            match = re.match(r'^(\d{2}/\d{2})', line)
+            match = LINE_DATE_PATTERN.match(line.strip())
             if match:
-                date = match.group(1)
                 # Converte para formato completo assumindo o ano atual
-                current_year = datetime.now().year
-                try:
-                    # Adiciona o ano atual para formar data completa
-                    full_date = f"{date}/{current_year}"
-                    transaction_dates.append(full_date)
-                except:
-                    continue
-        
-        # Se encontrou datas de transação, usa a primeira como aproximação
-        if transaction_dates:
-            # Para uma fatura típica, a data de fechamento seria próxima
-            # à primeira transação do período
-            return transaction_dates[0]
+                return f"{match.group(1)}/{datetime.now().year}"
         
         return None
+    
+    def clean_merchant(self, scope: str, description: str, cities: Optional[List[Pattern]] = None) -> str:
+        """
+        Limpa a descrição de uma transação com as regras do escopo.
+        
+        Args:
+            scope: Regras de limpeza (banco_do_brasil ou generic)
+            description: Descrição original da transação
+            cities: Padrões das cidades do BB (usa os do registro se None)
+            
+        Returns:
+            Descrição limpa
+        """
+        if scope == 'banco_do_brasil':
+            return self._clean_bb_description(description, cities)
+        return self._clean_description(description)
+    
+    def resolve_merchants(self, scope: str, descriptions: List[str]) -> List[MerchantEntry]:
+        """
+        Limpa e categoriza descrições pelas regras, sem consultar o dicionário.
+        Usado na reconstrução offline do dicionário de estabelecimentos.
+        
+        Args:
+            scope: Regras de limpeza (banco_do_brasil ou generic)
+            descriptions: Descrições originais
+            
+        Returns:
+            Lista de entradas na mesma ordem das descrições
+        """
+        cities = get_pattern_registry().snapshot().get('banco_do_brasil').cities
+        cleaned = [self.clean_merchant(scope, description, cities) for description in descriptions]
+        categories = get_categorizer().categorize_many(cleaned)
+        return [MerchantEntry(description, category) for description, category in zip(cleaned, categories)]
+    
+    def _categorize_pending(self, scope: str, pending: List[Tuple[Transacao, str]]) -> None:
+        """
+        Categoriza, em uma única chamada, as transações cujo estabelecimento
+        não estava no dicionário e registra os estabelecimentos resolvidos.
+        
+        Args:
+            scope: Regras de limpeza aplicadas às descrições
+            pending: Pares (transação, descrição original)
+        """
+        if not pending:
+            return
         
+        merchants = get_merchant_dictionary()
+        categories = get_categorizer().categorize_many(transacao.descricao for transacao, _ in pending)
+        for (transacao, raw_description), categoria in zip(pending, categories):
+            transacao.categoria = categoria
+            merchants.learn(scope, raw_description, MerchantEntry(transacao.descricao, categoria))
+    
+    def _apply_merchant_overrides(self, transactions: List[Transacao]) -> None:
+        """
+        Aplica as correções de descrição e categoria definidas pelo usuário.
+        
+        Args:
+            transactions: Transações extraídas (alteradas no próprio objeto)
+        """
+        merchants = get_merchant_dictionary()
+        for transacao in transactions:
+            override = merchants.override(transacao.descricao)
+            if override:
+                transacao.descricao = override.get("descricao", transacao.descricao)
+                transacao.categoria = override.get("categoria", transacao.categoria)
+    
     def _categorize_transaction(self, description: str) -> Optional[str]:
         """
         Categoriza uma transação com base na descrição.
-        Esta é uma implementação simples que pode ser melhorada.
+        As regras ficam em app/core/category_rules.json (ou em CATEGORY_RULES_FILE).
         
         Args:
             description: Descrição da transação
@@ -397,18 +661,4 @@ class PDFExtractor:
         Returns:
             Categoria ou None se não for possível categorizar
         """
-        description = description.lower()
-        
-        # Categorias comuns
-        if any(word in description for word in ['supermercado', 'mercado', 'hortifruti', 'sacolão']):
-            return 'Supermercado'
-        elif any(word in description for word in ['restaurante', 'lanchonete', 'bar', 'pizza', 'ifood', 'rappi']):
-            return 'Alimentação'
-        elif any(word in description for word in ['farmacia', 'drogaria', 'remedio', 'hospital', 'clinica', 'medico']):
-            return 'Saúde'
-        elif any(word in description for word in ['uber', 'taxi', '99', 'transporte', 'onibus', 'metro', 'trem']):
-            return 'Transporte'
-        elif any(word in description for word in ['cinema', 'teatro', 'show', 'ingresso', 'netflix', 'spotify']):
-            return 'Entretenimento'
-        
-        return None
+        return get_categorizer().snapshot().categorize(description)
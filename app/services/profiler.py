@@ -0,0 +1,315 @@
+"""
+Perfil de CPU (cProfile) de requisições individuais, ativado pelo cabeçalho
+X-Profile ou por amostragem.
+
+O processamento pesado roda no pool de extração, então uma requisição
+perfilada gera um perfil em cada processo que trabalhou para ela: o do
+processo principal (o handler e o loop de eventos) e o de cada processo do
+pool. Os arquivos se chamam <perfil>.<pid>.prof (formato do pstats) e
+<perfil>.<pid>.collapsed (pilhas colapsadas, para flamegraph.pl ou speedscope).
+"""
+import os
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from app.core.config import PROFILING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+
+# Perfil da requisição em andamento (lido pelo ExtractionService ao submeter tarefas)
+_current_profile: ContextVar[Optional[str]] = ContextVar("current_profile", default=None)
+
+# Função no formato do pstats: (arquivo, linha, nome)
+FunctionKey = Tuple[str, int, str]
+
+
+def current_profile_id() -> Optional[str]:
+    """
+    Retorna o perfil da requisição em andamento.
+
+    Returns:
+        Identificador do perfil ou None se a requisição não é perfilada
+    """
+    return _current_profile.get()
+
+
+class RequestProfiler:
+    """
+    Grava perfis de CPU de requisições individuais.
+
+    Um perfil que recebe amostras mais de uma vez no mesmo processo (o
+    handler e as tarefas executadas em threads, ou várias tarefas no mesmo
+    processo do pool) é somado ao arquivo existente.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, header_enabled: bool = True, max_files: int = 200):
+        """
+        Inicializa o perfilador.
+
+        Args:
+            directory: Diretório dos arquivos de perfil
+            sample_rate: Fração das requisições perfiladas sem o cabeçalho (0 a 1)
+            header_enabled: Se True, o cabeçalho X-Profile ativa o perfil
+            max_files: Número máximo de arquivos mantidos (os mais antigos são removidos)
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header_enabled = header_enabled
+        self.max_files = max_files
+        self._write_lock = threading.Lock()
+        # O cProfile do processo principal roda na thread do loop: um perfil por vez
+        self._handler_lock = threading.Lock()
+
+    def wants_profile(self, headers: Mapping[str, str]) -> bool:
+        """
+        Decide se uma requisição deve ser perfilada.
+
+        Args:
+            headers: Cabeçalhos da requisição (nomes em minúsculas)
+
+        Returns:
+            True se o cabeçalho pede o perfil ou a requisição foi sorteada
+        """
+        if self.header_enabled and headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @staticmethod
+    def new_profile_id() -> str:
+        """Gera um identificador de perfil ordenável pela data"""
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    @contextmanager
+    def profile(self, profile_id: str) -> Iterator[None]:
+        """
+        Perfila um bloco executado na thread atual e grava o resultado.
+
+        Args:
+            profile_id: Identificador do perfil
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            try:
+                self.write(profiler, profile_id)
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar o perfil {profile_id}: {str(e)}")
+
+    def run(self, profile_id: Optional[str], func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Executa uma função, perfilada se profile_id for informado.
+
+        Args:
+            profile_id: Identificador do perfil ou None
+            func: Função executada
+            args: Argumentos da função
+
+        Returns:
+            Resultado da função
+        """
+        if profile_id is None:
+            return func(*args)
+        with self.profile(profile_id):
+            return func(*args)
+
+    def write(self, profiler: cProfile.Profile, profile_id: str) -> str:
+        """
+        Grava (ou soma ao existente) o perfil deste processo.
+
+        Args:
+            profiler: Perfil coletado
+            profile_id: Identificador do perfil
+
+        Returns:
+            Caminho do arquivo .prof
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{profile_id}.{os.getpid()}")
+        with self._write_lock:
+            stats = pstats.Stats(profiler)
+            if os.path.exists(base + ".prof"):
+                stats.add(base + ".prof")
+            stats.dump_stats(base + ".prof")
+            with open(base + ".collapsed", "w", encoding="utf-8") as file:
+                for stack, microseconds in sorted(collapse_stacks(stats.stats).items()):
+                    file.write(f"{stack} {microseconds}\n")
+        self.prune()
+        return base + ".prof"
+
+    def prune(self) -> None:
+        """Remove os arquivos mais antigos além de max_files"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith((".prof", ".collapsed"))]
+        except FileNotFoundError:
+            return
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def list_profiles(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Lista os perfis mais recentes.
+
+        Args:
+            limit: Número máximo de perfis
+
+        Returns:
+            Lista de perfis (identificador, data e arquivos por processo), do mais recente ao mais antigo
+        """
+        profiles: Dict[str, Dict[str, Any]] = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+
+        for entry in entries:
+            name, _, extension = entry.name.rpartition(".")
+            profile_id, _, pid = name.rpartition(".")
+            if extension not in ("prof", "collapsed") or not pid.isdigit():
+                continue
+            stat = entry.stat()
+            profile = profiles.setdefault(profile_id, {"profile_id": profile_id, "updated_at": 0.0, "files": []})
+            profile["updated_at"] = max(profile["updated_at"], stat.st_mtime)
+            profile["files"].append({"name": entry.name, "pid": int(pid), "format": extension, "size": stat.st_size})
+
+        recent = sorted(profiles.values(), key=lambda profile: profile["updated_at"], reverse=True)[:limit]
+        for profile in recent:
+            profile["files"].sort(key=lambda file: (file["pid"], file["format"]))
+            profile["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(profile["updated_at"]))
+        return recent
+
+
+def _frame_name(function: FunctionKey) -> str:
+    """Nome de uma função em uma pilha colapsada"""
+    filename, line, name = function
+    if filename == "~":
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(";", ",")
+
+
+def collapse_stacks(stats: Dict[FunctionKey, Any], max_depth: int = 64) -> Dict[str, int]:
+    """
+    Converte as estatísticas do cProfile em pilhas colapsadas.
+
+    O cProfile só registra pares chamador-chamado, então as pilhas são
+    reconstruídas a partir das funções sem chamador, repartindo o tempo de
+    cada função entre os chamadores na proporção do tempo de cada chamada.
+
+    Args:
+        stats: Estatísticas no formato de pstats.Stats.stats
+        max_depth: Profundidade máxima das pilhas
+
+    Returns:
+        Dicionário pilha ("raiz;...;função") -> tempo próprio em microssegundos
+    """
+    callees: Dict[FunctionKey, List[Tuple[FunctionKey, float]]] = {}
+    roots = []
+    for function, (_, _, _, cumulative, callers) in stats.items():
+        if not callers:
+            roots.append(function)
+        for caller, caller_stats in callers.items():
+            callees.setdefault(caller, []).append((function, caller_stats[3]))
+
+    total = sum(stats[root][3] for root in roots)
+    threshold = max(1e-6, total * 1e-4)
+    collapsed: Dict[str, int] = {}
+
+    def walk(function: FunctionKey, path: List[str], on_stack: set, share: float) -> None:
+        own_time, cumulative = stats[function][2], stats[function][3]
+        fraction = share / cumulative if cumulative else 0.0
+        path.append(_frame_name(function))
+        microseconds = int(own_time * fraction * 1_000_000)
+        if microseconds:
+            stack = ";".join(path)
+            collapsed[stack] = collapsed.get(stack, 0) + microseconds
+        if len(path) < max_depth:
+            on_stack.add(function)
+            for callee, edge_time in callees.get(function, ()):
+                child_share = edge_time * fraction
+                if callee not in on_stack and child_share >= threshold:
+                    walk(callee, path, on_stack, child_share)
+            on_stack.discard(function)
+        path.pop()
+
+    for root in roots:
+        walk(root, [], set(), stats[root][3])
+    return collapsed
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila as requisições pedidas pelo cabeçalho
+    X-Profile ou sorteadas, devolvendo o identificador em X-Profile-Id.
+
+    O perfil do processo principal cobre o handler inteiro, inclusive o
+    corpo das respostas em streaming, mas também registra as outras
+    requisições atendidas pelo loop no mesmo intervalo.
+    """
+
+    def __init__(self, app: Any, profiler: Optional[RequestProfiler] = None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        profiler = self.profiler or get_request_profiler()
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        if not profiler.wants_profile(headers):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = profiler.new_profile_id()
+
+        async def send_with_profile_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.encode(), profile_id.encode())]}
+            await send(message)
+
+        token = _current_profile.set(profile_id)
+        try:
+            if profiler._handler_lock.acquire(blocking=False):
+                try:
+                    with profiler.profile(profile_id):
+                        await self.app(scope, receive, send_with_profile_id)
+                finally:
+                    profiler._handler_lock.release()
+            else:
+                # Outra requisição já é perfilada no loop: perfila apenas as tarefas do pool
+                await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _current_profile.reset(token)
+
+
+request_profiler = RequestProfiler(**PROFILING_CONFIG)
+
+
+def get_request_profiler() -> RequestProfiler:
+    """
+    Retorna o perfilador compartilhado pela aplicação.
+
+    Returns:
+        Instância de RequestProfiler
+    """
+    return request_profiler
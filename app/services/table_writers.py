@@ -0,0 +1,255 @@
+"""
+Exportação das transações em formatos tabulares para carga em data
+warehouse: CSV, NDJSON e Parquet (este apenas com o pyarrow instalado).
+
+Os três formatos compartilham as mesmas colunas tipadas e são escritos
+linha a linha a partir das colunas de uma TransactionTable, sem DataFrames.
+"""
+import io
+import csv
+import json
+import math
+import importlib.util
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, TextIO, Union
+from app.models.transaction_table import TransactionTable
+from app.utils.money import parse_cents
+
+# Destino do arquivo: caminho ou arquivo binário aberto (io.BytesIO, por exemplo)
+Target = Union[str, BinaryIO]
+
+# Colunas de cada transação exportada
+COLUMNS = ["fatura", "data", "descricao", "valor_centavos", "categoria", "banco"]
+
+# Campos da fatura repetidos no cabeçalho de metadados
+METADATA_FIELDS = ["titular", "numero_cartao", "data_fechamento", "data_vencimento", "valor_total", "banco", "data_processamento"]
+
+# Transações por lote de escrita do Parquet
+PARQUET_BATCH_ROWS = 65536
+
+
+def parquet_available() -> bool:
+    """Indica se o pyarrow está instalado (sem importá-lo)"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def to_cents(valor: Any) -> Optional[int]:
+    """
+    Converte um valor em reais para centavos.
+
+    Args:
+        valor: Valor numérico ou texto ("1.234,56", "1500.00", ver app.utils.money)
+
+    Returns:
+        Valor em centavos ou None se não for um número
+    """
+    if isinstance(valor, str):
+        return parse_cents(valor)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        return None
+    return int(round(valor * 100))
+
+
+def parse_date(text: Any) -> Optional[date]:
+    """Converte DD/MM/AAAA (ou DD/MM/AA) em data; retorna None se não for possível"""
+    try:
+        day, month, year = (int(part) for part in str(text).split('/'))
+        return date(year + 2000 if year < 100 else year, month, day)
+    except (TypeError, ValueError):
+        return None
+
+
+def transaction_date(text: Any, closing: Optional[date]) -> Optional[date]:
+    """
+    Data completa de uma transação.
+
+    As faturas trazem as transações como DD/MM; o ano vem da data de
+    fechamento (ou do ano anterior, para meses posteriores ao do fechamento).
+
+    Args:
+        text: Data da transação (DD/MM ou DD/MM/AAAA)
+        closing: Data de fechamento da fatura
+
+    Returns:
+        Data da transação ou None se não for possível determiná-la
+    """
+    parts = str(text).split('/')
+    if len(parts) == 3:
+        return parse_date(text)
+    if len(parts) != 2 or closing is None:
+        return None
+    try:
+        day, month = int(parts[0]), int(parts[1])
+        year = closing.year - 1 if month > closing.month else closing.year
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def invoice_metadata(index: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Cabeçalho de metadados de uma fatura"""
+    metadata = {"fatura": index}
+    metadata.update((field, data.get(field)) for field in METADATA_FIELDS)
+    metadata["valor_total_centavos"] = to_cents(data.get("valor_total"))
+    metadata["transacoes"] = len(data.get("transacoes") or ())
+    return metadata
+
+
+def iter_rows(index: int, data: Dict[str, Any]) -> Iterator[List[Any]]:
+    """
+    Gera as linhas tipadas (na ordem de COLUMNS) das transações de uma fatura.
+
+    As transações podem vir como TransactionTable ou como lista de
+    dicionários (convertida em tabela). Os valores já estão em centavos e
+    cada data distinta é convertida uma única vez.
+
+    Args:
+        index: Posição da fatura no arquivo
+        data: Dados da fatura
+
+    Yields:
+        Lista com os valores de cada coluna
+    """
+    closing = parse_date(data.get("data_fechamento")) or parse_date(data.get("data_vencimento"))
+    banco = data.get("banco")
+    dates: Dict[Any, Optional[date]] = {}
+    for text, descricao, cents, categoria in TransactionTable.coerce(data.get("transacoes")).iter_tuples():
+        if text not in dates:
+            dates[text] = transaction_date(text, closing)
+        yield [index, dates[text], descricao, cents, categoria, banco]
+
+
+def write_csv(faturas: List[Dict[str, Any]], target: Target, erros: Optional[List[Dict[str, Any]]] = None) -> Target:
+    """
+    Escreve as transações em CSV.
+
+    O arquivo começa com uma linha de comentário por fatura ("# fatura: {...}")
+    com os metadados em JSON e uma por arquivo com erro ("# erro: {...}"),
+    seguidas pelo cabeçalho das colunas e pelas transações.
+
+    Args:
+        faturas: Lista com os dados de cada fatura
+        target: Caminho do arquivo ou arquivo binário aberto
+        erros: Arquivos do lote que não puderam ser processados (opcional)
+
+    Returns:
+        O destino informado
+    """
+    with _open_text(target) as file:
+        for index, data in enumerate(faturas):
+            file.write(f"# fatura: {_dumps(invoice_metadata(index, data))}\n")
+        for erro in erros or []:
+            file.write(f"# erro: {_dumps(erro)}\n")
+
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(COLUMNS)
+        for index, data in enumerate(faturas):
+            for row in iter_rows(index, data):
+                if row[1] is not None:
+                    row[1] = row[1].isoformat()
+                writer.writerow(row)
+    return target
+
+
+def write_ndjson(faturas: List[Dict[str, Any]], target: Target, erros: Optional[List[Dict[str, Any]]] = None) -> Target:
+    """
+    Escreve as transações em NDJSON (um objeto JSON por linha).
+
+    Cada fatura começa com uma linha {"tipo": "fatura", ...} com os metadados,
+    seguida de uma linha {"tipo": "transacao", ...} por transação; arquivos
+    com erro aparecem no fim como {"tipo": "erro", ...}.
+
+    Args:
+        faturas: Lista com os dados de cada fatura
+        target: Caminho do arquivo ou arquivo binário aberto
+        erros: Arquivos do lote que não puderam ser processados (opcional)
+
+    Returns:
+        O destino informado
+    """
+    with _open_text(target) as file:
+        write = file.write
+        for index, data in enumerate(faturas):
+            write(_dumps({"tipo": "fatura", **invoice_metadata(index, data)}) + "\n")
+            for row in iter_rows(index, data):
+                if row[1] is not None:
+                    row[1] = row[1].isoformat()
+                record = {"tipo": "transacao"}
+                record.update(zip(COLUMNS, row))
+                write(_dumps(record) + "\n")
+        for erro in erros or []:
+            write(_dumps({"tipo": "erro", **erro}) + "\n")
+    return target
+
+
+def write_parquet(faturas: List[Dict[str, Any]], target: Target, erros: Optional[List[Dict[str, Any]]] = None) -> Target:
+    """
+    Escreve as transações em Parquet com colunas tipadas.
+
+    Os metadados das faturas e os erros ficam nos metadados do esquema
+    (chaves "faturas" e "erros", em JSON).
+
+    Args:
+        faturas: Lista com os dados de cada fatura
+        target: Caminho do arquivo ou arquivo binário aberto
+        erros: Arquivos do lote que não puderam ser processados (opcional)
+
+    Returns:
+        O destino informado
+    """
+    try:
+        # Dependência opcional e pesada: importada só quando um Parquet é escrito
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("A exportação para Parquet requer o pacote pyarrow")
+
+    schema = pyarrow.schema(
+        [
+            ("fatura", pyarrow.int32()),
+            ("data", pyarrow.date32()),
+            ("descricao", pyarrow.string()),
+            ("valor_centavos", pyarrow.int64()),
+            ("categoria", pyarrow.string()),
+            ("banco", pyarrow.string()),
+        ],
+        metadata={
+            "faturas": _dumps([invoice_metadata(index, data) for index, data in enumerate(faturas)]),
+            "erros": _dumps(erros or []),
+        },
+    )
+
+    with pyarrow.parquet.ParquetWriter(target, schema) as writer:
+        columns = [[] for _ in COLUMNS]
+        for index, data in enumerate(faturas):
+            for row in iter_rows(index, data):
+                for column, value in zip(columns, row):
+                    column.append(value)
+                if len(columns[0]) >= PARQUET_BATCH_ROWS:
+                    writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+                    columns = [[] for _ in COLUMNS]
+        if columns[0] or not faturas:
+            writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+    return target
+
+
+def _dumps(value: Any) -> str:
+    """JSON compacto, sem escapar acentos"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+@contextmanager
+def _open_text(target: Target) -> Iterator[TextIO]:
+    """Abre o destino para escrita de texto UTF-8"""
+    if isinstance(target, str):
+        with open(target, "w", encoding="utf-8", newline="") as file:
+            yield file
+    else:
+        wrapper = io.TextIOWrapper(target, encoding="utf-8", newline="")
+        try:
+            yield wrapper
+        finally:
+            # Solta o arquivo binário sem fechá-lo
+            wrapper.flush()
+            wrapper.detach()
@@ -0,0 +1,163 @@
+"""
+Escrita de planilhas Excel em streaming, linha a linha, com o modo
+write-only do openpyxl.
+"""
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from app.models.transaction_table import RECORD_FIELDS, TransactionTable
+
+# Destino da planilha: caminho do arquivo ou arquivo binário aberto (io.BytesIO, por exemplo)
+Target = Union[str, BinaryIO]
+
+UNCATEGORIZED = 'Não Categorizado'
+HEADER_FONT = Font(bold=True)
+
+
+def category_totals(table: TransactionTable) -> List[Tuple[str, float, int]]:
+    """
+    Soma e contagem dos valores por categoria, do maior para o menor total.
+
+    Args:
+        table: Transações da fatura
+
+    Returns:
+        Lista de linhas (categoria, valor total, quantidade) da análise por categoria
+    """
+    totals: Dict[str, List[int]] = {}
+    for categoria, (cents, count) in table.sum_by('categoria').items():
+        total = totals.setdefault(categoria or UNCATEGORIZED, [0, 0])
+        total[0] += cents
+        total[1] += count
+    ordered = sorted(totals.items())
+    ordered.sort(key=lambda item: item[1][0], reverse=True)
+    return [(categoria, cents / 100, count) for categoria, (cents, count) in ordered]
+
+
+def transaction_columns(transacoes: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Colunas da planilha de transações, na ordem em que aparecem.
+
+    Args:
+        transacoes: Lista de transações
+
+    Returns:
+        União das chaves das transações
+    """
+    columns: Dict[str, None] = {}
+    for transacao in transacoes:
+        for key in transacao:
+            if key not in columns:
+                columns[key] = None
+    return list(columns)
+
+
+def write_invoice(data: Dict[str, Any], target: Target) -> Target:
+    """
+    Escreve uma fatura com as planilhas de resumo, transações e análise por categoria.
+
+    As transações vão direto das colunas da TransactionTable para o arquivo,
+    e a análise por categoria soma os centavos agrupados pelos códigos das
+    categorias, sem percorrer dicionários.
+
+    Args:
+        data: Dados da fatura
+        target: Caminho do arquivo ou arquivo binário aberto
+
+    Returns:
+        O destino informado
+    """
+    workbook = Workbook(write_only=True)
+
+    resumo = workbook.create_sheet('Resumo')
+    _append_header(resumo, ['Campo', 'Valor'])
+    for row in (
+        ('Titular', data.get('titular', 'Não informado')),
+        ('Número do Cartão', data.get('numero_cartao', 'Não informado')),
+        ('Data de Fechamento', data.get('data_fechamento', 'Não informado')),
+        ('Data de Vencimento', data.get('data_vencimento', 'Não informado')),
+        ('Valor Total', data.get('valor_total', 'Não informado')),
+        ('Banco', data.get('banco', 'Não informado')),
+        ('Data de Processamento', data.get('data_processamento', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))),
+    ):
+        resumo.append(row)
+
+    transacoes = TransactionTable.coerce(data.get('transacoes'))
+    sheet = workbook.create_sheet('Transações')
+    if transacoes:
+        _append_table(sheet, transacoes)
+        analise = workbook.create_sheet('Análise por Categoria')
+        _append_header(analise, ['Categoria', 'Valor Total', 'Quantidade'])
+        for row in category_totals(transacoes):
+            analise.append(row)
+    else:
+        _append_header(sheet, ['Mensagem'])
+        sheet.append(['Nenhuma transação encontrada'])
+
+    workbook.save(target)
+    return target
+
+
+def write_batch(faturas: List[Dict[str, Any]], target: Target, erros: Optional[List[Dict[str, Any]]] = None) -> Target:
+    """
+    Escreve várias faturas, com uma planilha de resumo e outra de transações para cada uma.
+
+    Args:
+        faturas: Lista com os dados de cada fatura
+        target: Caminho do arquivo ou arquivo binário aberto
+        erros: Arquivos do lote que não puderam ser processados (opcional)
+
+    Returns:
+        O destino informado
+    """
+    workbook = Workbook(write_only=True)
+
+    for idx, data in enumerate(faturas):
+        sheet_name = f"Fatura {idx + 1}"
+
+        resumo = workbook.create_sheet(sheet_name)
+        _append_header(resumo, ['Titular', 'Número do Cartão', 'Data de Fechamento', 'Valor Total'])
+        resumo.append([data.get('titular', ''), data.get('numero_cartao', ''), data.get('data_fechamento', ''), data.get('valor_total', '')])
+
+        transacoes = TransactionTable.coerce(data.get('transacoes'))
+        if transacoes:
+            _append_table(workbook.create_sheet(f"{sheet_name} - Transações"), transacoes)
+
+    if erros:
+        sheet = workbook.create_sheet("Erros")
+        _append_transactions(sheet, transaction_columns(erros), erros)
+
+    # Um arquivo xlsx precisa de ao menos uma planilha
+    if not workbook.worksheets:
+        workbook.create_sheet("Faturas")
+
+    workbook.save(target)
+    return target
+
+
+def _append_header(sheet: Any, columns: List[str]) -> None:
+    """Escreve a linha de cabeçalho em negrito"""
+    cells = []
+    for column in columns:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.font = HEADER_FONT
+        cells.append(cell)
+    sheet.append(cells)
+
+
+def _append_table(sheet: Any, table: TransactionTable) -> None:
+    """Escreve uma linha por transação, direto das colunas da tabela"""
+    _append_header(sheet, list(RECORD_FIELDS))
+    append = sheet.append
+    for date, descricao, cents, categoria in table.iter_tuples():
+        append([date, descricao, cents / 100, categoria])
+
+
+def _append_transactions(sheet: Any, columns: List[str], rows: Iterable[Dict[str, Any]]) -> None:
+    """Escreve uma linha por dicionário (usado na planilha de erros)"""
+    _append_header(sheet, columns)
+    append = sheet.append
+    for row in rows:
+        append([row.get(column) for column in columns])
@@ -1,102 +1,137 @@
 """
 Utilitário para detectar qual o banco emissor de uma fatura de cartão de crédito.
 """
-import os
-import PyPDF2
-import re
-from typing import Optional, Dict, Any
+import logging
+from typing import Optional, Dict, Any, List, Pattern, Union
+from app.utils.parsed_document import ParsedDocument
+from app.services.pattern_registry import get_pattern_registry
+from app.services.extraction_limits import ExtractionLimitError
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
 
 class BankDetector:
     """
     Classe responsável por detectar o banco emissor de uma fatura de cartão de crédito.
     """
     
-    # Padrões para identificação de diferentes bancos
-    BANK_PATTERNS = {
-        'banco_do_brasil': [
-            r'OUROCARD',
-            r'BB\s+',
-            r'Banco\s+do\s+Brasil',
-            r'www\.bb\.com\.br',
-            r'Iago\s+De\s+Paula\s+Cabra',
-            r'Cartão\s+\d+',
-            r'SALDO\s+FATURA\s+ANTERIOR',
-            r'Pagamentos/Créditos'
-        ],
-        'nubank': [
-            r'Nu\s+Pagamentos',
-            r'Nubank',
-            r'www\.nubank\.com\.br'
-        ],
-        'itau': [
-            r'Ita[úu]',
-            r'www\.itau\.com\.br'
-        ],
-        'bradesco': [
-            r'Bradesco',
-            r'www\.bradesco\.com\.br'
-        ],
-        'santander': [
-            r'Santander',
-            r'www\.santander\.com\.br'
-        ]
-        # Adicione mais bancos conforme necessário
-    }
+    # Os padrões de identificação de cada banco ficam no registro de padrões
+    # (app/core/bank_patterns.json), compilados uma única vez por versão.
     
     @classmethod
-    def detect_bank(cls, pdf_path: str) -> Optional[str]:
+    def compile_patterns(cls) -> Dict[str, List[Pattern]]:
         """
-        Detecta o banco emissor de uma fatura de cartão de crédito.
+        Retorna os padrões de identificação compilados de todos os bancos.
+        
+        Returns:
+            Dicionário com id do banco e lista de padrões compilados
+        """
+        snapshot = get_pattern_registry().snapshot()
+        return {bank_id: bank.detection for bank_id, bank in snapshot.banks.items()}
+    
+    @classmethod
+    def detect(cls, source: Union[str, ParsedDocument]) -> Dict[str, Any]:
+        """
+        Detecta o banco emissor pontuando os sinais de todos os bancos.
+        
+        O texto é percorrido uma única vez com a expressão combinada do registro
+        de padrões. Cada sinal encontrado soma o seu peso ao banco correspondente
+        (uma vez por sinal, por mais que se repita). Vence o banco de maior
+        pontuação, desde que atinja a pontuação mínima do arquivo de padrões; a
+        confiança é a fração da pontuação total que coube ao vencedor.
         
         Args:
-            pdf_path: Caminho para o arquivo PDF da fatura
+            source: Caminho para o arquivo PDF da fatura ou documento já carregado
             
         Returns:
-            String com o identificador do banco ou None se não for possível identificar
+            Dicionário com bank_id (ou None), confidence (0 a 1) e a pontuação de cada banco
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
-            
+        document = ParsedDocument.open(source)
+        
         try:
-            # Extrai o texto do PDF
-            text = cls._extract_text_from_pdf(pdf_path)
-            
-            # Verifica os padrões de cada banco
-            for bank_id, patterns in cls.BANK_PATTERNS.items():
-                for pattern in patterns:
-                    if re.search(pattern, text, re.IGNORECASE):
-                        return bank_id
-            
-            # Se não encontrou nenhum padrão conhecido
-            return None
+            with metrics.stage("detect"):
+                # Extrai o texto do PDF
+                text = cls._extract_text_from_pdf(document)
+                detection = cls.score_text(text)
+            metrics.DETECTED_BANKS.inc(detection["bank_id"] or "unknown")
+            return detection
+        
+        except ExtractionLimitError:
+            # Documento acima dos limites: a API responde 422, não "banco não detectado"
+            raise
                 
         except Exception as e:
-            print(f"Erro ao detectar banco do PDF: {str(e)}")
-            return None
+            logger.error(f"Erro ao detectar banco do PDF: {str(e)}")
+            metrics.record_error("detect", e)
+            return {"bank_id": None, "confidence": 0.0, "scores": {}}
     
-    @staticmethod
-    def _extract_text_from_pdf(pdf_path: str) -> str:
+    @classmethod
+    def score_text(cls, text: str) -> Dict[str, Any]:
         """
-        Extrai o texto de um arquivo PDF.
+        Pontua os bancos a partir do texto de uma fatura.
         
         Args:
-            pdf_path: Caminho para o arquivo PDF
+            text: Texto das primeiras páginas da fatura
             
         Returns:
-            Texto extraído do PDF
+            Dicionário com bank_id (ou None), confidence (0 a 1) e a pontuação de cada banco
+        """
+        snapshot = get_pattern_registry().snapshot()
+        if snapshot.detector is None:
+            return {"bank_id": None, "confidence": 0.0, "scores": {}}
+        
+        # Uma única varredura; cada grupo nomeado identifica o sinal que casou
+        found = set()
+        for match in snapshot.detector.finditer(text):
+            found.add(match.lastgroup)
+            if len(found) == len(snapshot.detector_signals):
+                break
+        
+        scores: Dict[str, float] = {}
+        for signal in found:
+            bank_id, weight = snapshot.detector_signals[signal]
+            scores[bank_id] = scores.get(bank_id, 0.0) + weight
+        
+        if not scores:
+            return {"bank_id": None, "confidence": 0.0, "scores": {}}
+        
+        # Empates ficam com o banco que aparece primeiro no arquivo de padrões
+        order = list(snapshot.banks)
+        bank_id = max(scores, key=lambda bank: (scores[bank], -order.index(bank)))
+        best = scores[bank_id]
+        
+        if best < snapshot.min_detection_score:
+            return {"bank_id": None, "confidence": 0.0, "scores": scores}
+        
+        return {"bank_id": bank_id, "confidence": round(best / sum(scores.values()), 3), "scores": scores}
+    
+    @classmethod
+    def detect_bank(cls, source: Union[str, ParsedDocument]) -> Optional[str]:
         """
-        full_text = ""
+        Detecta o banco emissor de uma fatura de cartão de crédito.
         
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+        Args:
+            source: Caminho para o arquivo PDF da fatura ou documento já carregado
             
-            # Extrai o texto das primeiras páginas (geralmente suficiente para identificar o banco)
-            pages_to_check = min(2, len(reader.pages))
-            for page_num in range(pages_to_check):
-                page = reader.pages[page_num]
-                full_text += page.extract_text()
-                
-        return full_text
+        Returns:
+            String com o identificador do banco ou None se não for possível identificar
+        """
+        return cls.detect(source)["bank_id"]
+    
+    @staticmethod
+    def _extract_text_from_pdf(document: ParsedDocument) -> str:
+        """
+        Extrai o texto das primeiras páginas de um documento PDF.
+        
+        Args:
+            document: Documento PDF carregado
+            
+        Returns:
+            Texto extraído do PDF
+        """
+        # Extrai o texto das primeiras páginas (geralmente suficiente para identificar o banco).
+        # O texto fica memorizado no documento e é reaproveitado pela extração.
+        return document.text(max_pages=2)
     
     @classmethod
     def get_available_banks(cls) -> Dict[str, str]:
@@ -106,14 +141,8 @@ class BankDetector:
         Returns:
             Dicionário com id do banco e nome amigável
         """
-        return {
-            'banco_do_brasil': 'Banco do Brasil',
-            'nubank': 'Nubank',
-            'itau': 'Itaú',
-            'bradesco': 'Bradesco',
-            'santander': 'Santander',
-            # Adicione mais bancos conforme necessário
-        }
+        snapshot = get_pattern_registry().snapshot()
+        return {bank_id: bank.name for bank_id, bank in snapshot.banks.items()}
 
 
 if __name__ == "__main__":
@@ -123,10 +152,11 @@ if __name__ == "__main__":
         print("Uso: python bank_detector.py <caminho_do_pdf>")
     else:
         pdf_path = sys.argv[1]
-        bank = BankDetector.detect_bank(pdf_path)
+        result = BankDetector.detect(pdf_path)
+        bank = result["bank_id"]
         
         if bank:
             banks = BankDetector.get_available_banks()
-            print(f"Banco detectado: {banks.get(bank, bank)}")
+            print(f"Banco detectado: {banks.get(bank, bank)} (confiança {result['confidence']:.0%})")
         else:
             print("Não foi possível identificar o banco emissor da fatura.")
@@ -0,0 +1,361 @@
+"""
+Gerador determinístico de faturas sintéticas para testes de carga e de escala.
+
+Produz faturas no layout de cada banco suportado (Banco do Brasil, Nubank,
+Itaú, Bradesco e Santander) a partir de uma semente, com número de páginas,
+transações por página, vocabulário de estabelecimentos e ruído configuráveis.
+Ao lado de cada PDF é gravado o resultado esperado da extração
+(<nome>.expected.json), e o diretório recebe um manifest.json com os
+parâmetros usados.
+
+Uso:
+    python -m app.utils.generate_invoice_corpus saida/ [--banks nubank itau] [--pages 1 10 50 200]
+        [--transactions-per-page 25] [--count 1] [--noise 0.3] [--seed 42] [--vocabulary arquivo.json]
+"""
+import io
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.utils.money import format_cents
+
+# Layouts suportados: faixa do topo da página, valores com "R$" e rótulo da seção de transações
+LAYOUTS: Dict[str, Dict[str, Any]] = {
+    "banco_do_brasil": {"banner": ["OUROCARD INTERNACIONAL VISA", "Banco do Brasil - www.bb.com.br"], "currency": True},
+    "nubank": {"banner": ["Nubank - Fatura do cartão", "Nu Pagamentos S.A."], "currency": True, "section": "Transações"},
+    "itau": {"banner": ["Itaú Cartões", "www.itau.com.br"], "currency": False, "section": "Lançamentos nacionais"},
+    "bradesco": {"banner": ["Bradesco Cartões", "www.bradesco.com.br"], "currency": False, "section": "Lançamentos"},
+    "santander": {"banner": ["Santander - Fatura do cartão", "www.santander.com.br"], "currency": True, "section": "Despesas"},
+}
+
+# Estabelecimentos (sem dígitos, como exige o padrão genérico) e a categoria esperada de cada um
+DEFAULT_VOCABULARY: List[Dict[str, Optional[str]]] = [
+    {"descricao": "SUPERMERCADO BOM PRECO", "categoria": "Supermercado"},
+    {"descricao": "CARREFOUR HIPER", "categoria": "Supermercado"},
+    {"descricao": "ATACADAO", "categoria": "Supermercado"},
+    {"descricao": "HORTIFRUTI QUITANDA", "categoria": "Supermercado"},
+    {"descricao": "RESTAURANTE SABOR CASEIRO", "categoria": "Alimentação"},
+    {"descricao": "PADARIA PAO DOURADO", "categoria": "Alimentação"},
+    {"descricao": "IFOOD *RESTAURANTE", "categoria": "Alimentação"},
+    {"descricao": "PIZZARIA BELLA NAPOLI", "categoria": "Alimentação"},
+    {"descricao": "DROGASIL", "categoria": "Saúde"},
+    {"descricao": "DROGA RAIA", "categoria": "Saúde"},
+    {"descricao": "FARMACIA POPULAR", "categoria": "Saúde"},
+    {"descricao": "UBER *TRIP", "categoria": "Transporte"},
+    {"descricao": "POSTO SHELL", "categoria": "Transporte"},
+    {"descricao": "TAXI EXECUTIVO", "categoria": "Transporte"},
+    {"descricao": "CINEMARK SHOPPING", "categoria": "Entretenimento"},
+    {"descricao": "NETFLIX.COM", "categoria": "Entretenimento"},
+    {"descricao": "SPOTIFY", "categoria": "Entretenimento"},
+    {"descricao": "LIVRARIA CULTURA", "categoria": None},
+    {"descricao": "AMAZON MARKETPLACE", "categoria": None},
+    {"descricao": "LOJAS RENNER", "categoria": None},
+]
+
+# Titulares (o padrão do BB exige nomes com iniciais maiúsculas e sem acentos)
+HOLDERS = ["Joao Da Silva", "Maria Oliveira", "Ana Paula Souza", "Carlos Eduardo Lima", "Fernanda Costa", "Rafael Almeida"]
+
+# Ruído que a extração deve remover: cidade e país (BB) e sufixos de país (demais bancos)
+BB_CITIES = ["BRASILIA", "SAO PAULO", "OSASCO", "CURITIBA"]
+GENERIC_SUFFIXES = ["BR", "BRASIL"]
+# Linhas sem transação intercaladas (as do BB estão entre as linhas ignoradas pelo extrator)
+BB_FILLERS = ["Lazer", "Restaurantes", "Saúde", "Serviços"]
+GENERIC_FILLERS = ["Compras no cartão", "Continua na próxima página", "Lançamentos no exterior"]
+
+MAX_PAGES = 200
+PAGE_WIDTH, PAGE_HEIGHT = 612.0, 792.0  # Carta, em pontos
+
+
+def load_vocabulary(path: str) -> List[Dict[str, Optional[str]]]:
+    """
+    Carrega um vocabulário de estabelecimentos.
+
+    Args:
+        path: Arquivo JSON com uma lista de {"descricao": ..., "categoria": ... ou null}
+
+    Returns:
+        Lista de estabelecimentos
+    """
+    with open(path, encoding="utf-8") as file:
+        vocabulary = json.load(file)
+    if not isinstance(vocabulary, list) or not vocabulary:
+        raise ValueError("O vocabulário deve ser uma lista não vazia de estabelecimentos")
+    for merchant in vocabulary:
+        descricao = merchant.get("descricao") if isinstance(merchant, dict) else None
+        if not descricao or any(char.isdigit() for char in descricao):
+            raise ValueError(f"Estabelecimento inválido no vocabulário (descrição vazia ou com dígitos): {merchant!r}")
+    return vocabulary
+
+
+def build_invoice(
+    bank_id: str,
+    rng: random.Random,
+    pages: int,
+    transactions_per_page: int,
+    vocabulary: Sequence[Dict[str, Optional[str]]] = DEFAULT_VOCABULARY,
+    noise: float = 0.3,
+) -> Tuple[List[List[str]], Dict[str, Any]]:
+    """
+    Monta as linhas de cada página de uma fatura e o resultado esperado da extração.
+
+    Args:
+        bank_id: Layout do banco (chave de LAYOUTS)
+        rng: Gerador pseudoaleatório (determina todo o conteúdo)
+        pages: Número de páginas (1 a MAX_PAGES)
+        transactions_per_page: Transações em cada página
+        vocabulary: Estabelecimentos sorteados para as transações
+        noise: Probabilidade (0 a 1) de cada transação trazer cidade/país e espaços extras
+            e de uma linha sem transação ser intercalada
+
+    Returns:
+        Linhas de cada página e dicionário com os campos esperados da extração
+    """
+    if bank_id not in LAYOUTS:
+        raise ValueError(f"Layout desconhecido: {bank_id}")
+    if not 1 <= pages <= MAX_PAGES:
+        raise ValueError(f"O número de páginas deve estar entre 1 e {MAX_PAGES}")
+
+    layout = LAYOUTS[bank_id]
+    is_bb = bank_id == "banco_do_brasil"
+    holder = rng.choice(HOLDERS)
+    card = f"{rng.randint(0, 9999):04d}"
+    closing = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+    due = closing + timedelta(days=7)
+
+    count = pages * transactions_per_page
+    offsets = sorted(rng.randrange(30) for _ in range(count))
+    transacoes = []
+    for offset in offsets:
+        merchant = rng.choice(vocabulary)
+        # Valores em centavos; parte acima de mil reais exercita o separador de milhar
+        cents = rng.randint(100, 250000) if rng.random() < 0.1 else rng.randint(100, 90000)
+        transacoes.append({
+            "data": (closing - timedelta(days=29 - offset)).strftime("%d/%m"),
+            "descricao": merchant["descricao"],
+            "valor": cents / 100,
+            "categoria": merchant.get("categoria"),
+            "_cents": cents,
+        })
+    total = format_cents(sum(transacao.pop("_cents") for transacao in transacoes))
+
+    def money(value: float) -> str:
+        text = format_cents(round(value * 100))
+        return f"R$ {text}" if layout["currency"] else text
+
+    if is_bb:
+        header = [
+            f"{holder} (Cartão {card})",
+            f"Vencimento {due:%d/%m/%Y}",
+            f"Total da fatura R$ {total}",
+            "Data Descrição Valor",
+            f"SALDO FATURA ANTERIOR R$ {format_cents(rng.randint(10000, 500000))}",
+        ]
+    else:
+        header = [
+            f"Nome: {holder.upper()}",
+            f"Cartão: ****{card}",
+            f"Fechamento: {closing:%d/%m/%Y}",
+            f"Vencimento {due:%d/%m/%Y}",
+            f"Total R$ {total}",
+            layout["section"],
+        ]
+
+    page_lines = []
+    for page in range(pages):
+        lines = list(layout["banner"]) + (header if page == 0 else [])
+        for transacao in transacoes[page * transactions_per_page:(page + 1) * transactions_per_page]:
+            if rng.random() < noise:
+                lines.append(rng.choice(BB_FILLERS if is_bb else GENERIC_FILLERS))
+            descricao = transacao["descricao"]
+            if rng.random() < noise:
+                descricao = descricao.replace(" ", "  ", 1)
+                suffix = f"{rng.choice(BB_CITIES)} BR" if is_bb else rng.choice(GENERIC_SUFFIXES)
+                descricao = f"{descricao} {suffix}"
+            lines.append(f"{transacao['data']} {descricao} {money(transacao['valor'])}")
+        lines.append(f"Página {page + 1} de {pages}")
+        page_lines.append(lines)
+
+    expected = {
+        "titular": holder if is_bb else holder.upper(),
+        "numero_cartao": card if is_bb else f"****{card}",
+        "data_fechamento": f"{closing:%d/%m/%Y}",
+        "data_vencimento": f"{due:%d/%m/%Y}",
+        "valor_total": total,
+        "banco": bank_id,
+        "transacoes": transacoes,
+    }
+    return page_lines, expected
+
+
+def render_pdf(page_lines: List[List[str]]) -> bytes:
+    """
+    Desenha as páginas em um PDF, uma linha de texto por linha da página.
+
+    O PDF é gerado em modo invariante (sem data de criação nem identificador
+    aleatório), então a mesma entrada sempre produz os mesmos bytes.
+
+    Args:
+        page_lines: Linhas de cada página
+
+    Returns:
+        Conteúdo do PDF
+    """
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(PAGE_WIDTH, PAGE_HEIGHT), invariant=1)
+    for lines in page_lines:
+        # Reduz o espaçamento para que páginas com muitas transações caibam na folha
+        leading = min(16.0, (PAGE_HEIGHT - 100) / max(1, len(lines)))
+        c.setFont("Helvetica", min(10.0, leading * 0.8))
+        y_position = PAGE_HEIGHT - 50
+        for line in lines:
+            c.drawString(50, y_position, line)
+            y_position -= leading
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def generate_corpus(
+    output_dir: str,
+    banks: Sequence[str] = tuple(LAYOUTS),
+    pages: Sequence[int] = (1,),
+    transactions_per_page: int = 25,
+    count: int = 1,
+    noise: float = 0.3,
+    seed: int = 42,
+    vocabulary: Sequence[Dict[str, Optional[str]]] = DEFAULT_VOCABULARY,
+) -> List[str]:
+    """
+    Gera um corpus de faturas sintéticas com o resultado esperado ao lado de cada PDF.
+
+    Cada fatura tem um gerador próprio derivado da semente, do banco, do
+    número de páginas e do índice, então o conteúdo de um arquivo não depende
+    dos demais parâmetros do corpus.
+
+    Args:
+        output_dir: Diretório de saída
+        banks: Layouts gerados
+        pages: Números de páginas (uma série de faturas para cada valor)
+        transactions_per_page: Transações em cada página
+        count: Faturas por banco e número de páginas
+        noise: Probabilidade de ruído (ver build_invoice)
+        seed: Semente do gerador
+        vocabulary: Estabelecimentos sorteados para as transações
+
+    Returns:
+        Caminhos dos PDFs gerados
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for bank_id in banks:
+        for page_count in pages:
+            for index in range(count):
+                rng = random.Random(f"{seed}:{bank_id}:{page_count}:{index}")
+                page_lines, expected = build_invoice(bank_id, rng, page_count, transactions_per_page, vocabulary, noise)
+                name = f"{bank_id}_{page_count:03d}p_{index:02d}"
+                pdf_path = os.path.join(output_dir, f"{name}.pdf")
+                with open(pdf_path, "wb") as file:
+                    file.write(render_pdf(page_lines))
+                with open(os.path.join(output_dir, f"{name}.expected.json"), "w", encoding="utf-8") as file:
+                    json.dump(expected, file, ensure_ascii=False, indent=2)
+                paths.append(pdf_path)
+
+    manifest = {
+        "seed": seed,
+        "banks": list(banks),
+        "pages": list(pages),
+        "transactions_per_page": transactions_per_page,
+        "count": count,
+        "noise": noise,
+        "files": [os.path.basename(path) for path in paths],
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    return paths
+
+
+def expected_path(pdf_path: str) -> str:
+    """Caminho do resultado esperado de um PDF do corpus"""
+    return f"{os.path.splitext(pdf_path)[0]}.expected.json"
+
+
+def score_extraction(expected: Dict[str, Any], actual: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compara o resultado da extração com o esperado.
+
+    As transações são comparadas como multiconjuntos de (data, descrição,
+    valor, categoria), sem depender da ordem.
+
+    Args:
+        expected: Resultado esperado (arquivo .expected.json)
+        actual: Resultado de PDFExtractor.extract
+
+    Returns:
+        Campos do cabeçalho divergentes, acertos, precisão e revocação das transações
+    """
+    fields = [field for field in expected if field != "transacoes"]
+    mismatched = [field for field in fields if expected[field] != actual.get(field)]
+
+    def key(transacao: Dict[str, Any]) -> Tuple:
+        return (transacao.get("data"), transacao.get("descricao"), round(float(transacao.get("valor") or 0), 2), transacao.get("categoria"))
+
+    remaining: Dict[Tuple, int] = {}
+    for transacao in expected["transacoes"]:
+        remaining[key(transacao)] = remaining.get(key(transacao), 0) + 1
+    matched = 0
+    for transacao in actual.get("transacoes") or []:
+        if remaining.get(key(transacao)):
+            remaining[key(transacao)] -= 1
+            matched += 1
+
+    extracted = len(actual.get("transacoes") or [])
+    return {
+        "campos_divergentes": mismatched,
+        "transacoes_esperadas": len(expected["transacoes"]),
+        "transacoes_extraidas": extracted,
+        "transacoes_corretas": matched,
+        "precisao": matched / extracted if extracted else 1.0,
+        "revocacao": matched / len(expected["transacoes"]) if expected["transacoes"] else 1.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Linha de comando do gerador"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir", help="Diretório de saída")
+    parser.add_argument("--banks", nargs="+", choices=list(LAYOUTS), default=list(LAYOUTS), help="Layouts gerados")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1], help=f"Números de páginas (1 a {MAX_PAGES})")
+    parser.add_argument("--transactions-per-page", type=int, default=25, help="Transações por página")
+    parser.add_argument("--count", type=int, default=1, help="Faturas por banco e número de páginas")
+    parser.add_argument("--noise", type=float, default=0.3, help="Probabilidade de ruído (0 a 1)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    parser.add_argument("--vocabulary", help="JSON com a lista de estabelecimentos ({\"descricao\", \"categoria\"})")
+    args = parser.parse_args(argv)
+
+    if any(not 1 <= pages <= MAX_PAGES for pages in args.pages):
+        parser.error(f"--pages deve estar entre 1 e {MAX_PAGES}")
+    if not 0 <= args.noise <= 1:
+        parser.error("--noise deve estar entre 0 e 1")
+    vocabulary = load_vocabulary(args.vocabulary) if args.vocabulary else DEFAULT_VOCABULARY
+
+    paths = generate_corpus(
+        args.output_dir,
+        banks=args.banks,
+        pages=args.pages,
+        transactions_per_page=args.transactions_per_page,
+        count=args.count,
+        noise=args.noise,
+        seed=args.seed,
+        vocabulary=vocabulary,
+    )
+    print(f"{len(paths)} fatura(s) gerada(s) em {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
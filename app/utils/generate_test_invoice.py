@@ -96,5 +96,64 @@ def generate_test_invoice():
     print(f"Arquivo de teste gerado: {output_file}")
     return output_file
 
+def generate_bb_test_invoice():
+    """
+    Gera um arquivo PDF no layout de fatura OUROCARD do Banco do Brasil para testes.
+    """
+    os.makedirs("app/static/test_data", exist_ok=True)
+    
+    output_file = "app/static/test_data/fatura_bb_teste.pdf"
+    
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    
+    # Cada página é uma lista de linhas; o layout imita o texto extraído das faturas do BB
+    pages = [
+        [
+            "OUROCARD INTERNACIONAL VISA",
+            "Joao Da Silva (Cartão 4321)",
+            "Vencimento 10/07/2025",
+            "Total da fatura R$ 1.234,56",
+            "Data Descrição Valor",
+            "SALDO FATURA ANTERIOR R$ 980,10",
+            "Pagamentos/Créditos",
+            "05/06 PGTO DEBITO CONTA R$ 980,10",
+            "Lazer",
+            "02/06 CINEMARK SHOPPING BRASILIA BR R$ 64,00",
+            "Restaurantes",
+            "03/06 IFOOD *RESTAURANTE SAO PAULO BR R$ 58,90",
+            "07/06 PADARIA PAO DOURADO BRASILIA BR R$ 23,45",
+            "Página 1 de 2",
+        ],
+        [
+            "Data Descrição Valor",
+            "Saúde",
+            "09/06 DROGARIA SAO PAULO OSASCO BR R$ 102,30",
+            "Serviços",
+            "12/06 NETFLIX.COM SAO PAULO BR R$ 39,90",
+            "15/06 UBER *TRIP SAO PAULO BR R$ 1.016,01",
+            "18/06 PGTO. CASH AG. 1234 R$ 200,00",
+            "Página 2 de 2",
+        ],
+    ]
+    
+    for lines in pages:
+        c.setFont("Helvetica", 10)
+        y_position = height - 50
+        for line in lines:
+            c.drawString(50, y_position, line)
+            y_position -= 16
+        c.showPage()
+    
+    c.save()
+    
+    with open(output_file, "wb") as f:
+        f.write(buffer.getvalue())
+    
+    print(f"Arquivo de teste gerado: {output_file}")
+    return output_file
+
 if __name__ == "__main__":
     generate_test_invoice()
+    generate_bb_test_invoice()
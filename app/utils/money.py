@@ -0,0 +1,144 @@
+"""
+Conversão de valores monetários em formato brasileiro para centavos inteiros.
+
+Todos os parsers de transações, os totais e os exportadores usam as mesmas
+regras, sem passar por float:
+
+- vírgula decimal e pontos de milhar: "1.234,56", "R$ 12,00", "0,5";
+- sem vírgula, um ponto seguido de até dois dígitos é decimal ("1234.56"),
+  outros pontos são de milhar ("1.234" = 1234 reais);
+- negativos com "-" antes ou depois do número, "−", parênteses ou os
+  marcadores de crédito "C" e "CR" no fim ("85,50-", "(85,50)", "85,50 CR").
+
+parse_cents_column converte uma coluna inteira: quando todos os valores
+estão no formato canônico (vírgula e dois decimais), a limpeza, a conferência
+e a conversão são feitas sobre o texto da coluna de uma vez, sem um laço em
+Python por valor.
+"""
+import re
+from array import array
+from decimal import Decimal
+from typing import List, Optional, Sequence
+
+# Valor no formato canônico, já sem símbolo e espaços: vírgula e dois decimais
+_CANONICAL_VALUE = re.compile(r"-?(?:\d{1,3}(?:\.\d{3})+|\d+),\d\d")
+# Caracteres ignorados no texto de uma coluna: símbolo da moeda, espaços e pontos de milhar
+_COLUMN_NOISE = str.maketrans("", "", "R$ \xa0\t.")
+# Coluna inteira no formato canônico (sem os pontos de milhar), um valor por linha
+_CANONICAL_COLUMN = re.compile(r"(?:-?\d+,\d\d\n)*-?\d+,\d\d")
+
+
+def _strip_noise(text: str) -> str:
+    """Remove o símbolo da moeda e os espaços (inclusive o não separável)"""
+    return text.replace("R$", "").replace("$", "").replace(" ", "").replace("\xa0", "").replace("\t", "")
+
+
+def parse_cents(text: Optional[str]) -> Optional[int]:
+    """
+    Converte um valor monetário em centavos.
+
+    Args:
+        text: Valor como aparece na fatura ("R$ 1.234,56", "85,50-"...)
+
+    Returns:
+        Valor em centavos ou None se o texto não for um valor
+    """
+    if text is None:
+        return None
+    value = _strip_noise(text)
+    if _CANONICAL_VALUE.fullmatch(value):
+        return int(value.replace(".", "").replace(",", ""))
+    if not value:
+        return None
+
+    negative = False
+    upper = value.upper()
+    if upper.endswith("CR"):
+        negative, value = True, value[:-2]
+    elif upper.endswith("C"):
+        negative, value = True, value[:-1]
+    elif upper.endswith("D"):
+        # D (débito) é apenas informativo
+        value = value[:-1]
+    if value.startswith("(") and value.endswith(")"):
+        negative, value = True, value[1:-1]
+    if value[:1] in ("-", "−"):
+        negative, value = not negative, value[1:]
+    elif value[-1:] in ("-", "−"):
+        negative, value = not negative, value[:-1]
+    elif value[:1] == "+":
+        value = value[1:]
+
+    integer, comma, fraction = value.rpartition(",")
+    if comma:
+        integer = integer.replace(".", "")
+    else:
+        integer, dot, fraction = value.rpartition(".")
+        if not dot:
+            integer, fraction = value, ""
+        elif len(fraction) > 2 or "." in integer:
+            # Pontos de milhar: "1.234", "1.234.567"
+            integer, fraction = value.replace(".", ""), ""
+
+    if len(fraction) > 2 or not (integer or fraction) or not _is_digits(integer) or not _is_digits(fraction):
+        return None
+    cents = int(integer or "0") * 100 + int((fraction + "00")[:2])
+    return -cents if negative else cents
+
+
+def _is_digits(text: str) -> bool:
+    """Texto vazio ou só com dígitos ASCII"""
+    return not text or (text.isascii() and text.isdigit())
+
+
+def parse_cents_column(texts: Sequence[Optional[str]]) -> List[Optional[int]]:
+    """
+    Converte uma coluna de valores monetários em centavos.
+
+    Args:
+        texts: Valores como aparecem na fatura
+
+    Returns:
+        Lista de centavos (None nos valores inválidos), na mesma ordem
+    """
+    if not texts:
+        return []
+    try:
+        joined = "\n".join(texts).translate(_COLUMN_NOISE)
+    except TypeError:
+        # Algum valor não é texto (None)
+        return [parse_cents(text) for text in texts]
+    if joined.count("\n") == len(texts) - 1 and _CANONICAL_COLUMN.fullmatch(joined):
+        return list(map(int, joined.replace(",", "").split("\n")))
+    return [parse_cents(text) for text in texts]
+
+
+def parse_cents_array(texts: Sequence[Optional[str]]) -> array:
+    """
+    Converte uma coluna de valores monetários em um array int64 de centavos.
+
+    Args:
+        texts: Valores como aparecem na fatura
+
+    Returns:
+        array("q") com os centavos
+
+    Raises:
+        ValueError: Se algum valor não puder ser convertido
+    """
+    values = parse_cents_column(texts)
+    if None in values:
+        raise ValueError(f"Valor monetário inválido: {texts[values.index(None)]!r}")
+    return array("q", values)
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    """Converte centavos em Decimal com duas casas"""
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents: int) -> str:
+    """Formata centavos no formato brasileiro (-1.234,56)"""
+    reais, centavos = divmod(abs(cents), 100)
+    text = f"{reais:,}".replace(",", ".") + f",{centavos:02d}"
+    return f"-{text}" if cents < 0 else text
@@ -0,0 +1,167 @@
+"""
+Representação de um PDF decodificado uma única vez e compartilhado entre
+validação, detecção de banco e extração de dados.
+"""
+import io
+import os
+import logging
+from typing import TYPE_CHECKING, Iterator, List, Optional, Union
+from app.services import extraction_limits
+
+if TYPE_CHECKING:
+    import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+
+def __getattr__(name: str):
+    """Expõe parsed_document.PyPDF2 importando o pacote apenas no primeiro acesso"""
+    if name == "PyPDF2":
+        import PyPDF2
+
+        return PyPDF2
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class ParsedDocument:
+    """
+    Documento PDF aberto uma única vez.
+
+    Guarda o conteúdo bruto, o leitor do PyPDF2, o número de páginas e o texto
+    de cada página. O texto é extraído sob demanda e memorizado, de forma que a
+    detecção (que lê só as primeiras páginas) e a extração (que lê todas)
+    nunca decodificam a mesma página duas vezes.
+    """
+
+    def __init__(self, data: Union[bytes, memoryview], name: str = "documento.pdf"):
+        """
+        Inicializa o documento a partir do conteúdo do PDF em memória.
+
+        Args:
+            data: Conteúdo binário do PDF (bytes ou memoryview, sem cópia)
+            name: Nome ou caminho de origem do arquivo (usado em mensagens e validação)
+        """
+        self.data = data
+        self.name = name
+        self._reader: Optional["PyPDF2.PdfReader"] = None
+        self._page_texts: Optional[List[Optional[str]]] = None
+
+    @classmethod
+    def from_path(cls, pdf_path: str) -> "ParsedDocument":
+        """
+        Carrega um documento a partir de um arquivo em disco.
+
+        Args:
+            pdf_path: Caminho para o arquivo PDF
+
+        Returns:
+            Instância de ParsedDocument
+        """
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
+
+        with open(pdf_path, 'rb') as file:
+            data = file.read()
+
+        return cls(data, name=pdf_path)
+
+    @classmethod
+    def open(cls, source: Union[str, bytes, memoryview, "ParsedDocument"], name: Optional[str] = None) -> "ParsedDocument":
+        """
+        Retorna o próprio documento ou o carrega a partir de um caminho ou
+        do conteúdo em memória.
+
+        Args:
+            source: Caminho para o PDF, conteúdo binário ou documento já carregado
+            name: Nome do arquivo quando source é o conteúdo em memória
+
+        Returns:
+            Instância de ParsedDocument
+        """
+        if isinstance(source, ParsedDocument):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cls(source, name=name or "documento.pdf")
+        return cls.from_path(source)
+
+    @property
+    def size(self) -> int:
+        """Tamanho do PDF em bytes"""
+        return len(self.data)
+
+    @property
+    def header(self) -> bytes:
+        """Primeiros bytes do arquivo (assinatura do PDF)"""
+        return bytes(self.data[:4])
+
+    @property
+    def reader(self) -> "PyPDF2.PdfReader":
+        """Leitor do PyPDF2, criado (e importado) na primeira vez em que é necessário"""
+        if self._reader is None:
+            import PyPDF2
+
+            self._reader = PyPDF2.PdfReader(io.BytesIO(self.data))
+        return self._reader
+
+    @property
+    def page_count(self) -> int:
+        """Número de páginas do documento (conferido contra os limites da extração em andamento)"""
+        count = len(self.reader.pages)
+        extraction_limits.check_page_count(count)
+        return count
+
+    def page_text(self, page_num: int) -> str:
+        """
+        Retorna o texto de uma página, extraindo-o apenas na primeira chamada.
+
+        Args:
+            page_num: Índice da página (começando em 0)
+
+        Returns:
+            Texto extraído da página
+        """
+        if self._page_texts is None:
+            self._page_texts = [None] * self.page_count
+
+        text = self._page_texts[page_num]
+        if text is None:
+            text = self._decode_page(page_num)
+            self._page_texts[page_num] = text
+        return text
+
+    def _decode_page(self, page_num: int) -> str:
+        """Extrai o texto de uma página e o confere contra os limites da extração em andamento"""
+        text = self.reader.pages[page_num].extract_text() or ""
+        extraction_limits.check_page(page_num, text)
+        return text
+
+    def text(self, max_pages: Optional[int] = None) -> str:
+        """
+        Retorna o texto concatenado das páginas do documento.
+
+        Args:
+            max_pages: Número máximo de páginas a considerar (todas se None)
+
+        Returns:
+            Texto das páginas solicitadas
+        """
+        pages = self.page_count if max_pages is None else min(max_pages, self.page_count)
+        return "".join(self.page_text(page_num) for page_num in range(pages))
+
+    def iter_pages(self) -> Iterator[str]:
+        """
+        Percorre o texto das páginas sob demanda, sem memorizá-lo.
+        
+        As páginas já extraídas (por exemplo, na detecção do banco) são
+        reaproveitadas; as demais são decodificadas uma de cada vez e
+        descartadas, de forma que o documento inteiro nunca fica em memória
+        como texto.
+        
+        Returns:
+            Iterador com o texto de cada página
+        """
+        for page_num in range(self.page_count):
+            text = self._page_texts[page_num] if self._page_texts is not None else None
+            if text is None:
+                text = self._decode_page(page_num)
+            yield text
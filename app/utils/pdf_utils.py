@@ -1,6 +1,7 @@
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
+from app.utils.parsed_document import ParsedDocument
 
 logger = logging.getLogger(__name__)
 
@@ -8,16 +9,20 @@ class PDFValidator:
     """Utilitário para validar arquivos PDF"""
     
     @staticmethod
-    def validate_pdf(file_path: str) -> bool:
+    def validate_pdf(source: Union[str, ParsedDocument]) -> bool:
         """
         Verifica se o arquivo é um PDF válido
         
         Args:
-            file_path: Caminho para o arquivo
+            source: Caminho para o arquivo ou documento já carregado
             
         Returns:
             True se for um PDF válido, False caso contrário
         """
+        if isinstance(source, ParsedDocument):
+            return PDFValidator.validate_document(source)
+            
+        file_path = source
         if not os.path.exists(file_path):
             logger.error(f"Arquivo não encontrado: {file_path}")
             return False
@@ -45,6 +50,36 @@ class PDFValidator:
             return False
             
         return True
+    
+    @staticmethod
+    def validate_document(document: ParsedDocument) -> bool:
+        """
+        Verifica se um documento já carregado em memória é um PDF válido,
+        sem reabrir o arquivo de origem.
+        
+        Args:
+            document: Documento carregado
+            
+        Returns:
+            True se for um PDF válido, False caso contrário
+        """
+        # Verifica a extensão do arquivo
+        if not document.name.lower().endswith('.pdf'):
+            logger.error(f"Arquivo não é um PDF: {document.name}")
+            return False
+            
+        # Verifica o tamanho do arquivo (limite de 10MB)
+        file_size = document.size / (1024 * 1024)  # em MB
+        if file_size > 10:
+            logger.error(f"Arquivo muito grande ({file_size:.2f}MB): {document.name}")
+            return False
+            
+        # Verifica o magic number (assinatura) do PDF
+        if document.header != b'%PDF':
+            logger.error(f"Assinatura de PDF inválida: {document.name}")
+            return False
+            
+        return True
 
 
 def cleanup_temp_files(file_paths: List[str]) -> None:
@@ -0,0 +1,110 @@
+"""
+Base para arquivos de configuração JSON compilados uma vez e recarregados
+quando o arquivo muda.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ReloadableJSONFile(Generic[T]):
+    """
+    Arquivo JSON convertido em um snapshot imutável.
+
+    O arquivo é verificado a cada check_interval segundos e recarregado quando
+    o horário de modificação muda; reload() força uma nova carga. A troca do
+    snapshot é atômica, e se o arquivo novo for inválido o snapshot anterior
+    continua em uso. As subclasses implementam _build para compilar o conteúdo.
+    """
+
+    # Descrição usada nas mensagens de log
+    description = "arquivo de configuração"
+
+    # Exceção lançada quando o conteúdo não é um JSON válido
+    error_class = ValueError
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        """
+        Inicializa o arquivo recarregável.
+
+        Args:
+            path: Caminho para o arquivo JSON
+            check_interval: Intervalo mínimo em segundos entre verificações do arquivo
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[T] = None
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _build(self, data: Dict[str, Any], digest: str, mtime: float) -> T:
+        """
+        Compila o conteúdo do arquivo.
+
+        Args:
+            data: Conteúdo do arquivo
+            digest: SHA-256 do arquivo
+            mtime: Horário de modificação do arquivo carregado
+
+        Returns:
+            Snapshot imutável
+        """
+        raise NotImplementedError
+
+    def snapshot(self) -> T:
+        """
+        Retorna o snapshot atual, recarregando se o arquivo mudou.
+
+        Returns:
+            Snapshot atual
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.reload()
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            try:
+                changed = os.path.getmtime(self.path) != self._mtime
+            except OSError:
+                changed = False
+            if changed:
+                try:
+                    return self.reload()
+                except Exception as e:
+                    logger.error(f"Erro ao recarregar {self.description}; mantendo a versão anterior: {str(e)}")
+        return self._snapshot
+
+    def reload(self) -> T:
+        """
+        Lê e compila o arquivo e troca o snapshot atual de forma atômica.
+
+        Returns:
+            O novo snapshot
+        """
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, 'rb') as file:
+                raw = file.read()
+
+            try:
+                data = json.loads(raw.decode('utf-8'))
+            except ValueError as e:
+                raise self.error_class(f"Arquivo inválido ({self.path}): {str(e)}")
+
+            snapshot = self._build(data, hashlib.sha256(raw).hexdigest(), mtime)
+            self._snapshot = snapshot
+            self._mtime = mtime
+            self._last_check = time.monotonic()
+
+        return snapshot
@@ -6,6 +6,7 @@ import sys
 import json
 from bank_detector import BankDetector
 from ..services.pdf_extractor import PDFExtractor
+from ..services.pattern_registry import get_pattern_registry
 
 def test_bank_detection(pdf_path: str) -> None:
     """
@@ -33,7 +34,7 @@ def test_bank_detection(pdf_path: str) -> None:
             
             # Mostra os padrões usados para este banco
             extractor = PDFExtractor()
-            patterns = extractor.BANK_EXTRACTORS.get(bank_id, {})
+            patterns = get_pattern_registry().snapshot().get(bank_id).definition.get("extraction", {})
             
             print(f"\n{'=' * 50}")
             print("PADRÕES DE EXTRAÇÃO")
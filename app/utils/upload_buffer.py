@@ -0,0 +1,170 @@
+"""
+Leitura dos arquivos enviados mantendo PDFs pequenos em memória e
+gravando em disco apenas os maiores.
+"""
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import IO, List, Optional, Union
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.core.config import UPLOAD_CONFIG
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos do corpo da requisição
+CHUNK_SIZE = 256 * 1024
+
+
+class UploadBuffer:
+    """
+    Conteúdo de um arquivo enviado.
+
+    Arquivos de até spool_threshold bytes ficam apenas em memória e são
+    entregues ao PdfReader sem passar pelo disco. Arquivos maiores são
+    transferidos em blocos para o diretório de spool (de preferência um
+    tmpfs) e removidos com cleanup(). As gravações no spool rodam no pool de
+    threads, fora do loop de eventos. O SHA-256 é calculado durante a
+    leitura, sem uma segunda passagem pelo conteúdo.
+    """
+
+    def __init__(self, filename: str, content: Optional[bytes], path: Optional[str], size: int, sha256: str):
+        """
+        Inicializa o buffer. Use UploadBuffer.read para criar instâncias.
+
+        Args:
+            filename: Nome original do arquivo enviado
+            content: Conteúdo em memória (None se foi para o disco)
+            path: Caminho do arquivo no diretório de spool (None se está em memória)
+            size: Tamanho do arquivo em bytes
+            sha256: SHA-256 (hexadecimal) do conteúdo
+        """
+        self.filename = filename
+        self.content = content
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        # O arquivo em path é removido por cleanup() só enquanto pertence ao buffer
+        self._owns_path = path is not None
+
+    @classmethod
+    async def read(
+        cls,
+        file: UploadFile,
+        spool_threshold: Optional[int] = None,
+        spool_dir: Optional[str] = None,
+    ) -> "UploadBuffer":
+        """
+        Lê o arquivo enviado, em memória ou no diretório de spool conforme o tamanho.
+
+        Args:
+            file: Arquivo recebido pelo FastAPI
+            spool_threshold: Tamanho máximo mantido em memória (padrão da configuração)
+            spool_dir: Diretório para os arquivos maiores (padrão da configuração)
+
+        Returns:
+            Instância de UploadBuffer
+        """
+        spool_threshold = UPLOAD_CONFIG["spool_threshold"] if spool_threshold is None else spool_threshold
+        spool_dir = spool_dir or UPLOAD_CONFIG["spool_dir"]
+
+        start = time.perf_counter()
+        digest = hashlib.sha256()
+        chunks = []
+        size = 0
+        spool_file = None
+
+        try:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+
+                if spool_file is None and size > spool_threshold:
+                    # Passou do limite: transfere o que já foi lido para o disco
+                    chunks.append(chunk)
+                    spool_file = await run_in_threadpool(cls._open_spool, spool_dir, chunks)
+                    chunks = []
+                elif spool_file is not None:
+                    await run_in_threadpool(spool_file.write, chunk)
+                else:
+                    chunks.append(chunk)
+        except BaseException:
+            if spool_file is not None:
+                spool_file.close()
+                cls._remove(spool_file.name)
+            raise
+
+        if spool_file is not None:
+            await run_in_threadpool(spool_file.close)
+            upload = cls(file.filename, None, spool_file.name, size, digest.hexdigest())
+        else:
+            content = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+            upload = cls(file.filename, content, None, size, digest.hexdigest())
+
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - start, "save")
+        metrics.UPLOAD_BYTES.observe(size)
+        return upload
+
+    @property
+    def in_memory(self) -> bool:
+        """Indica se o conteúdo está apenas em memória"""
+        return self.path is None
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """Conteúdo em memória ou caminho do arquivo em spool, para o PDFExtractor"""
+        return self.content if self.in_memory else self.path
+
+    def persist(self, path: str) -> str:
+        """
+        Grava o conteúdo em um caminho definitivo.
+
+        O arquivo de spool, se houver, é movido em vez de copiado: source passa
+        a apontar para o destino, que deixa de pertencer ao buffer (cleanup()
+        não o remove).
+
+        Args:
+            path: Caminho de destino
+
+        Returns:
+            O caminho de destino
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if self.in_memory:
+            with open(path, 'wb') as file:
+                file.write(self.content)
+        else:
+            shutil.move(self.path, path)
+            self.path = path
+            self._owns_path = False
+        return path
+
+    def cleanup(self) -> None:
+        """Remove o arquivo de spool, se houver e ainda pertencer ao buffer"""
+        if self.path and self._owns_path:
+            self._remove(self.path)
+
+    @staticmethod
+    def _open_spool(spool_dir: str, chunks: List[bytes]) -> IO[bytes]:
+        """Cria o arquivo de spool com os blocos já lidos (roda no pool de threads)"""
+        os.makedirs(spool_dir, exist_ok=True)
+        spool_file = tempfile.NamedTemporaryFile(dir=spool_dir, prefix="upload_", suffix=".pdf", delete=False)
+        spool_file.writelines(chunks)
+        return spool_file
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """Remove um arquivo ignorando a sua ausência"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Erro ao remover arquivo de spool {path}: {str(e)}")
@@ -0,0 +1,112 @@
+"""
+Benchmark da classificação das linhas de faturas do Banco do Brasil.
+
+Compara o laço anterior (line.upper() e a lista de linhas ignoradas com
+any() em cada linha, seguidos de até três re.match) com o classificador
+atual, uma única expressão com grupos nomeados e a seção corrente do
+extrato (PDFExtractor._classify_bb_lines). Os extratos sintéticos vêm do
+gerador de faturas (app/utils/generate_invoice_corpus.py); antes de medir,
+confere que os dois caminhos encontram as mesmas transações nas faturas
+de exemplo (app/static/test_data) e nos extratos sintéticos.
+
+Uso:
+    python benchmarks/bench_bb_lines.py [--lines 10000 100000] [--seed 42] [--repeat 3]
+"""
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+from typing import Any, Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pattern_registry import BankPatterns, get_pattern_registry  # noqa: E402
+from app.services.pdf_extractor import PDFExtractor  # noqa: E402
+from app.utils.generate_invoice_corpus import MAX_PAGES, build_invoice  # noqa: E402
+from app.utils.parsed_document import ParsedDocument  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "static", "test_data")
+
+
+def legacy_classify(lines: List[str], bank: BankPatterns) -> List[Tuple[Tuple[str, str, str], str]]:
+    """Laço anterior de PDFExtractor._parse_bb_lines (só a parte que separa as transações)"""
+    found = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if 'Data' in line and 'Descrição' in line and 'Valor' in line:
+            continue
+        if any(skip in line.upper() for skip in bank.skip_lines):
+            continue
+        match = None
+        for pattern in bank.transaction_lines:
+            match = pattern.match(line)
+            if match:
+                break
+        if match:
+            found.append((match.group(1, 2, 3), line))
+    return found
+
+
+def synthetic_lines(count: int, rng: random.Random) -> List[str]:
+    """Linhas de um extrato sintético do BB com cerca de count linhas"""
+    per_page = max(1, count // MAX_PAGES)
+    pages, _ = build_invoice("banco_do_brasil", rng, min(MAX_PAGES, max(1, count // per_page)), per_page)
+    return [line for page in pages for line in page]
+
+
+def fixture_lines() -> List[Tuple[str, List[str]]]:
+    """Linhas das faturas de exemplo do BB"""
+    result = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.pdf"))):
+        with open(path, "rb") as file:
+            document = ParsedDocument(file.read(), name=os.path.basename(path))
+        result.append((document.name, "\n".join(document.iter_pages()).split("\n")))
+    return result
+
+
+def timed(func: Callable[..., Any], *args: Any, repeat: int) -> float:
+    """Menor tempo de repeat execuções"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[10000, 100000], help="Linhas dos extratos sintéticos")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições de cada medida")
+    args = parser.parse_args()
+
+    bank = get_pattern_registry().snapshot().get("banco_do_brasil")
+    extractor = PDFExtractor()
+
+    def classify(lines: List[str]) -> List[Tuple[Tuple[str, str, str], str]]:
+        # O laço anterior não marcava os créditos; compara só as transações encontradas
+        return [(fields, line) for fields, line, _ in extractor._classify_bb_lines(lines, bank)]
+
+    for name, lines in fixture_lines():
+        same = legacy_classify(lines, bank) == classify(lines)
+        print(f"{name}: {'mesmas transações' if same else 'TRANSAÇÕES DIFERENTES'}")
+
+    rng = random.Random(args.seed)
+    for count in args.lines:
+        lines = synthetic_lines(count, rng)
+        legacy = legacy_classify(lines, bank)
+        assert legacy == classify(lines), "Os dois caminhos encontram transações diferentes"
+        before = timed(legacy_classify, lines, bank, repeat=args.repeat)
+        after = timed(extractor._classify_bb_lines, lines, bank, repeat=args.repeat)
+        print(f"{len(lines)} linhas ({len(legacy)} transações):")
+        print(f"  anterior {before * 1000:>9.1f} ms  {before / len(lines) * 1e9:>7.0f} ns/linha")
+        print(f"  atual    {after * 1000:>9.1f} ms  {after / len(lines) * 1e9:>7.0f} ns/linha  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
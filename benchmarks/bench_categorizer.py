@@ -0,0 +1,126 @@
+"""
+Benchmark do categorizador de transações.
+
+Gera milhares de regras sintéticas e centenas de milhares de descrições e
+compara o autômato Aho-Corasick com a abordagem anterior (uma busca por
+palavra-chave em cada descrição), que é medida sobre uma amostra.
+
+Uso:
+    python benchmarks/bench_categorizer.py [--rules 5000] [--descriptions 100000] [--seed 42]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.categorizer import CategoryRuleSet, tokenize  # noqa: E402
+
+CATEGORIES = ["Supermercado", "Alimentação", "Saúde", "Transporte", "Entretenimento", "Educação", "Vestuário", "Serviços"]
+SYLLABLES = ["ba", "ca", "da", "fe", "go", "hi", "ja", "lu", "ma", "ne", "po", "ra", "sa", "te", "vi", "xu", "zo"]
+NOISE = ["LTDA", "SAO PAULO", "BRASILIA", "BR", "*", "PAG", "COM", "SHOP", "CENTRO", "01", "123", "S/A"]
+
+
+def random_word(rng: random.Random) -> str:
+    """Gera uma palavra sintética"""
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def build_rules(count: int, rng: random.Random) -> dict:
+    """Gera um arquivo de regras com count palavras-chave (algumas com mais de uma palavra)"""
+    keywords = {name: [] for name in CATEGORIES}
+    seen = set()
+    while len(seen) < count:
+        words = [random_word(rng) for _ in range(1 if rng.random() < 0.8 else 2)]
+        keyword = " ".join(words)
+        if keyword in seen:
+            continue
+        seen.add(keyword)
+        keywords[rng.choice(CATEGORIES)].append(keyword)
+
+    return {
+        "version": 1,
+        "categories": [
+            {"name": name, "priority": 10 * (len(CATEGORIES) - index), "keywords": keywords[name]}
+            for index, name in enumerate(CATEGORIES)
+        ],
+    }
+
+
+def build_descriptions(count: int, rules: dict, rng: random.Random) -> list:
+    """Gera descrições de transações; cerca de metade contém uma palavra-chave"""
+    keywords = [keyword for category in rules["categories"] for keyword in category["keywords"]]
+    descriptions = []
+    for _ in range(count):
+        parts = [random_word(rng).upper() for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.5:
+            parts.insert(rng.randint(0, len(parts)), rng.choice(keywords).upper())
+        parts.extend(rng.sample(NOISE, 2))
+        descriptions.append(" ".join(parts))
+    return descriptions
+
+
+def naive_categorize(description: str, compiled: list):
+    """Abordagem anterior: testa cada palavra-chave na descrição, em ordem de prioridade"""
+    text = " ".join(tokenize(description))
+    for category, patterns in compiled:
+        if any(pattern.search(text) for pattern in patterns):
+            return category
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=5000, help="Número de palavras-chave")
+    parser.add_argument("--descriptions", type=int, default=100000, help="Número de descrições")
+    parser.add_argument("--naive-sample", type=int, default=2000, help="Descrições medidas na abordagem anterior")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rules = build_rules(args.rules, rng)
+    descriptions = build_descriptions(args.descriptions, rules, rng)
+
+    start = time.perf_counter()
+    rule_set = CategoryRuleSet(rules)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    categories = rule_set.categorize_many(descriptions)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for description in descriptions:
+        rule_set.categorize(description)
+    single_seconds = time.perf_counter() - start
+
+    compiled = [
+        (category["name"], [re.compile(rf"\b{re.escape(' '.join(tokenize(k)))}\b") for k in category["keywords"]])
+        for category in rules["categories"]
+    ]
+    sample = descriptions[:args.naive_sample]
+    start = time.perf_counter()
+    naive = [naive_categorize(description, compiled) for description in sample]
+    naive_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(categories, naive) if a != b)
+    categorized = sum(1 for category in categories if category)
+
+    print(f"Regras: {rule_set.rule_count} palavras-chave, {rule_set.automaton.size} estados")
+    print(f"Descrições: {len(descriptions)} ({categorized} categorizadas)")
+    print(f"Construção do autômato: {build_seconds * 1000:.1f} ms")
+    print(f"Aho-Corasick em lote: {batch_seconds:.3f} s ({len(descriptions) / batch_seconds:,.0f} descrições/s)")
+    print(f"Aho-Corasick uma a uma: {single_seconds:.3f} s ({len(descriptions) / single_seconds:,.0f} descrições/s)")
+    print(
+        f"Abordagem anterior ({len(sample)} descrições): {naive_seconds:.3f} s "
+        f"({len(sample) / naive_seconds:,.0f} descrições/s, estimativa para todas: "
+        f"{naive_seconds * len(descriptions) / len(sample):.1f} s)"
+    )
+    print(f"Divergências na amostra: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark da exportação para Excel.
+
+Compara a escrita em streaming (openpyxl write-only, app.services.xlsx_writer)
+com o exportador anterior, que montava DataFrames do pandas e gravava com o
+ExcelWriter no modo normal. Mede o tempo e o pico de memória alocada
+(tracemalloc) de cada um e confere se as análises por categoria coincidem.
+
+Uso:
+    python benchmarks/bench_excel_export.py [--sizes 10000 100000] [--seed 42]
+"""
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+from openpyxl import load_workbook  # noqa: E402
+from app.services import xlsx_writer  # noqa: E402
+
+CATEGORIES = ["Supermercado", "Alimentação", "Saúde", "Transporte", "Entretenimento", None]
+MERCHANTS = ["MERCADO CENTRAL", "PADARIA PAO BOM", "FARMACIA POPULAR", "UBER *TRIP", "CINEMARK", "LOJA 123"]
+
+
+def build_invoice(count: int, rng: random.Random) -> dict:
+    """Gera uma fatura sintética com count transações"""
+    transacoes = []
+    for _ in range(count):
+        index = rng.randrange(len(MERCHANTS))
+        transacoes.append({
+            "data": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+            "descricao": f"{MERCHANTS[index]} {rng.randint(1, 999)}",
+            "valor": round(rng.uniform(-50, 500), 2),
+            "categoria": CATEGORIES[index],
+        })
+    return {
+        "titular": "CLIENTE DE TESTE",
+        "numero_cartao": "****1234",
+        "data_fechamento": "15/06/2025",
+        "data_vencimento": "01/07/2025",
+        "valor_total": round(sum(t["valor"] for t in transacoes), 2),
+        "banco": "banco_do_brasil",
+        "transacoes": transacoes,
+    }
+
+
+def legacy_to_excel(data: dict, output_path: str) -> None:
+    """Exportador anterior: DataFrames do pandas e ExcelWriter em modo normal"""
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        resumo = {
+            'Campo': ['Titular', 'Número do Cartão', 'Data de Fechamento', 'Data de Vencimento', 'Valor Total', 'Banco', 'Data de Processamento'],
+            'Valor': [data.get('titular'), data.get('numero_cartao'), data.get('data_fechamento'),
+                      data.get('data_vencimento'), data.get('valor_total'), data.get('banco'), data.get('data_processamento', '')],
+        }
+        pd.DataFrame(resumo).to_excel(writer, sheet_name='Resumo', index=False)
+        pd.DataFrame(data['transacoes']).to_excel(writer, sheet_name='Transações', index=False)
+
+        df = pd.DataFrame(data['transacoes'])
+        df['categoria'] = df['categoria'].fillna('Não Categorizado')
+        categoria_df = df.groupby('categoria')['valor'].agg(['sum', 'count']).reset_index()
+        categoria_df.columns = ['Categoria', 'Valor Total', 'Quantidade']
+        categoria_df = categoria_df.sort_values(by='Valor Total', ascending=False)
+        categoria_df.to_excel(writer, sheet_name='Análise por Categoria', index=False)
+
+
+def measure(func, data, target_factory) -> tuple:
+    """
+    Mede o tempo de func em uma execução sem rastreamento e o pico de memória
+    alocada em outra (o tracemalloc deixa a execução várias vezes mais lenta).
+    """
+    start = time.perf_counter()
+    func(data, target_factory())
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(data, target_factory())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def category_sheet(source) -> list:
+    """Lê a análise por categoria de uma planilha (valores arredondados em centavos)"""
+    workbook = load_workbook(source, read_only=True)
+    rows = list(workbook['Análise por Categoria'].iter_rows(min_row=2, values_only=True))
+    workbook.close()
+    return [(categoria, round(total, 2), count) for categoria, total, count in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Números de transações")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in args.sizes:
+            data = build_invoice(size, rng)
+            legacy_path = os.path.join(temp_dir, f"legacy_{size}.xlsx")
+            streaming_path = os.path.join(temp_dir, f"streaming_{size}.xlsx")
+            buffers = []
+
+            def new_buffer() -> io.BytesIO:
+                buffers.append(io.BytesIO())
+                return buffers[-1]
+
+            legacy = measure(legacy_to_excel, data, lambda: legacy_path)
+            streaming = measure(xlsx_writer.write_invoice, data, lambda: streaming_path)
+            in_memory = measure(xlsx_writer.write_invoice, data, new_buffer)
+
+            same = category_sheet(legacy_path) == category_sheet(streaming_path)
+
+            print(f"{size} transações:")
+            for name, (seconds, peak) in (("pandas + ExcelWriter", legacy), ("streaming (arquivo)", streaming), ("streaming (memória)", in_memory)):
+                print(f"  {name:<22} {seconds:7.3f} s  pico {peak / 2**20:8.1f} MiB")
+            print(f"  Ganho de tempo: {legacy[0] / streaming[0]:.1f}x; pico de memória: {legacy[1] / streaming[1]:.1f}x menor")
+            print(f"  Tamanho: {os.path.getsize(legacy_path) / 2**20:.1f} MiB (anterior), "
+                  f"{os.path.getsize(streaming_path) / 2**20:.1f} MiB (streaming), {len(buffers[-1].getvalue()) / 2**20:.1f} MiB (memória)")
+            print(f"  Análise por categoria idêntica: {'sim' if same else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
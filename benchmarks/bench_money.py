@@ -0,0 +1,107 @@
+"""
+Benchmark da conversão de valores monetários (app.utils.money).
+
+Compara, sobre milhões de valores no formato brasileiro ("1.234,56",
+"R$ 12,00"), a conversão anterior do padrão genérico (dois re.sub, replace
+e float), a anterior do Banco do Brasil (replace com desvios e float),
+parse_cents valor a valor e parse_cents_column sobre a coluna inteira.
+Também mostra o erro acumulado ao somar os valores em float em vez de
+centavos inteiros.
+
+Uso:
+    python benchmarks/bench_money.py [--count 1000000] [--seed 42] [--repeat 3]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from typing import Any, Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.money import format_cents, parse_cents, parse_cents_column  # noqa: E402
+
+REAL_PREFIX_PATTERN = re.compile(r'^R\$\s*')
+DOLLAR_PREFIX_PATTERN = re.compile(r'^\$\s*')
+
+
+def build_values(count: int, rng: random.Random) -> Tuple[List[str], int]:
+    """Gera count valores (alguns com "R$" e milhar) e a soma exata em centavos"""
+    values = []
+    total = 0
+    for _ in range(count):
+        cents = rng.randint(1, 250000) if rng.random() < 0.1 else rng.randint(1, 90000)
+        total += cents
+        text = format_cents(cents)
+        values.append(f"R$ {text}" if rng.random() < 0.5 else text)
+    return values, total
+
+
+def legacy_generic(values: List[str]) -> List[Optional[float]]:
+    """Conversão anterior de PDFExtractor._parse_transaction_match"""
+    result = []
+    for value_text in values:
+        value_text = REAL_PREFIX_PATTERN.sub('', value_text.strip())
+        value_text = DOLLAR_PREFIX_PATTERN.sub('', value_text)
+        value = value_text.replace('.', '').replace(',', '.')
+        try:
+            result.append(float(value))
+        except ValueError:
+            result.append(None)
+    return result
+
+
+def legacy_bb(values: List[str]) -> List[Optional[float]]:
+    """Conversão anterior de PDFExtractor._parse_bb_lines (o padrão do BB captura só o número)"""
+    result = []
+    for value_text in values:
+        value_text = value_text.replace('R$ ', '')
+        try:
+            if ',' in value_text and '.' in value_text:
+                value_text = value_text.replace('.', '').replace(',', '.')
+            elif ',' in value_text:
+                value_text = value_text.replace(',', '.')
+            result.append(float(value_text))
+        except ValueError:
+            result.append(None)
+    return result
+
+
+def per_value(values: List[str]) -> List[Optional[int]]:
+    return [parse_cents(value) for value in values]
+
+
+def timed(func: Callable[[List[str]], List[Any]], values: List[str], repeat: int) -> Tuple[float, List[Any]]:
+    """Menor tempo de repeat execuções e o resultado da última"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(values)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000000, help="Número de valores")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições de cada medida")
+    args = parser.parse_args()
+
+    values, exact = build_values(args.count, random.Random(args.seed))
+    print(f"{args.count} valores:")
+    print(f"  {'':<28} {'segundos':>9} {'ns/valor':>9} {'razão':>7} {'erro da soma (R$)':>18}")
+    baseline = None
+    for name, func in (("genérico anterior (float)", legacy_generic), ("BB anterior (float)", legacy_bb),
+                       ("parse_cents", per_value), ("parse_cents_column", parse_cents_column)):
+        seconds, result = timed(func, values, args.repeat)
+        baseline = baseline or seconds
+        # Soma como Fatura.calcular_total fazia (reais em float) ou em centavos inteiros
+        error = sum(result) - exact / 100 if isinstance(result[0], float) else (sum(result) - exact) / 100
+        print(f"  {name:<28} {seconds:>9.3f} {seconds / args.count * 1e9:>9.0f} {baseline / seconds:>6.1f}x {error:>18.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Benchmark de cada etapa da extração sobre um corpus fixo de faturas.
+
+Cada etapa é medida separadamente, com as entradas preparadas pela etapa
+anterior fora da medição: validação do PDF, extração do texto, detecção do
+banco, expressões do cabeçalho, extração das transações, categorização,
+validação do esquema FaturaCartao e exportação para JSON e Excel. Uma
+operação é a etapa aplicada a um documento do corpus (os documentos se
+alternam); o relatório traz operações por segundo, p50 e p99.
+
+Os resultados são salvos em JSON e podem ser comparados com os de outra
+execução com --compare.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--corpus app/static/test_data] [--min-time 1.0]
+        [--stages validacao deteccao ...] [--output resultados.json] [--compare anterior.json]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import atexit
+import shutil
+import hashlib
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# O dicionário de estabelecimentos aprende com as descrições extraídas: o
+# benchmark usa um diretório temporário para não alterar o dicionário real
+os.environ["MERCHANT_DICTIONARY_DIR"] = tempfile.mkdtemp(prefix="bench-merchants-")
+atexit.register(shutil.rmtree, os.environ["MERCHANT_DICTIONARY_DIR"], ignore_errors=True)
+
+from app.schemas.invoice import FaturaCartao  # noqa: E402
+from app.services.categorizer import get_categorizer  # noqa: E402
+from app.services.data_exporter import DataExporter  # noqa: E402
+from app.services.pattern_registry import get_pattern_registry  # noqa: E402
+from app.services.pdf_extractor import HEADER_FIELDS, PDFExtractor  # noqa: E402
+from app.utils.bank_detector import BankDetector  # noqa: E402
+from app.utils.parsed_document import ParsedDocument  # noqa: E402
+from app.utils.pdf_utils import PDFValidator  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(ROOT_DIR, "app", "static", "test_data")
+DEFAULT_RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+# Etapas na ordem do pipeline
+STAGES = [
+    "validacao",
+    "texto",
+    "deteccao",
+    "cabecalho",
+    "transacoes",
+    "categorizacao",
+    "esquema",
+    "exportacao_json",
+    "exportacao_excel",
+]
+
+
+class Document:
+    """Documento do corpus com as entradas de cada etapa já calculadas"""
+
+    def __init__(self, path: str, extractor: PDFExtractor):
+        with open(path, "rb") as file:
+            self.data = file.read()
+        self.name = os.path.relpath(path, ROOT_DIR)
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+
+        document = ParsedDocument(self.data, name=path)
+        self.pages = document.page_count
+        self.text = document.text()
+        self.detection_text = document.text(max_pages=2)
+        self.bank_id = BankDetector.score_text(self.detection_text)["bank_id"] or "generic"
+
+        snapshot = get_pattern_registry().snapshot()
+        self.patterns = snapshot.extraction_patterns(self.bank_id)
+        self.bank = snapshot.get("banco_do_brasil") if self.bank_id == "banco_do_brasil" else None
+        self.header_patterns = [self.patterns[field] for field in HEADER_FIELDS if self.patterns.get(field) is not None]
+
+        self.result = extractor.extract(ParsedDocument(self.data, name=path), self.bank_id)
+        self.descriptions = [transacao["descricao"] for transacao in self.result["transacoes"]]
+
+
+def stage_functions(extractor: PDFExtractor, exporter: DataExporter) -> Dict[str, Callable[[Document], Any]]:
+    """Função de cada etapa, aplicada a um documento já preparado"""
+    categorizer = get_categorizer()
+
+    def transacoes(doc: Document) -> Any:
+        if doc.bank is not None:
+            return extractor._extract_bb_transactions(doc.text, doc.bank)
+        return extractor._extract_transactions(doc.text, doc.patterns.get("transacao_pattern"))
+
+    return {
+        "validacao": lambda doc: PDFValidator.validate_document(ParsedDocument(doc.data, name=doc.name)),
+        "texto": lambda doc: ParsedDocument(doc.data, name=doc.name).text(),
+        "deteccao": lambda doc: BankDetector.score_text(doc.detection_text),
+        "cabecalho": lambda doc: [extractor._extract_pattern(doc.text, pattern) for pattern in doc.header_patterns],
+        "transacoes": transacoes,
+        "categorizacao": lambda doc: categorizer.categorize_many(doc.descriptions),
+        "esquema": lambda doc: FaturaCartao(**doc.result),
+        "exportacao_json": lambda doc: exporter.to_json(doc.result, "fatura.json"),
+        "exportacao_excel": lambda doc: exporter.to_excel_bytes(doc.result),
+    }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil pelo método do posto mais próximo"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def measure(func: Callable[[Document], Any], documents: List[Document], min_time: float, min_runs: int, warmup: int) -> Dict[str, float]:
+    """
+    Executa a etapa alternando os documentos até somar min_time segundos e min_runs execuções.
+
+    Returns:
+        Execuções, operações por segundo e tempos em milissegundos (média, p50, p99)
+    """
+    for run in range(warmup):
+        func(documents[run % len(documents)])
+
+    timings = []
+    total = 0.0
+    clock = time.perf_counter
+    while total < min_time or len(timings) < min_runs:
+        doc = documents[len(timings) % len(documents)]
+        start = clock()
+        func(doc)
+        elapsed = clock() - start
+        timings.append(elapsed)
+        total += elapsed
+
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "ops_per_sec": len(timings) / total,
+        "mean_ms": total / len(timings) * 1000,
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Commit atual do repositório, se disponível"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: Dict[str, Dict[str, float]], previous: Optional[Dict[str, Any]]) -> None:
+    """Imprime a tabela de resultados e, se houver, a variação em relação à execução anterior"""
+    baseline = (previous or {}).get("stages", {})
+    header = f"{'etapa':<18} {'execuções':>9} {'ops/s':>11} {'p50 (ms)':>10} {'p99 (ms)':>10}"
+    if baseline:
+        header += f" {'ops/s vs anterior':>18}"
+    print(header)
+    for stage, result in results.items():
+        line = f"{stage:<18} {result['runs']:>9} {result['ops_per_sec']:>11.1f} {result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f}"
+        if stage in baseline:
+            change = result["ops_per_sec"] / baseline[stage]["ops_per_sec"] - 1
+            line += f" {change:>+17.1%}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Diretório com os PDFs do corpus (busca recursiva)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Etapas medidas")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Tempo mínimo medido por etapa, em segundos")
+    parser.add_argument("--min-runs", type=int, default=20, help="Número mínimo de execuções por etapa")
+    parser.add_argument("--warmup", type=int, default=3, help="Execuções descartadas antes da medição")
+    parser.add_argument("--output", help="Arquivo JSON de resultados (padrão: benchmarks/results/pipeline-<data>.json)")
+    parser.add_argument("--compare", help="Arquivo JSON de uma execução anterior para comparação")
+    args = parser.parse_args()
+
+    # Os logs por fatura dominariam o tempo de algumas etapas
+    logging.disable(logging.INFO)
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, "**", "*.pdf"), recursive=True))
+    if not paths:
+        parser.error(f"Nenhum PDF encontrado em {args.corpus}")
+
+    extractor = PDFExtractor()
+    PDFExtractor.warm_up()
+    documents = [Document(path, extractor) for path in paths]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        functions = stage_functions(extractor, DataExporter(output_dir=temp_dir))
+        results = {stage: measure(functions[stage], documents, args.min_time, args.min_runs, args.warmup) for stage in args.stages}
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            previous = json.load(file)
+
+    print(f"Corpus: {len(documents)} documento(s), {sum(doc.pages for doc in documents)} página(s)")
+    print_report(results, previous)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"min_time": args.min_time, "min_runs": args.min_runs, "warmup": args.warmup},
+        "corpus": [
+            {"arquivo": doc.name, "sha256": doc.sha256, "paginas": doc.pages, "banco": doc.bank_id, "transacoes": len(doc.descriptions)}
+            for doc in documents
+        ],
+        "stages": results,
+    }
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Resultados salvos em {output}")
+
+
+if __name__ == "__main__":
+    main()
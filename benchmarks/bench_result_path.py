@@ -0,0 +1,149 @@
+"""
+Alocações por transação no caminho do resultado de uma extração.
+
+Compara o caminho anterior (dataclasses com __dict__, to_dict, nova
+validação com FaturaCartao e JSONResponse) com o atual (Transacao com
+__slots__, TransactionTable, to_dict e JSONBytesResponse, sem nova
+validação). Para cada caminho são medidos o pico de memória alocada e os
+blocos ainda vivos ao fim da requisição (tracemalloc), por transação, e o
+tempo por transação.
+
+Uso:
+    python benchmarks/bench_result_path.py [--sizes 1000 10000 100000] [--seed 42]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from app.api.responses import JSONBytesResponse  # noqa: E402
+from app.models.invoice import Fatura, Transacao  # noqa: E402
+from app.schemas.invoice import FaturaCartao  # noqa: E402
+
+CATEGORIES = ["Supermercado", "Alimentação", "Saúde", "Transporte", "Entretenimento", None]
+MERCHANTS = ["MERCADO CENTRAL", "PADARIA PAO BOM", "FARMACIA POPULAR", "UBER *TRIP", "CINEMARK", "LOJA"]
+HEADER = {
+    "titular": "CLIENTE DE TESTE",
+    "numero_cartao": "****1234",
+    "data_fechamento": "15/06/2025",
+    "data_vencimento": "01/07/2025",
+    "banco": "banco_do_brasil",
+    "data_processamento": "2025-06-15 10:00:00",
+}
+
+
+@dataclass
+class LegacyTransacao:
+    """Transação como era antes (dataclass com __dict__)"""
+    data: str
+    descricao: str
+    valor: float
+    categoria: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"data": self.data, "descricao": self.descricao, "valor": self.valor, "categoria": self.categoria}
+
+
+@dataclass
+class LegacyFatura:
+    """Fatura como era antes (lista de transações)"""
+    titular: Optional[str] = None
+    numero_cartao: Optional[str] = None
+    data_fechamento: Optional[str] = None
+    data_vencimento: Optional[str] = None
+    valor_total: Optional[str] = None
+    banco: Optional[str] = None
+    transacoes: List[LegacyTransacao] = field(default_factory=list)
+    data_processamento: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "titular": self.titular, "numero_cartao": self.numero_cartao, "data_fechamento": self.data_fechamento,
+            "data_vencimento": self.data_vencimento, "valor_total": self.valor_total, "banco": self.banco,
+            "data_processamento": self.data_processamento, "transacoes": [t.to_dict() for t in self.transacoes],
+        }
+
+
+def build_rows(count: int, rng: random.Random) -> List[Tuple[str, str, float, Optional[str]]]:
+    """Gera count transações (os campos que o parser entrega)"""
+    rows = []
+    for _ in range(count):
+        index = rng.randrange(len(MERCHANTS))
+        rows.append((
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+            f"{MERCHANTS[index]} {rng.randint(1, 300)}",
+            round(rng.uniform(-50, 500), 2),
+            CATEGORIES[index],
+        ))
+    return rows
+
+
+def legacy_path(rows: list) -> List[Any]:
+    """Caminho anterior; retorna tudo o que ficava vivo até a resposta"""
+    fatura = LegacyFatura(**HEADER)
+    for data, descricao, valor, categoria in rows:
+        fatura.transacoes.append(LegacyTransacao(data, "".join(descricao), valor, categoria))
+    data = fatura.to_dict()
+    schema = FaturaCartao(**data)
+    body = JSONResponse(content=data).body
+    return [fatura, data, schema, body]
+
+
+def current_path(rows: list) -> List[Any]:
+    """Caminho atual; retorna tudo o que fica vivo até a resposta"""
+    fatura = Fatura(**HEADER)
+    for data, descricao, valor, categoria in rows:
+        # Como em PDFExtractor.extract: o parser cria a Transacao e a fatura guarda em colunas
+        fatura.adicionar_transacao(Transacao(data, "".join(descricao), valor, categoria))
+    data = fatura.to_dict()
+    body = JSONBytesResponse(data).body
+    return [fatura, data, body]
+
+
+def measure(func: Callable[[list], List[Any]], rows: list) -> Dict[str, float]:
+    """Pico de memória, blocos vivos ao fim e tempo, por transação"""
+    start = time.perf_counter()
+    func(rows)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    alive = func(rows)
+    snapshot = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in snapshot.compare_to(baseline, "filename"))
+    del alive
+
+    count = len(rows)
+    return {"bytes_pico": peak / count, "blocos_vivos": blocks / count, "microssegundos": seconds / count * 1e6}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Números de transações")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        rows = build_rows(size, rng)
+        # Comparação pelo conteúdo: em centavos, -0.0 vira 0.0
+        assert json.loads(legacy_path(rows)[3]) == json.loads(current_path(rows)[2]), "As respostas dos dois caminhos diferem"
+        before, after = measure(legacy_path, rows), measure(current_path, rows)
+        print(f"{size} transações (por transação):")
+        print(f"  {'':<20} {'anterior':>10} {'atual':>10} {'razão':>7}")
+        for key, label in (("bytes_pico", "pico de bytes"), ("blocos_vivos", "blocos vivos"), ("microssegundos", "microssegundos")):
+            print(f"  {label:<20} {before[key]:>10.1f} {after[key]:>10.1f} {before[key] / after[key]:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Vazão e acurácia da extração conforme as faturas crescem.
+
+Gera (ou lê, com --corpus) um corpus sintético de app.utils.generate_invoice_corpus
+e extrai cada fatura com PDFExtractor, comparando o resultado com o
+.expected.json gravado ao lado do PDF. O relatório agrupa as faturas por
+banco e número de páginas: tempo por fatura, páginas e transações por
+segundo, precisão e revocação das transações e campos do cabeçalho divergentes.
+
+Uso:
+    python benchmarks/bench_scaling.py [--pages 1 10 50 200] [--banks banco_do_brasil nubank]
+        [--transactions-per-page 25] [--repeat 3] [--seed 42] [--corpus diretorio] [--output resultados.json]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import atexit
+import shutil
+import logging
+import argparse
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O dicionário de estabelecimentos aprende com as descrições extraídas: o
+# benchmark usa um diretório temporário para não alterar o dicionário real
+os.environ["MERCHANT_DICTIONARY_DIR"] = tempfile.mkdtemp(prefix="bench-merchants-")
+atexit.register(shutil.rmtree, os.environ["MERCHANT_DICTIONARY_DIR"], ignore_errors=True)
+
+from app.services.pdf_extractor import PDFExtractor  # noqa: E402
+from app.utils.generate_invoice_corpus import LAYOUTS, expected_path, generate_corpus, score_extraction  # noqa: E402
+from app.utils.parsed_document import ParsedDocument  # noqa: E402
+
+
+def run(paths: list, repeat: int) -> dict:
+    """Extrai cada fatura repeat vezes e agrupa tempo e acurácia por banco e número de páginas"""
+    extractor = PDFExtractor()
+    PDFExtractor.warm_up()
+    groups = {}
+    for path in paths:
+        with open(path, "rb") as file:
+            data = file.read()
+        with open(expected_path(path), encoding="utf-8") as file:
+            expected = json.load(file)
+
+        timings = []
+        for _ in range(repeat):
+            # Documento novo a cada repetição: o texto das páginas não fica memorizado
+            document = ParsedDocument(data, name=path)
+            start = time.perf_counter()
+            result = extractor.extract(document)
+            timings.append(time.perf_counter() - start)
+        score = score_extraction(expected, result)
+
+        group = groups.setdefault((expected["banco"], document.page_count), {
+            "faturas": 0, "segundos": 0.0, "paginas": 0, "transacoes": 0,
+            "esperadas": 0, "extraidas": 0, "corretas": 0, "campos_divergentes": Counter(),
+        })
+        best = min(timings)
+        group["faturas"] += 1
+        group["segundos"] += best
+        group["paginas"] += document.page_count
+        group["transacoes"] += score["transacoes_extraidas"]
+        group["esperadas"] += score["transacoes_esperadas"]
+        group["extraidas"] += score["transacoes_extraidas"]
+        group["corretas"] += score["transacoes_corretas"]
+        group["campos_divergentes"].update(score["campos_divergentes"])
+    return groups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Corpus já gerado (por padrão um corpus temporário é gerado)")
+    parser.add_argument("--banks", nargs="+", choices=list(LAYOUTS), default=list(LAYOUTS), help="Layouts gerados")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50, 200], help="Números de páginas gerados")
+    parser.add_argument("--transactions-per-page", type=int, default=25, help="Transações por página")
+    parser.add_argument("--count", type=int, default=1, help="Faturas por banco e número de páginas")
+    parser.add_argument("--noise", type=float, default=0.3, help="Probabilidade de ruído (0 a 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="Extrações por fatura (vale a mais rápida)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    # Os logs por fatura dominariam o tempo das faturas pequenas
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.corpus:
+            paths = sorted(glob.glob(os.path.join(args.corpus, "*.pdf")))
+        else:
+            paths = generate_corpus(
+                temp_dir,
+                banks=args.banks,
+                pages=args.pages,
+                transactions_per_page=args.transactions_per_page,
+                count=args.count,
+                noise=args.noise,
+                seed=args.seed,
+            )
+        groups = run(paths, args.repeat)
+
+    print(f"{'banco':<16} {'páginas':>7} {'ms/fatura':>10} {'páginas/s':>10} {'transações/s':>13} {'precisão':>9} {'revocação':>10}  campos divergentes")
+    report = []
+    for (bank_id, pages), group in sorted(groups.items()):
+        row = {
+            "banco": bank_id,
+            "paginas": pages,
+            "faturas": group["faturas"],
+            "ms_por_fatura": group["segundos"] / group["faturas"] * 1000,
+            "paginas_por_segundo": group["paginas"] / group["segundos"],
+            "transacoes_por_segundo": group["transacoes"] / group["segundos"],
+            "precisao": group["corretas"] / group["extraidas"] if group["extraidas"] else 1.0,
+            "revocacao": group["corretas"] / group["esperadas"] if group["esperadas"] else 1.0,
+            "campos_divergentes": dict(group["campos_divergentes"]),
+        }
+        report.append(row)
+        print(
+            f"{bank_id:<16} {pages:>7} {row['ms_por_fatura']:>10.1f} {row['paginas_por_segundo']:>10.1f} "
+            f"{row['transacoes_por_segundo']:>13.0f} {row['precisao']:>9.1%} {row['revocacao']:>10.1%}  "
+            f"{', '.join(sorted(row['campos_divergentes'])) or '-'}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"seed": args.seed, "resultados": report}, file, ensure_ascii=False, indent=2)
+        print(f"Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
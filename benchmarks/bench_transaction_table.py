@@ -0,0 +1,134 @@
+"""
+Benchmark da tabela colunar de transações (app.models.transaction_table).
+
+Compara a TransactionTable com a representação anterior da fatura, uma
+lista de objetos Transacao (dataclass com __dict__ por instância): memória
+retida (tracemalloc), tempo de montagem, soma total e por categoria,
+conversão para dicionários e tamanho em pickle (o que atravessa o pool
+de processos).
+
+Uso:
+    python benchmarks/bench_transaction_table.py [--sizes 10000 100000] [--seed 42]
+"""
+import os
+import sys
+import time
+import pickle
+import random
+import argparse
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.transaction_table import TransactionTable  # noqa: E402
+
+CATEGORIES = ["Supermercado", "Alimentação", "Saúde", "Transporte", "Entretenimento", None]
+MERCHANTS = ["MERCADO CENTRAL", "PADARIA PAO BOM", "FARMACIA POPULAR", "UBER *TRIP", "CINEMARK", "LOJA"]
+
+
+@dataclass
+class LegacyTransacao:
+    """Transação como era guardada antes da tabela colunar"""
+    data: str
+    descricao: str
+    valor: float
+    categoria: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"data": self.data, "descricao": self.descricao, "valor": self.valor, "categoria": self.categoria}
+
+
+def build_rows(count: int, rng: random.Random) -> List[Tuple[str, str, float, Optional[str]]]:
+    """Gera count transações com algumas centenas de estabelecimentos distintos"""
+    rows = []
+    for _ in range(count):
+        index = rng.randrange(len(MERCHANTS))
+        rows.append((
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+            f"{MERCHANTS[index]} {rng.randint(1, 300)}",
+            round(rng.uniform(-50, 500), 2),
+            CATEGORIES[index],
+        ))
+    return rows
+
+
+def build_legacy(rows: list) -> List[LegacyTransacao]:
+    # Cada descrição é um texto novo, como quando sai do parser
+    return [LegacyTransacao(data, "".join(descricao), valor, categoria) for data, descricao, valor, categoria in rows]
+
+
+def build_table(rows: list) -> TransactionTable:
+    table = TransactionTable()
+    append = table.append
+    for data, descricao, valor, categoria in rows:
+        append(data, "".join(descricao), valor, categoria)
+    return table
+
+
+def legacy_totals(transacoes: List[LegacyTransacao]) -> Tuple[float, Dict[Optional[str], float]]:
+    by_category: Dict[Optional[str], float] = {}
+    for transacao in transacoes:
+        by_category[transacao.categoria] = by_category.get(transacao.categoria, 0.0) + transacao.valor
+    return sum(transacao.valor for transacao in transacoes), by_category
+
+
+def table_totals(table: TransactionTable) -> Tuple[int, Dict[Optional[str], Tuple[int, int]]]:
+    return table.total_cents(), table.sum_by("categoria")
+
+
+def timed(func: Callable[..., Any], *args: Any, repeat: int = 3) -> Tuple[float, Any]:
+    """Menor tempo de repeat execuções e o resultado da última"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def retained(func: Callable[..., Any], *args: Any) -> int:
+    """Memória alocada e ainda retida pelo resultado de func"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func(*args)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Números de transações")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        rows = build_rows(size, rng)
+        legacy_build, legacy = timed(build_legacy, rows)
+        table_build, table = timed(build_table, rows)
+        legacy_sum, (legacy_total, _) = timed(legacy_totals, legacy)
+        table_sum, (table_total, _) = timed(table_totals, table)
+        legacy_dicts, _ = timed(lambda: [transacao.to_dict() for transacao in legacy])
+        table_dicts, _ = timed(table.to_records)
+
+        measurements = [
+            ("memória retida (MiB)", retained(build_legacy, rows) / 2**20, retained(build_table, rows) / 2**20),
+            ("montagem (ms)", legacy_build * 1000, table_build * 1000),
+            ("soma e por categoria (ms)", legacy_sum * 1000, table_sum * 1000),
+            ("para dicionários (ms)", legacy_dicts * 1000, table_dicts * 1000),
+            ("pickle (MiB)", len(pickle.dumps([t.to_dict() for t in legacy])) / 2**20, len(pickle.dumps(table)) / 2**20),
+        ]
+
+        print(f"{size} transações ({len(table.descriptions)} descrições distintas):")
+        print(f"  {'':<26} {'Transacao':>10} {'tabela':>10} {'razão':>7}")
+        for name, before, after in measurements:
+            print(f"  {name:<26} {before:>10.2f} {after:>10.2f} {before / after if after else float('inf'):>6.1f}x")
+        print(f"  Totais iguais: {'sim' if round(legacy_total * 100) == table_total else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,37 @@
-import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.routes import router as api_router
+from app.services.extraction_service import extraction_service
+from app.services.job_manager import job_manager
+from app.services.artifact_store import artifact_store
+from app.services.profiler import ProfilingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicia o pool de extração, a fila de trabalhos e a limpeza de arquivos com a aplicação e os encerra ao desligar"""
+    # Remove exportações expiradas e uploads abandonados por execuções anteriores
+    artifact_store.start()
+    extraction_service.start()
+    job_manager.start()
+    yield
+    # Conclui os trabalhos em andamento antes de encerrar o pool que eles usam
+    job_manager.shutdown()
+    extraction_service.shutdown()
+    artifact_store.shutdown()
+
 
 app = FastAPI(
     title="Assistente Financeiro",
     description="API para extrair dados de faturas de cartão de crédito em PDF",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(ProfilingMiddleware)
 app.include_router(api_router, prefix="/api")
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,23 @@
+import os
+import atexit
+import shutil
+import tempfile
+
+# Diretórios gravados pela aplicação durante os testes; as configurações são lidas
+# na importação (e pelos processos do pool), por isso vêm de variáveis de ambiente
+_STATE_DIRS = {
+    "MERCHANT_DICTIONARY_DIR": "merchants",
+    "JOBS_DIR": "jobs",
+    "ARTIFACTS_DIR": "exports",
+    "PROFILES_DIR": "profiles",
+    "UPLOAD_SPOOL_DIR": "uploads",
+}
+
+
+def pytest_configure(config):
+    """Aponta os dados gravados pela aplicação para um diretório temporário, antes de importar o app"""
+    state_root = tempfile.mkdtemp(prefix="assistente-financeiro-testes-")
+    for variable, name in _STATE_DIRS.items():
+        os.environ[variable] = os.path.join(state_root, name)
+    # Registrado antes dos serviços, roda depois deles (o diário de estabelecimentos é gravado no atexit)
+    atexit.register(shutil.rmtree, state_root, ignore_errors=True)
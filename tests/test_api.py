@@ -35,7 +35,254 @@ def test_invalid_export_format():
     """Testa o upload com um formato de exportação inválido"""
     # Simula um PDF
     files = {"file": ("fake.pdf", b"%PDF-1.7\n", "application/pdf")}
-    response = client.post("/api/upload-invoice/", files=files, data={"export_format": "csv"})
+    response = client.post("/api/upload-invoice/", files=files, data={"export_format": "xml"})
     
     assert response.status_code == 400
-    assert "Formato de exportação deve ser 'json' ou 'excel'" in response.text
+    assert "Formato de exportação deve ser 'json', 'excel', 'csv'" in response.text
+
+
+def test_detect_bank_reuses_cached_result():
+    """Testa que reenviar o mesmo PDF para detecção usa o cache de resultados"""
+    with open("app/static/test_data/fatura_teste.pdf", "rb") as f:
+        content = f.read()
+
+    before = client.get("/api/cache/stats/").json()
+    for _ in range(2):
+        response = client.post("/api/detect-bank/", files={"file": ("fatura.pdf", content, "application/pdf")})
+        assert response.status_code == 200
+    after = client.get("/api/cache/stats/").json()
+
+    assert after["hits"] >= before["hits"] + 1
+
+
+def test_batch_process_reports_errors_per_file_in_order():
+    """Testa que o lote mantém a ordem de envio e registra um erro por arquivo"""
+    with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+        content = f.read()
+
+    files = [
+        ("files", ("fatura_1.pdf", content, "application/pdf")),
+        ("files", ("notas.txt", b"texto", "text/plain")),
+        ("files", ("corrompido.pdf", b"%PDF-1.7\nlixo", "application/pdf")),
+        ("files", ("fatura_2.pdf", content, "application/pdf")),
+    ]
+    response = client.post("/api/batch-process/", files=files, data={"export_format": "json"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["faturas"]) == 2
+    assert all(fatura["banco"] == "banco_do_brasil" for fatura in body["faturas"])
+    assert [erro["indice"] for erro in body["erros"]] == [1, 2]
+    assert [erro["arquivo"] for erro in body["erros"]] == ["notas.txt", "corrompido.pdf"]
+
+
+def test_bank_patterns_from_registry():
+    """Testa que os padrões de um banco são servidos pelo registro com a sua versão"""
+    response = client.get("/api/bank-patterns/banco_do_brasil")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["bank_name"] == "Banco do Brasil"
+    assert isinstance(body["version"], int)
+    assert "titular" in body["patterns"]
+
+    assert client.get("/api/bank-patterns/banco_inexistente").status_code == 404
+
+
+def test_reload_bank_patterns():
+    """Testa o recarregamento dos padrões pelo endpoint administrativo"""
+    response = client.post("/api/admin/bank-patterns/reload")
+
+    assert response.status_code == 200
+    assert "banco_do_brasil" in response.json()["banks"]
+
+
+def test_job_submit_poll_and_result():
+    """Testa o envio de um trabalho, a consulta do andamento e o resultado em JSON e Excel"""
+    import time
+
+    with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+        content = f.read()
+
+    files = [
+        ("files", ("fatura.pdf", content, "application/pdf")),
+        ("files", ("notas.txt", b"texto", "text/plain")),
+    ]
+    response = client.post("/api/jobs", files=files, data={"export_format": "json"})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "queued"
+    assert job["status_url"].endswith(f"/api/jobs/{job['job_id']}")
+
+    deadline = time.monotonic() + 60
+    while True:
+        status = client.get(f"/api/jobs/{job['job_id']}").json()
+        if status["status"] in ("completed", "failed") or time.monotonic() > deadline:
+            break
+        result = client.get(f"/api/jobs/{job['job_id']}/result")
+        # O trabalho pode terminar entre as duas consultas
+        assert result.status_code == 409 or client.get(f"/api/jobs/{job['job_id']}").json()["status"] == "completed"
+        time.sleep(0.1)
+
+    assert status["status"] == "completed"
+    assert status["progress"]["processed"] == 2
+
+    result = client.get(f"/api/jobs/{job['job_id']}/result")
+    assert result.status_code == 200
+    assert [fatura["banco"] for fatura in result.json()["faturas"]] == ["banco_do_brasil"]
+    assert [erro["arquivo"] for erro in result.json()["erros"]] == ["notas.txt"]
+
+    excel = client.get(f"/api/jobs/{job['job_id']}/result", params={"export_format": "excel"})
+    assert excel.status_code == 200
+    assert excel.content[:2] == b"PK"
+
+
+def test_unknown_job():
+    """Testa a consulta de um trabalho inexistente"""
+    assert client.get("/api/jobs/inexistente").status_code == 404
+    assert client.get("/api/jobs/inexistente/result").status_code == 404
+
+
+def test_upload_invoice_tabular_formats():
+    """Testa a exportação de uma fatura em CSV e NDJSON"""
+    import csv
+    import io
+    import json
+
+    with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+        content = f.read()
+
+    response = client.post("/api/upload-invoice/", files={"file": ("fatura.pdf", content, "application/pdf")}, data={"export_format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0].startswith("# fatura: ")
+    rows = list(csv.DictReader(line for line in lines if not line.startswith("#")))
+    assert rows and all(row["banco"] == "banco_do_brasil" for row in rows)
+
+    response = client.post("/api/upload-invoice/", files={"file": ("fatura.pdf", content, "application/pdf")}, data={"export_format": "ndjson"})
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert records[0]["tipo"] == "fatura"
+    assert records[0]["transacoes"] == len(records) - 1 == len(rows)
+
+
+def test_batch_process_streaming_ndjson():
+    """Testa o lote em streaming: uma linha por fatura ou erro e uma linha de resumo"""
+    import json
+
+    with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+        content = f.read()
+
+    files = [
+        ("files", ("fatura_1.pdf", content, "application/pdf")),
+        ("files", ("notas.txt", b"texto", "text/plain")),
+        ("files", ("fatura_2.pdf", content, "application/pdf")),
+    ]
+    with client.stream("POST", "/api/batch-process/", files=files, data={"export_format": "json", "stream": "true"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert lines[-1] == {"tipo": "resumo", "faturas": 2, "erros": 1}
+    faturas = sorted((line for line in lines if line["tipo"] == "fatura"), key=lambda line: line["indice"])
+    assert [line["arquivo"] for line in faturas] == ["fatura_1.pdf", "fatura_2.pdf"]
+    assert all(line["fatura"]["banco"] == "banco_do_brasil" for line in faturas)
+    assert [line["indice"] for line in lines if line["tipo"] == "erro"] == [1]
+
+    response = client.post("/api/batch-process/", files=files, data={"export_format": "excel", "stream": "true"})
+    assert response.status_code == 400
+
+
+def test_cold_start_import_budget():
+    """Testa que importar main:app não carrega dependências pesadas e cabe no orçamento de tempo (python -X importtime)"""
+    import os
+    import sys
+    import subprocess
+
+    budget_ms = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1000"))
+    heavy = ("pandas", "numpy", "openpyxl", "pyarrow", "PyPDF2", "uvicorn")
+    code = f"import sys, main; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == ""
+    # Linhas "import time: <próprio> | <acumulado> | <módulo>" (tempos em microssegundos)
+    cumulative = {
+        fields[2].strip(): int(fields[1])
+        for fields in (line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:"))
+        if fields[1].strip().isdigit()
+    }
+    assert cumulative["main"] / 1000 <= budget_ms
+
+
+def test_metrics_endpoint():
+    """Testa a exposição das métricas depois de uma extração"""
+    with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+        content = f.read()
+    
+    response = client.post("/api/upload-invoice/", files={"file": ("fatura.pdf", content, "application/pdf")}, data={"export_format": "json"})
+    assert response.status_code == 200
+    
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'assistente_financeiro_stage_duration_seconds_count{stage="save"}' in text
+    assert "assistente_financeiro_upload_size_bytes_count" in text
+    assert "# TYPE assistente_financeiro_extraction_cache_hits_total counter" in text
+
+
+def test_profiled_request():
+    """Testa o perfil de uma requisição pedido pelo cabeçalho X-Profile"""
+    import os
+    from app.services.profiler import get_request_profiler
+    
+    with open("app/static/test_data/fatura_teste.pdf", "rb") as f:
+        content = f.read()
+    
+    response = client.post("/api/detect-bank/", files={"file": ("fatura.pdf", content, "application/pdf")}, headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    
+    unprofiled = client.get("/api/health/")
+    assert "x-profile-id" not in unprofiled.headers
+    
+    response = client.get("/api/profiles", params={"limit": 200})
+    assert response.status_code == 200
+    profiles = {profile["profile_id"]: profile for profile in response.json()["profiles"]}
+    files = profiles[profile_id]["files"]
+    try:
+        assert any(file["pid"] == os.getpid() and file["format"] == "prof" for file in files)
+        assert any(file["format"] == "collapsed" and file["size"] > 0 for file in files)
+    finally:
+        for file in files:
+            os.unlink(os.path.join(get_request_profiler().directory, file["name"]))
+
+
+def test_upload_invoice_over_page_limit():
+    """Testa que um PDF acima do limite de páginas é recusado com um erro estruturado (422)"""
+    import io
+    import PyPDF2
+    from app.core.config import EXTRACTION_LIMITS_CONFIG
+    
+    writer = PyPDF2.PdfWriter()
+    for _ in range(EXTRACTION_LIMITS_CONFIG["max_pages"] + 1):
+        writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    
+    response = client.post("/api/upload-invoice/", files={"file": ("longa.pdf", buffer.getvalue(), "application/pdf")}, data={"export_format": "json"})
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert detail["code"] == "max_pages" and detail["limit"] == EXTRACTION_LIMITS_CONFIG["max_pages"]
+    
+    # A detecção do banco também recusa o documento em vez de responder "banco não detectado"
+    response = client.post("/api/detect-bank/", files={"file": ("longa.pdf", buffer.getvalue(), "application/pdf")})
+    assert response.status_code == 422
+    assert response.json()["detail"]["code"] == "max_pages"
@@ -2,10 +2,22 @@ import os
 import pytest
 import json
 import tempfile
+import asyncio
 from unittest.mock import patch, MagicMock
 from app.services.pdf_extractor import PDFExtractor
 from app.services.data_exporter import DataExporter
 from app.utils.bank_detector import BankDetector
+from app.utils.pdf_utils import PDFValidator
+from app.utils.parsed_document import ParsedDocument
+from app.services.extraction_cache import ExtractionCache
+from app.services.extraction_service import ExtractionService, ExtractionServiceClosedError, ExtractionTimeoutError
+from app.utils.upload_buffer import UploadBuffer
+from app.services.pattern_registry import PatternRegistry, PatternRegistryError
+from app.services.categorizer import Categorizer, CategoryRuleSet, CategoryRulesError
+from app.services.merchant_dictionary import MerchantDictionary, MerchantEntry, MerchantTable, compact, merchant_key
+from app.services.job_store import JobStore
+from app.services.job_manager import JobManager, JobManagerClosedError
+from app.services.artifact_store import ArtifactStore
 
 # Dados de exemplo para os testes
 SAMPLE_DATA = {
@@ -83,7 +95,86 @@ class TestDataExporter:
             
         except Exception as e:
             pytest.fail(f"Erro ao ler o arquivo Excel: {str(e)}")
-            
+
+    def test_to_excel_category_analysis(self, exporter):
+        """Testa a análise por categoria calculada durante a escrita das transações"""
+        import io
+        from openpyxl import load_workbook
+
+        data = dict(SAMPLE_DATA, transacoes=SAMPLE_DATA["transacoes"] + [
+            {"data": "07/06", "descricao": "LOJA", "valor": 10.0, "categoria": None},
+            {"data": "08/06", "descricao": "MERCADO", "valor": 50.0, "categoria": "Supermercado"},
+        ])
+
+        # Exportação em memória, sem criar arquivo
+        workbook = load_workbook(io.BytesIO(exporter.to_excel_bytes(data)), read_only=True)
+        assert workbook.sheetnames == ["Resumo", "Transações", "Análise por Categoria"]
+
+        rows = list(workbook["Análise por Categoria"].iter_rows(values_only=True))
+        assert rows[0] == ("Categoria", "Valor Total", "Quantidade")
+        assert rows[1] == ("Supermercado", 200.0, 2)
+        assert rows[-1] == ("Não Categorizado", 10.0, 1)
+        assert len(list(workbook["Transações"].iter_rows())) == len(data["transacoes"]) + 1
+        assert os.listdir(exporter.output_dir) == []
+
+    def test_to_csv_and_ndjson(self, exporter):
+        """Testa as colunas tipadas e o cabeçalho de metadados dos formatos tabulares"""
+        import csv
+
+        with open(exporter.to_csv(SAMPLE_DATA, "fatura.csv"), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert json.loads(lines[0][len("# fatura: "):])["titular"] == "NOME DO CLIENTE"
+        rows = list(csv.DictReader(lines[1:]))
+        assert rows[0] == {
+            "fatura": "0", "data": "2025-06-01", "descricao": "SUPERMERCADO XYZ",
+            "valor_centavos": "15000", "categoria": "Supermercado", "banco": "banco_do_brasil",
+        }
+        assert len(rows) == len(SAMPLE_DATA["transacoes"])
+
+        erros = [{"indice": 1, "arquivo": "notas.txt", "erro": "Apenas arquivos PDF são aceitos"}]
+        with open(exporter.to_ndjson_batch([SAMPLE_DATA, SAMPLE_DATA], "lote.ndjson", erros), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert [record["tipo"] for record in records].count("fatura") == 2
+        assert records[1]["valor_centavos"] == 15000 and records[1]["data"] == "2025-06-01"
+        assert records[-1] == {"tipo": "erro", **erros[0]}
+
+    def test_transaction_dates_across_years(self):
+        """Testa o ano das transações de uma fatura que fecha em janeiro"""
+        from datetime import date
+        from app.services.table_writers import transaction_date, to_cents
+
+        closing = date(2025, 1, 10)
+        assert transaction_date("20/12", closing) == date(2024, 12, 20)
+        assert transaction_date("05/01", closing) == date(2025, 1, 5)
+        assert transaction_date("31/02", closing) is None
+        assert to_cents(-85.5) == -8550 and to_cents("1500.00") == 150000 and to_cents(None) is None
+
+    def test_to_parquet_requires_pyarrow(self, exporter):
+        """Testa que o Parquet só é oferecido com o pyarrow instalado"""
+        from app.services.data_exporter import available_export_formats
+        from app.services.table_writers import parquet_available
+
+        if parquet_available():
+            import pyarrow.parquet as pq
+            table = pq.read_table(exporter.to_parquet(SAMPLE_DATA, "fatura.parquet"))
+            assert table.column_names == ["fatura", "data", "descricao", "valor_centavos", "categoria", "banco"]
+            assert table.num_rows == len(SAMPLE_DATA["transacoes"])
+            assert "parquet" in available_export_formats()
+        else:
+            assert "parquet" not in available_export_formats()
+            with pytest.raises(RuntimeError):
+                exporter.to_parquet(SAMPLE_DATA, "fatura.parquet")
+
+    def test_to_excel_without_transactions(self, exporter):
+        """Testa a planilha de uma fatura sem transações"""
+        from openpyxl import load_workbook
+
+        result_path = exporter.to_excel(dict(SAMPLE_DATA, transacoes=[]), "vazia.xlsx")
+        workbook = load_workbook(result_path, read_only=True)
+
+        assert workbook.sheetnames == ["Resumo", "Transações"]
+        assert list(workbook["Transações"].iter_rows(values_only=True)) == [("Mensagem",), ("Nenhuma transação encontrada",)]
+
     def test_generate_report(self, exporter):
         """Testa a geração de relatório"""
         # Teste com JSON
@@ -109,7 +200,7 @@ class TestBankDetector:
         # Verifica se o Banco do Brasil está na lista
         assert "banco_do_brasil" in banks
         
-    @patch('app.utils.bank_detector.PyPDF2.PdfReader')
+    @patch('app.utils.parsed_document.PyPDF2.PdfReader')
     def test_detect_bank(self, mock_pdf_reader):
         """Testa a detecção automática de banco"""
         # Configura o mock para retornar um texto de exemplo
@@ -120,13 +211,13 @@ class TestBankDetector:
         mock_reader_instance.pages = [mock_page]
         mock_pdf_reader.return_value = mock_reader_instance
         
-        # Simula um arquivo que não existe mas o mock vai interceptar a leitura
-        result = BankDetector.detect_bank("fake_path.pdf")
+        # Documento em memória; o mock intercepta a leitura
+        result = BankDetector.detect_bank(ParsedDocument(b"%PDF-1.4", name="fake_path.pdf"))
         
         # Verifica se o banco foi corretamente identificado
         assert result == "banco_do_brasil"
         
-    @patch('app.utils.bank_detector.PyPDF2.PdfReader')
+    @patch('app.utils.parsed_document.PyPDF2.PdfReader')
     def test_detect_bank_unknown(self, mock_pdf_reader):
         """Testa a detecção automática para um banco desconhecido"""
         # Configura o mock para retornar um texto sem padrões conhecidos
@@ -137,17 +228,42 @@ class TestBankDetector:
         mock_reader_instance.pages = [mock_page]
         mock_pdf_reader.return_value = mock_reader_instance
         
-        # Simula um arquivo que não existe mas o mock vai interceptar a leitura
-        result = BankDetector.detect_bank("fake_path.pdf")
+        # Documento em memória; o mock intercepta a leitura
+        result = BankDetector.detect_bank(ParsedDocument(b"%PDF-1.4", name="fake_path.pdf"))
         
         # Verifica que nenhum banco foi identificado
         assert result is None
+    
+    def test_weak_signals_alone_do_not_detect(self):
+        """Testa que sinais fracos (como 'BB' e 'Cartão 1234') não bastam para identificar o banco"""
+        result = BankDetector.score_text("Pagamento BB 123 - Cartão 1234")
+        
+        assert result["bank_id"] is None
+        assert result["scores"] == {"banco_do_brasil": 1.0}
+    
+    def test_detect_scores_all_banks(self):
+        """Testa que vence o banco com mais evidências, independentemente da ordem dos bancos"""
+        text = "Nu Pagamentos S.A. - www.nubank.com.br\nCartão 1234\nBB SHOPPING"
+        result = BankDetector.score_text(text)
+        
+        assert result["bank_id"] == "nubank"
+        assert result["scores"]["nubank"] == 10.0
+        assert result["scores"]["banco_do_brasil"] == 1.0
+        assert result["confidence"] == round(10.0 / 11.0, 3)
+    
+    def test_repeated_signal_counts_once(self):
+        """Testa que um sinal repetido soma o seu peso uma única vez"""
+        result = BankDetector.score_text("Bradesco " * 50)
+        
+        assert result["bank_id"] == "bradesco"
+        assert result["scores"] == {"bradesco": 4.0}
+        assert result["confidence"] == 1.0
 
 
 class TestPDFExtractor:
     """Testes para o extrator de PDF"""
     
-    @patch('app.services.pdf_extractor.PyPDF2.PdfReader')
+    @patch('app.utils.parsed_document.PyPDF2.PdfReader')
     @patch('app.utils.pdf_utils.PDFValidator.validate_pdf')
     def test_extract_with_bank_id(self, mock_validate_pdf, mock_pdf_reader):
         """Testa a extração com um banco específico"""
@@ -155,14 +271,13 @@ class TestPDFExtractor:
         mock_validate_pdf.return_value = True
         
         mock_page = MagicMock()
+        # Cabeçalho no formato das faturas do BB: "Nome (Cartão NNNN)"
         mock_page.extract_text.return_value = """
-        Nome: CLIENTE TESTE
-        Cartão: ****5678
-        Fechamento: 15/06/2025
+        Cliente Teste (Cartão 5678)
         Vencimento 01/07/2025
-        Total R$ 1500,50
+        Total da Fatura R$ 1.500,50
         
-        01/06 SUPERMERCADO XYZ R$ 150,00
+        01/06 SUPERMERCADO XYZ BR R$ 150,00
         05/06 RESTAURANTE ABC R$ 85,50
         """
         
@@ -172,18 +287,40 @@ class TestPDFExtractor:
         
         # Testa a extração com banco específico
         extractor = PDFExtractor()
-        result = extractor.extract("fake_path.pdf", bank_id="banco_do_brasil")
+        result = extractor.extract(ParsedDocument(b"%PDF-1.4", name="fake_path.pdf"), bank_id="banco_do_brasil")
         
         # Verifica os dados extraídos
         assert result["banco"] == "banco_do_brasil"
-        assert result["titular"] == "CLIENTE TESTE"
-        assert result["numero_cartao"] == "****5678"
-        assert result["data_fechamento"] == "15/06/2025"
+        assert result["titular"] == "Cliente Teste"
+        assert result["numero_cartao"] == "5678"
+        # O BB não imprime o fechamento; ele vem da primeira transação
+        assert result["data_fechamento"].startswith("01/06/")
         assert result["data_vencimento"] == "01/07/2025"
-        assert result["valor_total"] == "1500,50"
-        assert len(result["transacoes"]) > 0
+        assert result["valor_total"] == "1.500,50"
+        assert len(result["transacoes"]) == 2
     
-    @patch('app.services.pdf_extractor.PyPDF2.PdfReader')
+    @patch('app.utils.parsed_document.PyPDF2.PdfReader')
+    @patch('app.utils.pdf_utils.PDFValidator.validate_pdf')
+    def test_computed_total_format(self, mock_validate_pdf, mock_pdf_reader):
+        """Testa que o total calculado (sem total na fatura) mantém o formato 1234.56"""
+        mock_validate_pdf.return_value = True
+        
+        mock_page = MagicMock()
+        mock_page.extract_text.return_value = """
+        Cliente Teste (Cartão 5678)
+        
+        01/06 SUPERMERCADO XYZ BR R$ 1.150,00
+        05/06 RESTAURANTE ABC R$ 85,55
+        """
+        mock_reader_instance = MagicMock()
+        mock_reader_instance.pages = [mock_page]
+        mock_pdf_reader.return_value = mock_reader_instance
+        
+        result = PDFExtractor().extract(ParsedDocument(b"%PDF-1.4", name="fake_path.pdf"), bank_id="banco_do_brasil")
+        
+        assert result["valor_total"] == "1235.55"
+    
+    @patch('app.utils.parsed_document.PyPDF2.PdfReader')
     @patch('app.utils.pdf_utils.PDFValidator.validate_pdf')
     @patch('app.utils.bank_detector.BankDetector.detect_bank')
     def test_extract_with_auto_detection(self, mock_detect_bank, mock_validate_pdf, mock_pdf_reader):
@@ -194,13 +331,11 @@ class TestPDFExtractor:
         
         mock_page = MagicMock()
         mock_page.extract_text.return_value = """
-        Nome: CLIENTE AUTO
-        Cartão: ****1234
-        Fechamento: 15/06/2025
+        Cliente Auto (Cartão 1234)
         Vencimento 01/07/2025
-        Total R$ 2000,00
+        Total da Fatura R$ 2.000,00
         
-        01/06 SUPERMERCADO XYZ R$ 150,00
+        01/06 SUPERMERCADO XYZ BR R$ 150,00
         05/06 RESTAURANTE ABC R$ 85,50
         """
         
@@ -210,8 +345,1236 @@ class TestPDFExtractor:
         
         # Testa a extração com detecção automática
         extractor = PDFExtractor()
-        result = extractor.extract("fake_path.pdf")  # Sem especificar bank_id
+        result = extractor.extract(ParsedDocument(b"%PDF-1.4", name="fake_path.pdf"))  # Sem especificar bank_id
         
         # Verifica os dados extraídos
         assert result["banco"] == "banco_do_brasil"  # Detectado automaticamente
-        assert result["titular"] == "CLIENTE AUTO"
+        assert result["titular"] == "Cliente Auto"
+    
+    @patch('app.utils.parsed_document.PyPDF2.PdfReader')
+    def test_extract_decodes_each_page_once(self, mock_pdf_reader):
+        """Testa que detecção, validação e extração compartilham um único decode do PDF"""
+        mock_pages = []
+        for text in ["OUROCARD\n01/06 SUPERMERCADO XYZ R$ 150,00\n", "05/06 RESTAURANTE ABC R$ 85,50\n", "10/06 FARMACIA 123 R$ 45,75\n"]:
+            mock_page = MagicMock()
+            mock_page.extract_text.return_value = text
+            mock_pages.append(mock_page)
+        
+        mock_reader_instance = MagicMock()
+        mock_reader_instance.pages = mock_pages
+        mock_pdf_reader.return_value = mock_reader_instance
+        
+        document = ParsedDocument(b"%PDF-1.4", name="fatura.pdf")
+        assert BankDetector.detect_bank(document) == "banco_do_brasil"
+        result = PDFExtractor().extract(document)
+        
+        assert result["banco"] == "banco_do_brasil"
+        assert len(result["transacoes"]) == 3
+        # Um único PdfReader e uma única extração de texto por página
+        assert mock_pdf_reader.call_count == 1
+        for mock_page in mock_pages:
+            assert mock_page.extract_text.call_count == 1
+    
+    @patch('app.utils.parsed_document.PyPDF2.PdfReader')
+    def test_transaction_batches_stream_pages(self, mock_pdf_reader):
+        """Testa que as transações de uma página são entregues antes da leitura da página seguinte"""
+        # A segunda transação começa em uma página e termina na outra
+        texts = ["OUROCARD\n01/06 SUPERMERCADO XYZ R$ 150,00\n05/06 RESTAURANTE", " ABC R$ 85,50\n", "10/06 FARMACIA 123 R$ 45,75"]
+        mock_pages = []
+        for text in texts:
+            mock_page = MagicMock()
+            mock_page.extract_text.return_value = text
+            mock_pages.append(mock_page)
+        
+        mock_reader_instance = MagicMock()
+        mock_reader_instance.pages = mock_pages
+        mock_pdf_reader.return_value = mock_reader_instance
+        
+        from app.services.pattern_registry import get_pattern_registry
+        
+        document = ParsedDocument(b"%PDF-1.4", name="fatura.pdf")
+        batches = PDFExtractor()._iter_transaction_batches(document, "banco_do_brasil", get_pattern_registry().snapshot())
+        
+        first = next(batches)
+        assert [t.descricao for t in first] == ["SUPERMERCADO XYZ"]
+        assert first[0].categoria == "Supermercado"
+        # Só a primeira página foi decodificada até aqui
+        assert mock_pages[1].extract_text.call_count == 0
+        
+        rest = [t for batch in batches for t in batch]
+        assert [t.descricao for t in rest] == ["RESTAURANTE ABC", "FARMACIA 123"]
+        assert [t.valor for t in rest] == [85.5, 45.75]
+        # As páginas não ficam memorizadas no documento
+        assert document._page_texts is None
+    
+    def test_bb_line_classifier_tracks_sections(self):
+        """Testa a classificação das linhas do BB em uma passagem e a seção corrente do extrato"""
+        from app.services.pattern_registry import get_pattern_registry
+        from app.services.pdf_extractor import BBLineState
+        
+        bank = get_pattern_registry().snapshot().get('banco_do_brasil')
+        lines = [
+            "Total da fatura R$ 1.234,56",
+            "Data Descrição Valor",
+            "SALDO FATURA ANTERIOR R$ 980,10",
+            "Pagamentos/Créditos",
+            "05/06 PGTO DEBITO CONTA R$ 980,10",
+            "Lazer",
+            "02/06 CINEMARK SHOPPING BRASILIA BR R$ 64,00",
+            "03/06 PADARIA 42,00",
+            "",
+            "Página 1 de 2",
+        ]
+        state = BBLineState()
+        found = PDFExtractor()._classify_bb_lines(lines, bank, state)
+        
+        assert [(fields, credit) for fields, _, credit in found] == [
+            (("05/06", "PGTO DEBITO CONTA", "980,10"), True),
+            (("02/06", "CINEMARK SHOPPING BRASILIA", "64,00"), False),
+            (("03/06", "PADARIA", "42,00"), False),
+        ]
+        assert state.section == "rodape" and state.block == "Página 1 de 2"
+        assert state.lines == 9 and state.transactions == 3
+        
+        # A tabela recomeça na página seguinte
+        PDFExtractor()._classify_bb_lines(["Data Descrição Valor"], bank, state)
+        assert state.section == "transacoes" and state.block is None
+    
+    def test_bb_credit_section_ends_at_next_block(self):
+        """Testa que só as transações do bloco de pagamentos viram créditos, mesmo com títulos fora da lista de linhas ignoradas"""
+        from app.services.pattern_registry import get_pattern_registry
+        from app.services.pdf_extractor import BBLineState
+        
+        bank = get_pattern_registry().snapshot().get('banco_do_brasil')
+        lines = [
+            "Pagamentos/Créditos",
+            "05/06 PGTO DEBITO CONTA R$ 980,10",
+            "06/06 ESTORNO LOJA X R$ 15,00",
+            "Vestuário",
+            "07/06 RENNER SHOPPING R$ 200,00",
+            "Transporte",
+            "08/06 UBER TRIP R$ 30,00",
+        ]
+        state = BBLineState()
+        found = PDFExtractor()._classify_bb_lines(lines, bank, state)
+        
+        assert [(fields[1], credit) for fields, _, credit in found] == [
+            ("PGTO DEBITO CONTA", True),
+            ("ESTORNO LOJA X", True),
+            ("RENNER SHOPPING", False),
+            ("UBER TRIP", False),
+        ]
+        assert state.section == "transacoes"
+        
+        # O estado da página seguinte também não volta a marcar créditos
+        found = PDFExtractor()._classify_bb_lines(["09/06 PADARIA R$ 12,00"], bank, state)
+        assert [credit for _, _, credit in found] == [False]
+        
+        # Na extração, os créditos abatem o total e as compras continuam positivas
+        with tempfile.TemporaryDirectory() as temp_dir:
+            merchants = MerchantDictionary(os.path.join(temp_dir, "dicionario.bin"), os.path.join(temp_dir, "diario"), learn=False)
+            parsed = list(PDFExtractor()._parse_bb_lines(lines, bank, merchants))
+        assert [transacao.centavos for transacao, _ in parsed] == [-98010, -1500, 20000, 3000]
+
+
+class TestExtractionCache:
+    """Testes para o cache de resultados de extração"""
+    
+    def test_make_key_depends_on_content_and_version(self):
+        """Testa que a chave muda com o conteúdo e com a versão dos padrões"""
+        key = ExtractionCache.make_key(b"%PDF-a", 1, "extract", "auto")
+        
+        assert key == ExtractionCache.make_key(b"%PDF-a", 1, "extract", "auto")
+        assert key != ExtractionCache.make_key(b"%PDF-b", 1, "extract", "auto")
+        assert key != ExtractionCache.make_key(b"%PDF-a", 2, "extract", "auto")
+    
+    def test_memory_lru_eviction(self):
+        """Testa a remoção do item menos usado quando o limite é atingido"""
+        cache = ExtractionCache(memory_max_entries=2)
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2})
+        assert cache.get("a") == {"v": 1}  # "a" passa a ser o mais recente
+        cache.set("c", {"v": 3})
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == {"v": 1}
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+    
+    def test_disk_tier_survives_new_instance(self):
+        """Testa que o nível em disco é reaproveitado por outra instância"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ExtractionCache(disk_dir=temp_dir).set("chave", SAMPLE_DATA)
+            
+            cache = ExtractionCache(disk_dir=temp_dir)
+            assert cache.get("chave") == SAMPLE_DATA
+            assert cache.stats()["disk_hits"] == 1
+    
+    def test_disk_tier_ttl_and_size_limit(self):
+        """Testa a expiração por TTL e o limite de tamanho do disco"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ExtractionCache(memory_max_entries=0, disk_dir=temp_dir, ttl_seconds=60)
+            cache.set("antiga", {"v": 1})
+            old_path = cache._disk_path("antiga")
+            os.utime(old_path, (0, 0))
+            assert cache.get("antiga") is None
+            assert not os.path.exists(old_path)
+            
+            cache = ExtractionCache(memory_max_entries=0, disk_dir=temp_dir, disk_max_bytes=60)
+            cache.set("primeira", {"v": "x" * 30})
+            os.utime(cache._disk_path("primeira"), (1, 1))
+            cache.set("segunda", {"v": "y" * 30})
+            assert cache.get("primeira") is None
+            assert cache.get("segunda") == {"v": "y" * 30}
+    
+    def test_single_flight(self):
+        """Testa que requisições concorrentes aguardam uma única extração"""
+        cache = ExtractionCache()
+        calls = []
+        
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"banco": "banco_do_brasil"}
+        
+        async def run():
+            return await asyncio.gather(*[cache.get_or_compute("k", compute) for _ in range(5)])
+        
+        results = asyncio.run(run())
+        
+        assert len(calls) == 1
+        assert all(result == {"banco": "banco_do_brasil"} for result in results)
+        # Quem aguardou a extração em andamento não conta como falha
+        stats = cache.stats()
+        assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 4, 0)
+    
+    def test_get_or_compute_reads_disk_tier(self):
+        """Testa que get_or_compute reaproveita o nível em disco sem calcular de novo"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ExtractionCache(disk_dir=temp_dir).set("chave", SAMPLE_DATA)
+            cache = ExtractionCache(disk_dir=temp_dir)
+            
+            async def compute():
+                raise AssertionError("o valor deveria vir do disco")
+            
+            assert asyncio.run(cache.get_or_compute("chave", compute)) == SAMPLE_DATA
+            assert cache.stats()["disk_hits"] == 1
+            assert cache.stats()["misses"] == 0
+    
+    def test_single_flight_propagates_errors_without_caching(self):
+        """Testa que falhas são repassadas aos que aguardam e não ficam em cache"""
+        cache = ExtractionCache()
+        
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("PDF inválido")
+        
+        async def run():
+            return await asyncio.gather(*[cache.get_or_compute("k", failing) for _ in range(3)], return_exceptions=True)
+        
+        results = asyncio.run(run())
+        
+        assert all(isinstance(result, ValueError) for result in results)
+        assert cache.get("k") is None
+
+    def test_single_flight_leader_cancelled(self):
+        """Testa que o cancelamento de quem calcula não é repassado aos que aguardam"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ExtractionCache(disk_dir=temp_dir)
+            calls = []
+
+            async def compute():
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return {"banco": "banco_do_brasil"}
+
+            async def run():
+                leader = asyncio.create_task(cache.get_or_compute("k", compute))
+                await asyncio.sleep(0)
+                followers = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(3)]
+                await asyncio.sleep(0.01)
+                leader.cancel()
+                return await asyncio.gather(leader, *followers, return_exceptions=True)
+
+            results = asyncio.run(run())
+
+            assert isinstance(results[0], asyncio.CancelledError)
+            assert results[1:] == [{"banco": "banco_do_brasil"}] * 3
+            assert len(calls) == 2
+            assert os.path.exists(cache._disk_path("k"))
+
+
+class TestExtractionService:
+    """Testes para o serviço de extração em pool de processos"""
+    
+    TEST_PDF = "app/static/test_data/fatura_teste.pdf"
+    
+    def test_detect_bank_in_process_pool(self):
+        """Testa a detecção de banco executada em um processo do pool"""
+        service = ExtractionService(max_workers=1, max_tasks_per_child=10, task_timeout=60)
+        try:
+            result = asyncio.run(service.detect(self.TEST_PDF))
+        finally:
+            service.shutdown()
+        
+        # A fatura de teste é de um banco fictício
+        assert result["bank_id"] is None
+    
+    def test_export_in_thread_mode(self):
+        """Testa a exportação executada fora do loop com max_workers=0"""
+        service = ExtractionService(max_workers=0)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            result_path = asyncio.run(service.export_artifact("to_json", SAMPLE_DATA, "json", root=temp_dir))
+            
+            assert os.path.dirname(result_path).startswith(temp_dir)
+            with open(result_path, 'r', encoding='utf-8') as f:
+                assert json.load(f)["titular"] == SAMPLE_DATA["titular"]
+    
+    def test_service_refuses_tasks_after_shutdown(self):
+        """Testa que o serviço não recria o pool depois do desligamento"""
+        service = ExtractionService(max_workers=0)
+        service.shutdown()
+        
+        with pytest.raises(ExtractionServiceClosedError):
+            asyncio.run(service.detect(self.TEST_PDF))
+        
+        # Só uma nova inicialização explícita volta a aceitar tarefas
+        service.start()
+        assert asyncio.run(service.detect(self.TEST_PDF))["bank_id"] is None
+    
+    def test_task_timeout(self):
+        """Testa que tarefas lentas excedem o tempo limite configurado"""
+        import time
+        service = ExtractionService(max_workers=0, task_timeout=0.05)
+        
+        with pytest.raises(ExtractionTimeoutError):
+            asyncio.run(service._run(time.sleep, 0.5))
+
+
+class TestUploadBuffer:
+    """Testes para a leitura de arquivos enviados em memória ou em spool"""
+    
+    @staticmethod
+    def _read(content, **kwargs):
+        """Lê um conteúdo simulando um UploadFile do FastAPI"""
+        import io
+        import hashlib
+        from fastapi import UploadFile
+        
+        upload = asyncio.run(UploadBuffer.read(UploadFile(file=io.BytesIO(content), filename="fatura.pdf"), **kwargs))
+        assert upload.sha256 == hashlib.sha256(content).hexdigest()
+        assert upload.size == len(content)
+        return upload
+    
+    def test_small_file_stays_in_memory(self):
+        """Testa que arquivos pequenos não tocam o disco"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            upload = self._read(b"%PDF-1.7 pequeno", spool_threshold=1024, spool_dir=temp_dir)
+            
+            assert upload.in_memory
+            assert upload.source == b"%PDF-1.7 pequeno"
+            assert os.listdir(temp_dir) == []
+    
+    def test_large_file_is_spooled_and_cleaned(self):
+        """Testa que arquivos grandes vão para o spool e são removidos no cleanup"""
+        content = b"%PDF-1.7 " + b"x" * (600 * 1024)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            upload = self._read(content, spool_threshold=100 * 1024, spool_dir=temp_dir)
+            
+            assert not upload.in_memory
+            with open(upload.source, "rb") as f:
+                assert f.read() == content
+            
+            upload.cleanup()
+            assert os.listdir(temp_dir) == []
+    
+    def test_persist_moves_spool_file(self):
+        """Testa que o buffer persistido aponta para o destino e não o remove no cleanup"""
+        content = b"%PDF-1.7 " + b"x" * (600 * 1024)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            upload = self._read(content, spool_threshold=100 * 1024, spool_dir=os.path.join(temp_dir, "spool"))
+            destination = upload.persist(os.path.join(temp_dir, "trabalho", "0.pdf"))
+            
+            assert os.listdir(os.path.join(temp_dir, "spool")) == []
+            assert upload.source == destination
+            upload.cleanup()
+            with open(destination, "rb") as f:
+                assert f.read() == content
+    
+    def test_in_memory_content_is_parsed_without_temp_file(self):
+        """Testa que o conteúdo em memória é entregue diretamente ao PdfReader"""
+        with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+            content = f.read()
+        
+        document = ParsedDocument.open(memoryview(content), name="fatura.pdf")
+        
+        assert PDFValidator.validate_pdf(document)
+        assert document.page_count == 2
+        assert "OUROCARD" in document.page_text(0)
+
+
+class TestPatternRegistry:
+    """Testes para o registro versionado de padrões dos bancos"""
+    
+    @staticmethod
+    def _write(path, version, detection):
+        """Grava um arquivo de padrões mínimo"""
+        data = {
+            "version": version,
+            "default_bank": "banco_x",
+            "defaults": {"titular": "Nome:\\s*([^\\n]*)"},
+            "banks": {"banco_x": {"name": "Banco X", "detection": detection, "extraction": {"numero_cartao": "Cartão\\s+(\\d+)"}}},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    
+    def test_default_file_compiles(self):
+        """Testa que o arquivo de padrões distribuído é válido"""
+        from app.core.config import BANK_PATTERNS_CONFIG
+        snapshot = PatternRegistry(BANK_PATTERNS_CONFIG["path"]).snapshot()
+        
+        assert "banco_do_brasil" in snapshot.banks
+        assert snapshot.get("banco_do_brasil").detection[0].search("ourocard")
+        # Campos nulos no banco usam o padrão genérico
+        assert snapshot.extraction_patterns("banco_do_brasil")["data_fechamento"] is not None
+        # Bancos sem padrões de extração usam os do banco padrão
+        assert snapshot.extraction_patterns("nubank")["titular"] is snapshot.extraction_patterns("banco_do_brasil")["titular"]
+    
+    def test_reload_on_file_change(self):
+        """Testa o recarregamento automático quando o arquivo muda"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "padroes.json")
+            self._write(path, 1, ["BANCO X"])
+            registry = PatternRegistry(path, check_interval=0)
+            first = registry.snapshot()
+            
+            self._write(path, 2, ["BANCO X", "BX\\s+"])
+            os.utime(path, (first.mtime + 10, first.mtime + 10))
+            second = registry.snapshot()
+            
+            assert first.version == 1
+            assert second.version == 2
+            assert len(second.get("banco_x").detection) == 2
+            assert first.cache_version != second.cache_version
+            # O snapshot antigo continua íntegro para quem já o obteve
+            assert len(first.get("banco_x").detection) == 1
+    
+    def test_invalid_file_keeps_previous_snapshot(self):
+        """Testa que um arquivo inválido não substitui os padrões em uso"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "padroes.json")
+            self._write(path, 1, ["BANCO X"])
+            registry = PatternRegistry(path, check_interval=0)
+            registry.snapshot()
+            
+            self._write(path, 2, ["(parêntese aberto"])
+            with pytest.raises(PatternRegistryError):
+                registry.reload()
+            
+            os.utime(path, (1, 1))
+            assert registry.snapshot().version == 1
+
+
+class TestCategorizer:
+    """Testes para o categorizador de transações por palavras-chave"""
+    
+    RULES = {
+        "version": 1,
+        "categories": [
+            {"name": "Combustível", "priority": 30, "keywords": ["posto ipiranga"]},
+            {"name": "Alimentação", "priority": 20, "keywords": ["bar", "restaurante"]},
+            {"name": "Transporte", "priority": 10, "keywords": ["99", "ipiranga", {"keyword": "uber eats", "priority": 40}]},
+        ],
+    }
+    
+    def test_matches_whole_words_only(self):
+        """Testa que palavras-chave não casam dentro de outras palavras"""
+        rules = CategoryRuleSet(self.RULES)
+        
+        assert rules.categorize("BAR DO ZE") == "Alimentação"
+        assert rules.categorize("BARBEARIA DO ZE") is None
+        assert rules.categorize("LOJA 1999") is None
+        assert rules.categorize("99 *POP") == "Transporte"
+    
+    def test_priority_and_overlapping_keywords(self):
+        """Testa a prioridade entre regras e palavras-chave sobrepostas"""
+        rules = CategoryRuleSet(self.RULES)
+        
+        # "posto ipiranga" e "ipiranga" casam; vence a maior prioridade
+        assert rules.categorize("AUTO POSTO IPIRANGA") == "Combustível"
+        assert rules.categorize("IPIRANGA SHOP") == "Transporte"
+        # Prioridade definida na própria palavra-chave
+        assert rules.categorize("UBER EATS RESTAURANTE") == "Transporte"
+        # Acentos e maiúsculas são ignorados
+        assert rules.categorize("Restaurânte Sabor") == "Alimentação"
+    
+    def test_categorize_many_keeps_order(self):
+        """Testa a categorização em lote de uma fatura inteira"""
+        rules = CategoryRuleSet(self.RULES)
+        descriptions = ["BAR DO ZE", "LOJA X", "BAR DO ZE", "99 TAXI"]
+        
+        assert rules.categorize_many(descriptions) == ["Alimentação", None, "Alimentação", "Transporte"]
+    
+    def test_default_rules(self):
+        """Testa as regras distribuídas com a aplicação"""
+        from app.core.config import CATEGORY_RULES_CONFIG
+        rules = Categorizer(CATEGORY_RULES_CONFIG["path"]).snapshot()
+        
+        assert rules.categorize("SUPERMERCADO XYZ") == "Supermercado"
+        assert rules.categorize("FARMACIA 123") == "Saúde"
+        assert rules.categorize("IFOOD *RESTAURANTE") == "Alimentação"
+    
+    def test_invalid_rules_file(self):
+        """Testa que um arquivo de regras inválido é rejeitado"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "regras.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "categories": [{"name": "X", "keywords": ["***"]}]}, f)
+            
+            with pytest.raises(CategoryRulesError):
+                Categorizer(path).reload()
+
+
+class TestMerchantDictionary:
+    """Testes para o dicionário persistente de estabelecimentos"""
+    
+    def test_table_round_trip(self):
+        """Testa a gravação e a consulta da tabela mapeada em memória"""
+        entries = {f"generic\x1fLOJA {i}": MerchantEntry(f"Loja {i}", "Compras" if i % 2 else None) for i in range(1000)}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "dicionario.bin")
+            MerchantTable.write(path, entries, {"patterns_version": "1", "rules_version": "1"})
+            table = MerchantTable(path)
+            try:
+                assert table.count == 1000
+                assert table.get("generic\x1fLOJA 7") == MerchantEntry("Loja 7", "Compras")
+                assert table.get("generic\x1fLOJA 8") == MerchantEntry("Loja 8", None)
+                assert table.get("generic\x1fLOJA 1000") is None
+                assert dict(table.items()) == entries
+            finally:
+                table.close()
+    
+    def test_compact_and_lookup(self):
+        """Testa que os estabelecimentos aprendidos passam para a tabela na compactação"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dictionary = MerchantDictionary(
+                os.path.join(temp_dir, "dicionario.bin"), os.path.join(temp_dir, "diario"), learn=True, check_interval=0
+            )
+            dictionary.learn("generic", "UBER *TRIP  BR", MerchantEntry("UBER *TRIP", "Transporte"))
+            dictionary.learn("generic", "UBER *TRIP  BR", MerchantEntry("UBER *TRIP", "Transporte"))
+            
+            summary = compact(dictionary)
+            assert summary == {"kept": 0, "resolved": 1, "total": 1}
+            assert not os.path.exists(dictionary.journal_path)
+            
+            # Um processo novo (sem nada aprendido em memória) encontra o estabelecimento na tabela
+            other = MerchantDictionary(dictionary.path, dictionary.journal_path, check_interval=0)
+            assert other.lookup("generic", "UBER *TRIP BR") == MerchantEntry("UBER *TRIP", "Transporte")
+            assert other.lookup("banco_do_brasil", "UBER *TRIP BR") is None
+            assert other.stats()["table_usable"] is True
+    
+    def test_keys_ignore_case_digits_and_installments(self):
+        """Testa que as parcelas e os códigos de um estabelecimento compartilham a chave"""
+        key = merchant_key("generic", "LOJA X  PARC 02/10")
+        assert key == "generic\x1floja x"
+        assert merchant_key("generic", "Loja X parcela 3 de 10") == key
+        assert merchant_key("generic", "LOJA X 07/12") == key
+        assert merchant_key("generic", "LOJA X 123456") == key
+        assert merchant_key("generic", "12345") is None
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Sem learn, nada é anotado no diário
+            dictionary = MerchantDictionary(os.path.join(temp_dir, "dicionario.bin"), os.path.join(temp_dir, "diario"), check_interval=0)
+            assert dictionary.lookup("generic", "UBER *TRIP 1234") is None
+            dictionary.learn("generic", "UBER *TRIP 1234", MerchantEntry("UBER *TRIP 1234", "Transporte"))
+            dictionary.learn("generic", "98765", MerchantEntry("98765", None))
+            dictionary.flush_journal()
+            
+            assert not os.path.exists(dictionary.journal_path)
+            assert dictionary.lookup("generic", "uber *trip 5678").categoria == "Transporte"
+            assert dictionary.lookup("generic", "98765") is None
+    
+    def test_table_built_with_old_rules_is_ignored(self):
+        """Testa que a tabela construída com outras versões das regras não é usada"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "dicionario.bin")
+            MerchantTable.write(
+                path, {"generic\x1fLOJA": MerchantEntry("LOJA", "Antiga")}, {"patterns_version": "0", "rules_version": "0"}
+            )
+            dictionary = MerchantDictionary(path, os.path.join(temp_dir, "diario"), learn=False, check_interval=0)
+            
+            assert dictionary.lookup("generic", "LOJA") is None
+            assert compact(dictionary, rebuild=True)["resolved"] == 1
+            assert dictionary.lookup("generic", "LOJA") == MerchantEntry("LOJA", None)
+    
+    def test_overrides(self):
+        """Testa as correções do usuário por estabelecimento"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            overrides_path = os.path.join(temp_dir, "correcoes.json")
+            with open(overrides_path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "merchants": [{"match": "netflix.com", "descricao": "Netflix", "categoria": "Assinaturas"}]}, f)
+            dictionary = MerchantDictionary(
+                os.path.join(temp_dir, "dicionario.bin"), os.path.join(temp_dir, "diario"), overrides_path, check_interval=0
+            )
+            
+            assert dictionary.override("NETFLIX.COM") == {"match": "netflix.com", "descricao": "Netflix", "categoria": "Assinaturas"}
+            assert dictionary.override("SPOTIFY") is None
+
+            # Editar as correções muda a versão usada na chave do cache de extração
+            version = dictionary.overrides_version
+            with open(overrides_path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "merchants": [{"match": "spotify", "categoria": "Assinaturas"}]}, f)
+            os.utime(overrides_path, (1, 1))
+            assert dictionary.overrides_version != version
+            assert dictionary.override("SPOTIFY") == {"match": "spotify", "categoria": "Assinaturas"}
+
+    def test_journal_is_buffered_and_compacted(self):
+        """Testa que o diário é gravado em blocos e compactado ao passar do limite"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dictionary = MerchantDictionary(
+                os.path.join(temp_dir, "dicionario.bin"), os.path.join(temp_dir, "diario"),
+                learn=True, check_interval=0, journal_flush_entries=3, journal_max_bytes=200,
+            )
+            dictionary.learn("generic", "LOJA A", MerchantEntry("LOJA A", None))
+            dictionary.learn("generic", "LOJA B", MerchantEntry("LOJA B", None))
+            assert not os.path.exists(dictionary.journal_path)
+            assert dictionary.stats()["journal_pending"] == 2
+
+            dictionary.learn("generic", "LOJA C", MerchantEntry("LOJA C", None))
+            with open(dictionary.journal_path, encoding="utf-8") as f:
+                assert len(f.readlines()) == 3
+
+            # Abaixo do limite, o fim do documento só grava o buffer
+            dictionary.learn("generic", "LOJA D", MerchantEntry("LOJA D", None))
+            dictionary.flush_journal()
+            assert not os.path.exists(dictionary.path)
+
+            for name in "EFGHI":
+                dictionary.learn("generic", f"LOJA {name}", MerchantEntry(f"LOJA {name}", None))
+            dictionary.flush_journal()
+            assert not os.path.exists(dictionary.journal_path)
+            table = MerchantTable(dictionary.path)
+            try:
+                assert table.count == 9
+            finally:
+                table.close()
+
+
+class TestJobManager:
+    """Testes da fila de trabalhos de extração"""
+    
+    @staticmethod
+    def _wait(manager, job_id, timeout=30):
+        """Aguarda o trabalho terminar e retorna a sua situação"""
+        import time
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = manager.status(job_id)
+            if status["status"] in ("completed", "failed"):
+                return status
+            time.sleep(0.05)
+        raise AssertionError(f"Trabalho {job_id} não terminou")
+    
+    def test_job_runs_and_keeps_order(self):
+        """Testa que o trabalho extrai os PDFs e registra os erros na ordem de envio"""
+        with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+            content = f.read()
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = JobManager(
+                os.path.join(temp_dir, "jobs.sqlite3"), os.path.join(temp_dir, "files"),
+                service=ExtractionService(max_workers=0), cache=ExtractionCache(),
+            )
+            job_id = manager.submit([
+                ("fatura.pdf", UploadBuffer("fatura.pdf", content, None, len(content), "a" * 64), None),
+                ("notas.txt", None, "Apenas arquivos PDF são aceitos"),
+                ("corrompido.pdf", UploadBuffer("corrompido.pdf", b"%PDF-1.7\nlixo", None, 13, "b" * 64), None),
+            ])
+            
+            status = self._wait(manager, job_id)
+            assert manager.shutdown()
+            
+            assert status["status"] == "completed"
+            assert status["progress"] == {"total": 3, "processed": 3, "completed": 1, "failed": 2, "percent": 100.0}
+            assert [file["status"] for file in status["files"]] == ["completed", "failed", "failed"]
+            assert status["timings"]["running_seconds"] is not None
+            
+            result = manager.result(job_id)
+            assert [fatura["banco"] for fatura in result["faturas"]] == ["banco_do_brasil"]
+            assert [erro["indice"] for erro in result["erros"]] == [1, 2]
+            # Os PDFs do trabalho são removidos quando ele termina
+            assert not os.path.exists(os.path.join(temp_dir, "files", job_id))
+    
+    def test_interrupted_job_resumes_after_restart(self):
+        """Testa que um trabalho interrompido é retomado sem repetir os arquivos concluídos"""
+        with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+            content = f.read()
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "jobs.sqlite3")
+            files_dir = os.path.join(temp_dir, "files")
+            job_dir = os.path.join(files_dir, "job1")
+            path = UploadBuffer("fatura.pdf", content, None, len(content), "c" * 64).persist(os.path.join(job_dir, "1.pdf"))
+            
+            # Estado deixado por um desligamento no meio do trabalho
+            store = JobStore(db_path)
+            store.create_job("job1", "json", None, [("a.pdf", None, "d" * 64, None), ("b.pdf", path, "c" * 64, None)], 1.0)
+            assert store.claim_job("job1", "processo-encerrado", 2.0)
+            assert store.complete_file("job1", "processo-encerrado", 0, {"banco": "anterior"}, 3.0)
+            assert store.start_file("job1", "processo-encerrado", 1, 3.0)
+            store.close()
+            
+            manager = JobManager(db_path, files_dir, service=ExtractionService(max_workers=0), cache=ExtractionCache())
+            manager.start()
+            status = self._wait(manager, "job1")
+            manager.shutdown()
+            
+            assert status["status"] == "completed"
+            assert [fatura["banco"] for fatura in manager.result("job1")["faturas"]] == ["anterior", "banco_do_brasil"]
+    
+    def test_jobs_are_claimed_by_one_process(self):
+        """Testa que um trabalho em execução em outro processo não é devolvido à fila nem repetido"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "jobs.sqlite3")
+            store = JobStore(db_path)
+            store.create_job("vivo", "json", None, [("a.pdf", None, None, None)], 1.0)
+            store.create_job("fila", "json", None, [("b.pdf", None, None, None)], 2.0)
+            
+            import time
+            # Outro processo está executando "vivo" e renova o heartbeat
+            assert store.claim_job("vivo", "outro", time.time())
+            assert not store.claim_job("vivo", "terceiro", time.time())
+            
+            manager = JobManager(db_path, os.path.join(temp_dir, "files"), cache=ExtractionCache())
+            manager.start()
+            self._wait(manager, "fila")
+            manager.shutdown()
+            
+            job = store.get_job("vivo")
+            assert (job["status"], job["owner"]) == ("running", "outro")
+            assert store.heartbeat("vivo", "outro", time.time())
+            assert not store.finish_job("vivo", manager.owner, "completed", time.time())
+            # Só o dono grava os arquivos do trabalho
+            assert not store.complete_file("vivo", manager.owner, 0, {"banco": "duplicado"}, time.time())
+            assert not store.fail_file("vivo", manager.owner, 0, "erro", time.time())
+            assert store.get_files("vivo")[0]["status"] == "pending"
+            
+            # Sem heartbeat, o trabalho volta à fila e pode ser reivindicado de novo
+            assert store.requeue_expired(time.time() + 1) == 1
+            assert store.claim_job("vivo", manager.owner, time.time())
+            store.close()
+    
+    def test_shutdown_leaves_job_running(self):
+        """Testa que o desligamento do serviço não marca arquivos como falhos nem encerra o trabalho"""
+        import time
+        import threading
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "jobs.sqlite3")
+            store = JobStore(db_path)
+            store.create_job("job1", "json", None, [("a.pdf", None, "a" * 64, None), ("b.pdf", None, "b" * 64, None)], 1.0)
+            
+            service = ExtractionService(max_workers=0)
+            service.shutdown()
+            manager = JobManager(db_path, os.path.join(temp_dir, "files"), service=service, cache=ExtractionCache())
+            asyncio.run(manager._run_job("job1", threading.Event()))
+            
+            job = store.get_job("job1")
+            assert (job["status"], job["owner"]) == ("running", manager.owner)
+            assert all(file["status"] != "failed" for file in store.get_files("job1"))
+            
+            # Com o aviso de desligamento, nenhum arquivo é iniciado
+            stopping = threading.Event()
+            stopping.set()
+            assert store.requeue_expired(time.time() + 1) == 1
+            asyncio.run(manager._run_job("job1", stopping))
+            assert [file["status"] for file in store.get_files("job1")] == ["pending", "pending"]
+            assert store.get_job("job1")["status"] == "running"
+            store.close()
+    
+    def test_closed_manager_rejects_jobs(self):
+        """Testa que nenhum trabalho é aceito depois do desligamento"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = JobManager(os.path.join(temp_dir, "jobs.sqlite3"), os.path.join(temp_dir, "files"), cache=ExtractionCache())
+            manager.start()
+            assert manager.shutdown()
+            
+            with pytest.raises(JobManagerClosedError):
+                manager.submit([("notas.txt", None, "Apenas arquivos PDF são aceitos")])
+
+
+class TestArtifactStore:
+    """Testes do armazenamento de arquivos exportados"""
+    
+    def test_identical_exports_reuse_one_file(self):
+        """Testa que exportar o mesmo resultado reaproveita o arquivo e não deixa temporários"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = ArtifactStore(temp_dir)
+            
+            first = store.export("to_json", SAMPLE_DATA, "json")
+            os.utime(first, (0, 0))
+            second = store.export("to_json", SAMPLE_DATA, "json")
+            other = store.export("to_excel", SAMPLE_DATA, "xlsx")
+            
+            assert first == second != other
+            assert os.path.basename(first) == ArtifactStore.key_for("to_json", SAMPLE_DATA) + ".json"
+            # O reaproveitamento conta como uso recente
+            assert os.path.getmtime(first) > 0
+            assert os.listdir(store.tmp_dir) == []
+            with open(first, encoding="utf-8") as f:
+                assert json.load(f)["titular"] == SAMPLE_DATA["titular"]
+    
+    def test_sweep_ttl_quota_and_uploads(self):
+        """Testa a remoção por TTL, pela cota (menos usados primeiro) e dos uploads abandonados"""
+        import time
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            uploads_dir = os.path.join(temp_dir, "spool")
+            store = ArtifactStore(os.path.join(temp_dir, "exports"), uploads_dir, max_bytes=250, ttl_seconds=3600, upload_ttl_seconds=60)
+            now = time.time()
+            
+            def create(path, size, age):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(b"x" * size)
+                os.utime(path, (now - age, now - age))
+                return path
+            
+            expired = create(store.path_for("aa" * 32, "json"), 100, 7200)
+            oldest = create(store.path_for("bb" * 32, "json"), 100, 300)
+            recent = create(store.path_for("cc" * 32, "json"), 100, 200)
+            newest = create(store.path_for("dd" * 32, "json"), 100, 100)
+            half_written = create(os.path.join(store.tmp_dir, "parcial.json"), 100, 120)
+            abandoned = create(os.path.join(uploads_dir, "upload_antigo.pdf"), 10, 120)
+            in_use = create(os.path.join(uploads_dir, "upload_atual.pdf"), 10, 1)
+            
+            stats = store.sweep()
+            
+            assert [os.path.exists(path) for path in (expired, oldest, recent, newest)] == [False, False, True, True]
+            assert not os.path.exists(half_written) and not os.path.exists(abandoned)
+            assert os.path.exists(in_use)
+            assert stats == {"removed": 4, "freed_bytes": 310, "used_bytes": 200}
+
+
+class TestInvoiceCorpus:
+    """Testes para o gerador de faturas sintéticas"""
+    
+    def test_generation_is_deterministic(self):
+        """Testa que a mesma semente gera os mesmos PDFs e resultados esperados"""
+        from app.utils.generate_invoice_corpus import generate_corpus, expected_path
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            first = generate_corpus(os.path.join(temp_dir, "a"), banks=["nubank"], pages=[2], transactions_per_page=5, seed=7)
+            second = generate_corpus(os.path.join(temp_dir, "b"), banks=["nubank"], pages=[2], transactions_per_page=5, seed=7)
+            other = generate_corpus(os.path.join(temp_dir, "c"), banks=["nubank"], pages=[2], transactions_per_page=5, seed=8)
+            
+            def read(path):
+                with open(path, "rb") as f:
+                    return f.read()
+            
+            assert read(first[0]) == read(second[0]) != read(other[0])
+            assert read(expected_path(first[0])) == read(expected_path(second[0]))
+            assert os.path.exists(os.path.join(temp_dir, "a", "manifest.json"))
+    
+    def test_corpus_round_trip(self):
+        """Testa a extração das faturas geradas contra o resultado esperado"""
+        from app.utils.generate_invoice_corpus import LAYOUTS, generate_corpus, expected_path, score_extraction
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = generate_corpus(temp_dir, pages=[3], transactions_per_page=12, noise=0.5, seed=3)
+            assert len(paths) == len(LAYOUTS)
+            
+            for path in paths:
+                with open(expected_path(path), encoding="utf-8") as f:
+                    expected = json.load(f)
+                
+                assert BankDetector.detect_bank(path) == expected["banco"]
+                score = score_extraction(expected, PDFExtractor().extract(path))
+                # Nenhuma transação inventada, em nenhum layout
+                assert score["precisao"] == 1.0
+                
+                if expected["banco"] == "banco_do_brasil":
+                    assert score["revocacao"] == 1.0
+                    # O BB não usa a data de fechamento impressa (ver _bb_closing_date_from_lines)
+                    assert score["campos_divergentes"] == ["data_fechamento"]
+    
+    def test_build_invoice_validates_pages(self):
+        """Testa os limites do número de páginas"""
+        import random
+        from app.utils.generate_invoice_corpus import build_invoice
+        
+        pages, expected = build_invoice("itau", random.Random(1), 200, 1)
+        assert len(pages) == 200 and len(expected["transacoes"]) == 200
+        with pytest.raises(ValueError):
+            build_invoice("itau", random.Random(1), 201, 1)
+        with pytest.raises(ValueError):
+            build_invoice("banco_xyz", random.Random(1), 1, 1)
+
+
+class TestMetrics:
+    """Testes para o registro de métricas"""
+    
+    def test_render_exposition_format(self):
+        """Testa o texto de exposição de contadores, histogramas e coletores"""
+        from app.services.metrics import MetricsRegistry
+        
+        registry = MetricsRegistry(namespace="teste")
+        errors = registry.counter("errors", "Erros", ["type"])
+        durations = registry.histogram("duration_seconds", "Duração", ["stage"], buckets=(0.1, 1.0))
+        registry.register_collector(lambda: [("cache_misses", "counter", "Falhas", [({}, 3.0)])])
+        
+        errors.inc('Value"Error')
+        errors.inc('Value"Error', amount=2)
+        for value in (0.05, 0.1, 0.5, 5.0):
+            durations.observe(value, "parse")
+        
+        lines = registry.render().splitlines()
+        assert "# TYPE teste_errors_total counter" in lines
+        assert 'teste_errors_total{type="Value\\"Error"} 3.0' in lines
+        assert "# TYPE teste_duration_seconds histogram" in lines
+        assert 'teste_duration_seconds_bucket{stage="parse",le="0.1"} 2' in lines
+        assert 'teste_duration_seconds_bucket{stage="parse",le="1.0"} 3' in lines
+        assert 'teste_duration_seconds_bucket{stage="parse",le="+Inf"} 4' in lines
+        assert 'teste_duration_seconds_count{stage="parse"} 4' in lines
+        assert "teste_cache_misses_total 3.0" in lines
+    
+    def test_worker_deltas_merge(self):
+        """Testa a soma dos valores drenados de um processo do pool e o registro desativado"""
+        from app.services.metrics import MetricsRegistry
+        
+        worker, main = MetricsRegistry("teste"), MetricsRegistry("teste")
+        for registry in (worker, main):
+            registry.counter("banks", "Bancos", ["bank"])
+            registry.histogram("pages", "Páginas", buckets=(1, 10))
+        
+        main._metrics["teste_banks"].inc("nubank")
+        worker._metrics["teste_banks"].inc("nubank")
+        worker._metrics["teste_pages"].observe(3)
+        main.merge(worker.drain())
+        
+        assert main._metrics["teste_banks"].value("nubank") == 2
+        assert main._metrics["teste_pages"].count() == 1
+        assert worker.drain() == {}
+        
+        disabled = MetricsRegistry("teste", enabled=False)
+        disabled.counter("banks", "Bancos", ["bank"]).inc("nubank")
+        assert disabled.drain() == {}
+
+
+class TestProfiler:
+    """Testes para o perfil de CPU por requisição"""
+    
+    def test_profile_written_and_merged(self, tmp_path):
+        """Testa a gravação do perfil, a soma no mesmo processo e as pilhas colapsadas"""
+        import os
+        import pstats
+        from app.services.profiler import RequestProfiler
+        
+        def inner():
+            return sum(i * i for i in range(20000))
+        
+        def outer():
+            return inner()
+        
+        profiler = RequestProfiler(str(tmp_path), max_files=10)
+        assert profiler.run(None, outer) == profiler.run("perfil-a", outer)
+        profiler.run("perfil-a", outer)
+        
+        base = tmp_path / f"perfil-a.{os.getpid()}"
+        stats = pstats.Stats(str(base) + ".prof").stats
+        calls = [entry[1] for function, entry in stats.items() if function[2] == "inner"]
+        assert calls == [2]
+        
+        collapsed = (base.parent / (base.name + ".collapsed")).read_text(encoding="utf-8").splitlines()
+        assert any("outer (test_services.py" in line and "inner (test_services.py" in line for line in collapsed)
+        assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in collapsed)
+        
+        listed = profiler.list_profiles()
+        assert [profile["profile_id"] for profile in listed] == ["perfil-a"]
+        assert {file["format"] for file in listed[0]["files"]} == {"prof", "collapsed"}
+    
+    def test_sampling_and_header(self, tmp_path):
+        """Testa a decisão de perfilar pelo cabeçalho e pela amostragem"""
+        from app.services.profiler import RequestProfiler
+        
+        assert RequestProfiler(str(tmp_path)).wants_profile({"x-profile": "1"})
+        assert not RequestProfiler(str(tmp_path)).wants_profile({})
+        assert not RequestProfiler(str(tmp_path), header_enabled=False).wants_profile({"x-profile": "1"})
+        assert RequestProfiler(str(tmp_path), sample_rate=1.0).wants_profile({})
+
+
+class TestTransactionTable:
+    """Testes para a tabela colunar de transações"""
+    
+    def test_round_trip_slicing_and_grouping(self):
+        """Testa a conversão de/para dicionários, as fatias e as somas por coluna"""
+        import pickle
+        from app.models.transaction_table import TransactionTable
+        
+        records = [
+            {"data": "01/06", "descricao": "MERCADO", "valor": 150.0, "categoria": "Supermercado"},
+            {"data": "02/06", "descricao": "POSTO", "valor": 89.9, "categoria": None},
+            {"data": "03/06/2025", "descricao": "MERCADO", "valor": 0.1, "categoria": "Supermercado"},
+            {"data": "04/07", "descricao": "ESTORNO", "valor": -20.05, "categoria": None},
+        ]
+        table = TransactionTable.from_records(records)
+        
+        assert table.to_records() == records
+        assert list(table) == records and table[-1] == records[-1]
+        assert table.descriptions == ["MERCADO", "POSTO", "ESTORNO"]
+        assert table.total_cents() == 21995
+        assert table.sum_by("categoria") == {"Supermercado": (15010, 2), None: (6985, 2)}
+        assert table.sum_by("mes") == {6: (23990, 2), 0: (10, 1), 7: (-2005, 1)}
+        
+        middle = table[1:3]
+        assert middle.to_records() == records[1:3]
+        middle.set_category(0, "Transporte")
+        assert middle[0]["categoria"] == "Transporte" and table[1]["categoria"] is None
+        
+        copy = pickle.loads(pickle.dumps(table))
+        assert copy == table
+        copy.append("05/07", "MERCADO", 1.0)
+        assert copy.descriptions == ["MERCADO", "POSTO", "ESTORNO"]
+        
+        with pytest.raises(ValueError):
+            table.append("06/07", "LOJA", None)
+    
+    def test_numpy_and_pandas_share_memory(self):
+        """Testa a conversão para NumPy e pandas sem copiar os valores"""
+        import numpy
+        from app.models.transaction_table import TransactionTable
+        
+        table = TransactionTable()
+        for day in range(1, 11):
+            table.append(f"{day:02d}/05", "LOJA" if day % 2 else "MERCADO", day * 1.5, None if day % 3 else "Compras")
+        
+        columns = table.to_numpy()
+        assert columns["valor_centavos"].tolist() == [day * 150 for day in range(1, 11)]
+        assert numpy.shares_memory(columns["valor_centavos"], table.to_numpy()["valor_centavos"])
+        
+        frame = table.to_pandas()
+        assert frame["valor_centavos"].sum() == table.total_cents()
+        assert frame["descricao"].tolist()[:2] == ["LOJA", "MERCADO"]
+        assert frame["categoria"].isna().sum() == 7
+        assert frame.groupby("categoria", observed=True)["valor_centavos"].sum().to_dict() == {"Compras": 2700}
+
+
+class TestResultPath:
+    """Testes para o caminho do resultado da extração até a resposta"""
+    
+    def test_slots_models_and_json_bytes(self):
+        """Testa os modelos sem __dict__ e a serialização direta em bytes"""
+        import json
+        from app.api.responses import JSONBytesResponse, dumps
+        from app.models.invoice import Fatura, Transacao
+        
+        transacao = Transacao("01/06", "PADARIA SÃO JOÃO", 12.5, "Alimentação")
+        assert not hasattr(transacao, "__dict__")
+        
+        fatura = Fatura(titular="CLIENTE", banco="nubank", data_processamento="2025-06-15 10:00:00")
+        assert not hasattr(fatura, "__dict__")
+        fatura.adicionar_transacao(transacao)
+        fatura.adicionar_transacao(Transacao("02/06", "ESTORNO", -2.25))
+        assert fatura.calcular_total() == 10.25
+        
+        data = fatura.to_dict()
+        body = JSONBytesResponse(data).body
+        assert json.loads(body) == data
+        assert "PADARIA SÃO JOÃO".encode("utf-8") in body
+        assert JSONBytesResponse(body).body is body
+        assert dumps({"fatura": 1, "erros": []}) == b'{"fatura":1,"erros":[]}'
+
+
+class TestMoney:
+    """Testes para a conversão de valores monetários em centavos"""
+    
+    def test_parse_cents_formats(self):
+        """Testa os formatos brasileiros, os marcadores de negativo e os valores inválidos"""
+        from app.utils.money import cents_to_decimal, format_cents, parse_cents, parse_cents_array
+        
+        assert parse_cents("1.234,56") == 123456
+        assert parse_cents("R$ 12,00") == 1200
+        assert parse_cents("R$\xa0-0,50") == -50
+        assert parse_cents("85,50-") == parse_cents("(85,50)") == parse_cents("85,50 CR") == -8550
+        assert parse_cents("1500.00") == 150000 and parse_cents("1.234") == 123400 and parse_cents("7,5") == 750
+        assert parse_cents("1,234") is None and parse_cents("abc") is None and parse_cents("") is None and parse_cents(None) is None
+        
+        assert format_cents(-123456) == "-1.234,56" and format_cents(5) == "0,05"
+        assert str(cents_to_decimal(-8550)) == "-85.50"
+        assert list(parse_cents_array(["0,10", "0,20"])) == [10, 20]
+        with pytest.raises(ValueError):
+            parse_cents_array(["0,10", "x"])
+    
+    def test_parse_cents_column(self):
+        """Testa a coluna canônica (convertida de uma vez) e a coluna mista"""
+        from app.utils.money import parse_cents, parse_cents_column
+        
+        canonical = ["R$ 1.234,56", "0,10", "-3,00", "R$ 0,20"]
+        mixed = canonical + ["85,50-", "1500.00", "1,234", None]
+        assert parse_cents_column(canonical) == [123456, 10, -300, 20]
+        assert parse_cents_column(mixed) == [parse_cents(text) for text in mixed]
+        assert parse_cents_column(["1,00\n2,00"]) == [None]
+        assert parse_cents_column([]) == []
+        
+        # A soma em centavos é exata, ao contrário da soma em float
+        assert sum(parse_cents_column(["0,10", "0,20"])) == 30
+
+
+class TestExtractionLimits:
+    """Testes para os limites de recursos da extração e os padrões diante de textos adversariais"""
+    
+    # Tempo de CPU de cada padrão em cada texto do corpus
+    PATTERN_BUDGET_SECONDS = 1.0
+    
+    def adversarial_corpus(self, size):
+        """Textos de uma linha só, do tamanho de uma página no limite, que provocam backtracking"""
+        texts = {
+            "total_sem_valor": "Total " * size,
+            "data_sem_valor": "01/06 " + "LOJA " * size,
+            "data_e_espacos": "01/06 " + " " * size + "x",
+            "datas_repetidas": "01/06 " * size,
+            "separadores": "1.2," * size,
+            "real_sem_digitos": "01/06 LOJA R$ " * size,
+            "nomes": "Joao " * size,
+            "cartao": "Cartão " * size,
+            "espacos": " " * size,
+            "sufixo_br": "01/06 X" + " BR" * size,
+            "linha_bb_longa": "01/06 " + "A" * size + " R$ x",
+        }
+        return {name: text[:size] for name, text in texts.items()}
+    
+    def registered_patterns(self):
+        """Todos os padrões compilados do registro e os padrões fixos do extrator"""
+        from app.services import pdf_extractor
+        from app.services.pattern_registry import get_pattern_registry
+        
+        snapshot = get_pattern_registry().snapshot()
+        patterns = {f"defaults.{field}": pattern for field, pattern in snapshot.defaults.items()}
+        patterns["detector"] = snapshot.detector
+        for bank_id, bank in snapshot.banks.items():
+            patterns.update((f"{bank_id}.{field}", pattern) for field, pattern in bank.extraction.items() if pattern is not None)
+            patterns.update((f"{bank_id}.transaction_lines.{index}", pattern) for index, pattern in enumerate(bank.transaction_lines))
+            patterns.update((f"{bank_id}.cities.{index}", pattern) for index, pattern in enumerate(bank.cities))
+            if bank.line_classifier is not None:
+                patterns[f"{bank_id}.line_classifier"] = bank.line_classifier
+        for name in ("DEFAULT_TRANSACTION_PATTERN", "BR_SUFFIX_PATTERN", "BRASIL_SUFFIX_PATTERN", "WHITESPACE_PATTERN", "LINE_DATE_PATTERN"):
+            patterns[name] = getattr(pdf_extractor, name)
+        return patterns
+    
+    def test_registered_patterns_within_budget(self):
+        """Testa que todos os padrões terminam dentro do orçamento em cada texto adversarial"""
+        import time
+        from app.core.config import EXTRACTION_LIMITS_CONFIG
+        from app.services.extraction_limits import ExtractionLimitError, ExtractionLimits
+        
+        limits = ExtractionLimits(cpu_seconds=self.PATTERN_BUDGET_SECONDS)
+        slow = []
+        for text_name, text in self.adversarial_corpus(EXTRACTION_LIMITS_CONFIG["max_page_chars"]).items():
+            for pattern_name, pattern in self.registered_patterns().items():
+                start = time.thread_time()
+                try:
+                    # O orçamento interrompe um padrão em backtracking em vez de travar o teste
+                    with limits.guard():
+                        for _ in pattern.finditer(text):
+                            pass
+                        pattern.match(text)
+                except ExtractionLimitError:
+                    slow.append((pattern_name, text_name))
+                    continue
+                if time.thread_time() - start > self.PATTERN_BUDGET_SECONDS:
+                    slow.append((pattern_name, text_name))
+        assert slow == []
+    
+    def test_description_limit_keeps_previous_matches(self):
+        """Testa que os padrões limitados casam como os anteriores até MAX_DESCRIPTION_CHARS caracteres de descrição"""
+        import re
+        from app.services.pdf_extractor import DEFAULT_TRANSACTION_PATTERN, MAX_DESCRIPTION_CHARS
+        from app.services.pattern_registry import get_pattern_registry
+        
+        snapshot = get_pattern_registry().snapshot()
+        bb = snapshot.get("banco_do_brasil")
+        # Padrões antes do limite e do \s++ possessivo
+        pairs = [
+            (DEFAULT_TRANSACTION_PATTERN, r"(\d{2}/\d{2})\s+([^\d]+)\s+([\d\.,]+)"),
+            (snapshot.defaults["transacao_pattern"], r"(\d{2}/\d{2})\s+([^\d]+?)\s+(R?\$?\s*[\d\.,]+)"),
+            (bb.extraction["transacao_pattern"], r"(\d{2}/\d{2})\s+([^R$]+?)\s+(?:BR\s+)?R\$\s*([\d\.,]+)"),
+            (bb.transaction_lines[0], r"^(\d{2}/\d{2})\s+(.+?)\s+BR\s+R\$\s*([\d\.,]+)$"),
+            (bb.transaction_lines[1], r"^(\d{2}/\d{2})\s+(.+?)\s+R\$\s*([\d\.,]+)$"),
+            (bb.transaction_lines[2], r"^(\d{2}/\d{2})\s+(.+?)\s+([\d\.,]+)$"),
+        ]
+        lines = [
+            "01/06 SUPERMERCADO XYZ BR R$ 150,00",
+            "05/06   RESTAURANTE  ABC   R$ 85,50",
+            "10/06\tUBER *TRIP 1.234,56",
+            # No limite: nos padrões genéricos o "R$" faz parte da descrição
+            "12/06 " + "X" * MAX_DESCRIPTION_CHARS + " 10,00",
+            "12/06 " + "X" * (MAX_DESCRIPTION_CHARS - 3) + " R$ 10,00",
+        ]
+        for limited, previous in pairs:
+            for line in lines:
+                expected = [match.groups() for match in re.finditer(previous, line)]
+                assert [match.groups() for match in limited.finditer(line)] == expected, (limited.pattern, line)
+            
+            # Acima do limite a linha não é reconhecida como transação
+            assert limited.search("12/06 " + "X" * (MAX_DESCRIPTION_CHARS + 1) + " R$ 10,00") is None
+    
+    def test_limits_and_structured_error(self):
+        """Testa os limites de páginas, de caracteres e de CPU e o erro que atravessa o pool"""
+        import re
+        import pickle
+        import signal
+        from app.services.extraction_limits import ExtractionLimitError, ExtractionLimits
+        
+        def document(*texts):
+            pages = []
+            for text in texts:
+                page = MagicMock()
+                page.extract_text.return_value = text
+                pages.append(page)
+            document = ParsedDocument(b"%PDF-1.4", name="fatura.pdf")
+            document._reader = MagicMock(pages=pages)
+            return document
+        
+        limits = ExtractionLimits(cpu_seconds=0, max_pages=2, max_page_chars=10, max_total_chars=15)
+        # Fora de guard os limites não se aplicam
+        assert list(document("x" * 20, "x", "x").iter_pages())[0] == "x" * 20
+        
+        with pytest.raises(ExtractionLimitError) as error, limits.guard():
+            document("a", "b", "c").page_count
+        assert error.value.code == "max_pages"
+        with pytest.raises(ExtractionLimitError) as error, limits.guard():
+            document("x" * 11).page_text(0)
+        assert error.value.code == "max_page_chars"
+        with pytest.raises(ExtractionLimitError) as error, limits.guard():
+            list(document("x" * 10, "x" * 10).iter_pages())
+        assert error.value.code == "max_total_chars"
+        
+        restored = pickle.loads(pickle.dumps(error.value))
+        assert restored.to_dict() == error.value.to_dict() == {"message": str(error.value), "code": "max_total_chars", "limit": 15}
+        
+        # O temporizador de CPU interrompe uma expressão em backtracking catastrófico
+        handler = signal.getsignal(signal.SIGPROF)
+        with pytest.raises(ExtractionLimitError) as error, ExtractionLimits(cpu_seconds=0.2).guard():
+            re.compile(r"(a+)+$").match("a" * 40 + "b")
+        assert error.value.code == "cpu_budget"
+        assert signal.getsignal(signal.SIGPROF) == handler
+        
+        # Uma interrupção engolida por um except genérico volta a ser lançada
+        swallowed = []
+        with pytest.raises(ExtractionLimitError), ExtractionLimits(cpu_seconds=0.2).guard():
+            try:
+                re.compile(r"(a+)+$").match("a" * 40 + "b")
+            except Exception as e:
+                swallowed.append(e)
+            re.compile(r"(a+)+$").match("a" * 40 + "b")
+        assert [e.code for e in swallowed] == ["cpu_budget"]
+    
+    def test_detection_does_not_swallow_limits(self):
+        """Testa que a detecção repassa o erro de limite em vez de responder que o banco não foi detectado"""
+        from app.services.extraction_limits import ExtractionLimitError, ExtractionLimits
+        
+        with open("app/static/test_data/fatura_bb_teste.pdf", "rb") as f:
+            document = ParsedDocument(f.read(), name="fatura.pdf")
+        with pytest.raises(ExtractionLimitError) as error, ExtractionLimits(max_page_chars=10).guard():
+            BankDetector.detect(document)
+        assert error.value.code == "max_page_chars"